@@ -1,11 +1,21 @@
-from fastapi import APIRouter, Depends
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from ..database import get_db
-from ..services.metrics import reconciliation
-from ..llm.stub import answer
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_db, get_async_read_db
+from ..llm.facts import MonthFacts, ALL_FACTS
+from ..llm.stub import answer_lazy, route, stream_answer
 from ..config import settings
-from ..llm.groq import answer_groq
+from ..llm.groq import answer_groq, stream_groq
+from ..llm.stream import sse_answer, ttft, SSE_HEADERS
+from ..llm.answer_cache import answer_cache
+from ..llm.guard import provider_guard
+from ..llm.router import model_router
+from ..llm import telemetry
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
@@ -19,34 +29,133 @@ class ChatResponse(BaseModel):
     answer: str
 
 
+class BatchRequest(BaseModel):
+    items: List[ChatRequest]
+
+
+class BatchItem(BaseModel):
+    month: str
+    question: str
+    answer: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    items: List[BatchItem]
+
+
+def _provider_mode() -> bool:
+    return bool(settings.llm_api_url and settings.llm_api_url.startswith('http'))
+
+
 @router.post('/ask', response_model=ChatResponse)
-async def ask(req: ChatRequest, db: Session = Depends(get_db)):
-    recon_rows = reconciliation(db, req.month)
+async def ask(req: ChatRequest, db: AsyncSession = Depends(get_async_db),
+              read_db: AsyncSession = Depends(get_async_read_db)):
+    # cached per month and data version; reconciliation writes go to the primary
+    facts = MonthFacts(db, read_db, req.month)
     # If LLM_API_URL points to an HTTP endpoint, use OpenAI-compatible path (e.g., Groq)
-    if settings.llm_api_url and settings.llm_api_url.startswith('http'):
-        ans = await answer_groq(db, req.month, req.question, recon_rows)
+    if _provider_mode():
+        resolved = await facts.resolve(ALL_FACTS)
+        ans = await answer_groq(req.month, req.question, resolved, resolved['recon_rows'])
         return ChatResponse(answer=ans)
-    # Otherwise, use local stub
+    # Otherwise, use local stub, which resolves only the facts its intent reads
     try:
-        ans = answer(db, req.month, req.question, recon_rows)
+        ans = await answer_lazy(req.month, req.question, facts.resolve)
     except Exception as e:
         ans = f"Unable to generate chat answer: {e}. Please ensure data is uploaded for the month."
     return ChatResponse(answer=ans)
 
 
+@router.post('/stream')
+async def ask_stream(req: ChatRequest, db: AsyncSession = Depends(get_async_db),
+                     read_db: AsyncSession = Depends(get_async_read_db)):
+    """The /ask answer as server-sent events: `token` events, then `done` with the time to first token."""
+    started = time.perf_counter()
+    facts = MonthFacts(db, read_db, req.month)
+    # resolve before streaming: the sessions are closed once the response starts
+    if _provider_mode():
+        resolved = await facts.resolve(ALL_FACTS)
+        chunks = stream_groq(req.month, req.question, resolved, resolved['recon_rows'])
+    else:
+        await facts.resolve(route(req.question).needs)
+        chunks = stream_answer(req.month, req.question, facts.resolve)
+    return StreamingResponse(sse_answer(chunks, started), media_type='text/event-stream', headers=SSE_HEADERS)
+
+
+@router.post('/ask-batch', response_model=BatchResponse)
+async def ask_batch(req: BatchRequest, db: AsyncSession = Depends(get_async_db),
+                    read_db: AsyncSession = Depends(get_async_read_db)):
+    """Answer many (month, question) pairs, in request order.
+
+    Facts are collected once per month, one month after another (a session
+    serves one query at a time). The answers then run concurrently, at most
+    LLM_BATCH_CONCURRENCY at once, on top of the provider's own limit. A
+    failing month or question fails only its own items, reported in `error`.
+    """
+    if len(req.items) > settings.llm_batch_max_items:
+        raise HTTPException(status_code=400,
+                            detail=f"At most {settings.llm_batch_max_items} questions per batch")
+    provider = _provider_mode()
+    months: Dict[str, MonthFacts] = {}
+    failed: Dict[str, str] = {}
+    for item in req.items:
+        months.setdefault(item.month, MonthFacts(db, read_db, item.month))
+    for month, facts in months.items():
+        # the stub needs only the groups its intents read, the prompt needs all of them
+        needs = ALL_FACTS if provider else {g for item in req.items if item.month == month
+                                            for g in route(item.question).needs}
+        try:
+            await facts.resolve(needs)
+        except Exception as e:
+            failed[month] = f"Unable to collect facts for month {month}: {e}"
+            # leave the sessions usable for the next month
+            await db.rollback()
+            await read_db.rollback()
+
+    limit = asyncio.Semaphore(max(1, settings.llm_batch_concurrency))
+
+    async def one(item: ChatRequest) -> BatchItem:
+        result = BatchItem(month=item.month, question=item.question)
+        if item.month in failed:
+            result.error = failed[item.month]
+            return result
+        facts = months[item.month]
+        try:
+            async with limit:
+                if provider:
+                    result.answer = await answer_groq(item.month, item.question, facts.facts,
+                                                      facts.facts['recon_rows'])
+                else:
+                    result.answer = await answer_lazy(item.month, item.question, facts.resolve)
+        except Exception as e:
+            result.error = f"Unable to generate chat answer: {e}"
+        return result
+
+    return BatchResponse(items=await asyncio.gather(*(one(item) for item in req.items)))
+
+
 @router.get('/status')
 async def status():
     """Return current LLM mode and model used by the backend.
 
     mode: 'groq' if LLM_API_URL starts with http, otherwise 'stub'
     model: settings.llm_model if available when mode is groq
+    ttft: time to first token of recent /chat/stream answers (count, p50_ms, p95_ms)
+    answer_cache: backend, hits, misses and hit_rate of the provider answer cache
+    provider: circuit breaker state, active/max concurrent calls, coalesced and rejected requests
+    models: the model router's current order, hedge counts and per-model latency/error rate
+    telemetry: provider requests by outcome and tokens per model, answers by outcome (see GET /metrics)
     """
-    is_http = bool(
-        settings.llm_api_url and settings.llm_api_url.startswith('http'))
+    is_http = _provider_mode()
     mode = 'groq' if is_http else 'stub'
     model = getattr(settings, 'llm_model', None) if is_http else None
     return {
         'mode': mode,
         'model': model,
         'api_url': settings.llm_api_url,
+        'ttft': ttft.summary(),
+        'answer_cache': answer_cache.stats(),
+        'provider': provider_guard.stats(),
+        'models': model_router.stats(),
+        'telemetry': telemetry.summary(),
     }
@@ -0,0 +1,42 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_db, replica_router, SessionLocal, ReadSessionLocal
+from ..services.metrics import reconciliation
+from ..services.lines import recon_has_rows
+from ..services.exports import export_sales, export_bank, export_recon
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+
+def _response(chunks, name: str, month: str, gzip: bool) -> StreamingResponse:
+    filename = f"{name}_{month}.csv" + ('.gz' if gzip else '')
+    return StreamingResponse(chunks, media_type='application/gzip' if gzip else 'text/csv',
+                             headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+
+async def _read_factory():
+    return ReadSessionLocal if await replica_router.use_replica_async() else SessionLocal
+
+
+@router.get('/sales')
+async def sales(month: str, payment_method: Optional[str] = None, vat_rate: Optional[float] = None,
+                gzip: bool = False):
+    chunks = export_sales(await _read_factory(), month, payment_method, vat_rate, compress=gzip)
+    return _response(chunks, 'sales', month, gzip)
+
+
+@router.get('/bank')
+async def bank(month: str, tx_type: Optional[str] = None, gzip: bool = False):
+    chunks = export_bank(await _read_factory(), month, tx_type, compress=gzip)
+    return _response(chunks, 'bank', month, gzip)
+
+
+@router.get('/recon')
+async def recon(month: str, gzip: bool = False, db: AsyncSession = Depends(get_async_db)):
+    # Same as /recon/card/page: fill the cache first if the month was never reconciled
+    if not await db.run_sync(recon_has_rows, month):
+        await db.run_sync(reconciliation, month)
+    return _response(export_recon(SessionLocal, month, compress=gzip), 'recon', month, gzip)
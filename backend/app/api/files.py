@@ -2,8 +2,10 @@ from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
 import os
 import shutil
 from ..services.parsing import ingest_files, detect_excel_months, detect_bank_months
+from ..services.ingest_timing import StageTimer, record_upload, recent_uploads
 from ..schemas.sales import UploadResponse
 from ..config import settings
+from ..database import replica_router
 
 router = APIRouter(prefix="/files", tags=["files"])
 
@@ -13,15 +15,24 @@ async def upload_files(month: str, sales_excel: UploadFile = File(...), bank_pdf
     os.makedirs(settings.upload_dir, exist_ok=True)
     excel_path = os.path.join(settings.upload_dir, sales_excel.filename)
     pdf_path = os.path.join(settings.upload_dir, bank_pdf.filename)
-    with open(excel_path, 'wb') as f:
-        shutil.copyfileobj(sales_excel.file, f)
-    with open(pdf_path, 'wb') as f:
-        shutil.copyfileobj(bank_pdf.file, f)
+    timer = StageTimer()
+    with timer.stage('upload_copy') as stage:
+        with open(excel_path, 'wb') as f:
+            shutil.copyfileobj(sales_excel.file, f)
+        with open(pdf_path, 'wb') as f:
+            shutil.copyfileobj(bank_pdf.file, f)
+        files = {'sales_excel': {'name': sales_excel.filename, 'bytes': os.path.getsize(excel_path)},
+                 'bank_pdf': {'name': bank_pdf.filename, 'bytes': os.path.getsize(pdf_path)}}
+        stage['bytes'] = files['sales_excel']['bytes'] + files['bank_pdf']['bytes']
+    outcome = 'error'
     try:
         # Validate that requested month exists in at least one of the files to avoid silent zeros
-        excel_months = detect_excel_months(excel_path)
-        bank_months = detect_bank_months(pdf_path)
+        with timer.stage('detect_excel_months', files['sales_excel']['bytes']):
+            excel_months = detect_excel_months(excel_path)
+        with timer.stage('detect_bank_months', files['bank_pdf']['bytes']):
+            bank_months = detect_bank_months(pdf_path)
         if month not in excel_months and month not in bank_months:
+            outcome = 'month_mismatch'
             detail = {
                 'error': 'month_mismatch',
                 'requested_month': month,
@@ -30,10 +41,22 @@ async def upload_files(month: str, sales_excel: UploadFile = File(...), bank_pdf
                 'hint': 'Upload files that contain the requested month or set month to one present in the files.'
             }
             raise HTTPException(status_code=400, detail=detail)
-        sales_count, bank_count = ingest_files(excel_path, pdf_path, month)
+        sales_count, bank_count = ingest_files(excel_path, pdf_path, month, timer)
+        outcome = 'ok'
+        # Reads stay on the primary until the replica has replayed this ingest
+        replica_router.mark_write()
     except Exception as e:
         # FastAPI will not double-wrap HTTPException
         if isinstance(e, HTTPException):
             raise
         raise HTTPException(status_code=400, detail=str(e))
-    return UploadResponse(sales_rows=sales_count, bank_rows=bank_count, month=month)
+    finally:
+        record_upload(month, files, timer, outcome)
+    return UploadResponse(sales_rows=sales_count, bank_rows=bank_count, month=month,
+                          total_ms=timer.total_ms(), stages=timer.stages)
+
+
+@router.get('/timings')
+async def upload_timings():
+    """Stage timings of the most recent uploads, newest first."""
+    return recent_uploads()
@@ -0,0 +1,113 @@
+"""Content negotiation for the row-heavy endpoints.
+
+The Accept header picks the encoding of a list of row dicts (or of the
+items of a paginated page):
+
+  application/json                     orjson (default, also for */*)
+  application/msgpack                  MessagePack, same structure as JSON
+  application/vnd.apache.arrow.stream  Arrow IPC stream, one column per field
+
+The response is built here and returned as-is, which also skips FastAPI's
+jsonable_encoder pass over every row. For Arrow, every endpoint has a fixed
+schema below, so empty pages and all-NULL columns keep their types: ISO
+dates become date32, nested values (anomaly detail) JSON text. A page's
+next_cursor travels in the X-Next-Cursor header.
+"""
+import json
+from typing import Dict, List, Optional, Union
+
+import msgpack
+import pyarrow as pa
+import pyarrow.compute as pc
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, Response
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+ARROW = 'application/vnd.apache.arrow.stream'
+ALIASES = {'application/x-msgpack': MSGPACK, 'application/vnd.apache.arrow.file': ARROW}
+SUPPORTED = (JSON, MSGPACK, ARROW)
+
+DAILY_SCHEMA = pa.schema([
+    ('date', pa.date32()), ('gross', pa.float64()), ('card', pa.float64()), ('cash', pa.float64()),
+])
+SALES_SCHEMA = pa.schema([
+    ('id', pa.int64()), ('date', pa.date32()), ('invoice_number', pa.string()), ('customer', pa.string()),
+    ('product', pa.string()), ('quantity', pa.float64()), ('unit_price_net', pa.float64()),
+    ('vat_rate', pa.float64()), ('net_amount', pa.float64()), ('vat_amount', pa.float64()),
+    ('gross_amount', pa.float64()), ('payment_method', pa.string()),
+])
+BANK_SCHEMA = pa.schema([
+    ('id', pa.int64()), ('date', pa.date32()), ('description', pa.string()), ('debit', pa.float64()),
+    ('credit', pa.float64()), ('balance', pa.float64()), ('tx_type', pa.string()),
+])
+RECON_SCHEMA = pa.schema([
+    ('date', pa.date32()), ('sales_card', pa.float64()), ('bank_tpa', pa.float64()), ('fees', pa.float64()),
+    ('delta', pa.float64()),
+])
+RECON_PAGE_SCHEMA = pa.schema([('id', pa.int64())] + list(RECON_SCHEMA))
+ANOMALY_SCHEMA = pa.schema([
+    ('id', pa.int64()), ('date', pa.date32()), ('kind', pa.string()), ('subject', pa.string()),
+    ('amount', pa.float64()), ('score', pa.float64()), ('detail', pa.string()),
+])
+PRODUCT_HIT_SCHEMA = pa.schema([('id', pa.int64()), ('name', pa.string()), ('score', pa.float64())])
+BANK_HIT_SCHEMA = pa.schema(list(BANK_SCHEMA) + [('score', pa.float64())])
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Best supported media type for an Accept header; JSON when nothing matches."""
+    choices = []
+    for position, part in enumerate((accept or '').split(',')):
+        media, _, params = part.strip().partition(';')
+        media = ALIASES.get(media.strip().lower(), media.strip().lower())
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media in SUPPORTED and q > 0:
+            choices.append((-q, position, media))
+    return min(choices)[2] if choices else JSON
+
+
+def _column(values: List, field: pa.Field) -> pa.Array:
+    if pa.types.is_date32(field.type):
+        return pc.strptime(pa.array(values, pa.string()), format='%Y-%m-%d', unit='s').cast(pa.date32())
+    if pa.types.is_string(field.type):
+        values = [v if v is None or isinstance(v, str) else json.dumps(v) for v in values]
+    return pa.array(values, field.type)
+
+
+def to_arrow(rows: List[Dict], schema: pa.Schema) -> pa.Table:
+    """Rows as a table of exactly `schema`, also when there are none."""
+    return pa.Table.from_arrays([_column([r.get(f.name) for r in rows], f) for f in schema], schema=schema)
+
+
+def arrow_ipc(rows: List[Dict], schema: pa.Schema) -> bytes:
+    table = to_arrow(rows, schema)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encoded(request: Request, payload: Union[List[Dict], Dict], schema: pa.Schema) -> Response:
+    """Encode rows, or a {'items', 'next_cursor'} page, in the format the client accepts.
+
+    `schema` is the Arrow schema of one row; JSON and MessagePack ignore it.
+    """
+    media = negotiate(request.headers.get('accept'))
+    headers = {'Vary': 'Accept'}
+    if media == MSGPACK:
+        return Response(msgpack.packb(payload, use_bin_type=True), media_type=MSGPACK, headers=headers)
+    if media == ARROW:
+        rows = payload
+        if isinstance(payload, dict):
+            rows = payload['items']
+            if payload.get('next_cursor'):
+                headers['X-Next-Cursor'] = payload['next_cursor']
+        return Response(arrow_ipc(rows, schema), media_type=ARROW, headers=headers)
+    return ORJSONResponse(payload, headers=headers)
@@ -1,29 +1,47 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from ..database import get_db
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_read_db
+from .formats import DAILY_SCHEMA, encoded
 from ..services.metrics import kpi_summary, kpi_daily, kpi_top_customers, kpi_top_products
+from ..services.timeseries import kpi_range
 
 router = APIRouter(prefix="/kpi", tags=["kpi"])
 
 
 @router.get('/summary')
-async def summary(month: str, db: Session = Depends(get_db)):
-    res = kpi_summary(db, month)
+async def summary(month: str, db: AsyncSession = Depends(get_async_read_db)):
+    res = await db.run_sync(kpi_summary, month)
     if not res:
         raise HTTPException(status_code=404, detail="No data")
     return res
 
 
 @router.get('/daily')
-async def daily(month: str, db: Session = Depends(get_db)):
-    return kpi_daily(db, month)
+async def daily(month: str, request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    return encoded(request, await db.run_sync(kpi_daily, month), DAILY_SCHEMA)
 
 
 @router.get('/top-customers')
-async def top_customers(month: str, limit: int = 10, db: Session = Depends(get_db)):
-    return kpi_top_customers(db, month, limit)
+async def top_customers(month: str, limit: int = 10, db: AsyncSession = Depends(get_async_read_db)):
+    return await db.run_sync(kpi_top_customers, month, limit)
 
 
 @router.get('/top-products')
-async def top_products(month: str, limit: int = 10, db: Session = Depends(get_db)):
-    return kpi_top_products(db, month, limit)
+async def top_products(month: str, limit: int = 10, db: AsyncSession = Depends(get_async_read_db)):
+    return await db.run_sync(kpi_top_products, month, limit)
+
+
+@router.get('/range')
+async def range_series(start: date, end: date, bucket: str = 'month', compare: str = 'previous',
+                       db: AsyncSession = Depends(get_async_read_db)):
+    """Gross/net/VAT/card/cash per day, week or month over [start, end].
+
+    compare=previous diffs each bucket against the one before it (MoM, WoW);
+    compare=year against the same bucket a year earlier (YoY).
+    """
+    try:
+        return await db.run_sync(kpi_range, start, end, bucket, compare)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
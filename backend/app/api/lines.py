@@ -0,0 +1,32 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_read_db
+from .formats import BANK_SCHEMA, SALES_SCHEMA, encoded
+from ..services.lines import sales_lines, bank_lines, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+router = APIRouter(prefix="/lines", tags=["lines"])
+
+
+@router.get('/sales')
+async def sales(month: str, request: Request,
+                limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None,
+                payment_method: Optional[str] = None, vat_rate: Optional[float] = None,
+                db: AsyncSession = Depends(get_async_read_db)):
+    try:
+        page = await db.run_sync(sales_lines, month, limit, cursor, payment_method, vat_rate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return encoded(request, page, SALES_SCHEMA)
+
+
+@router.get('/bank')
+async def bank(month: str, request: Request,
+               limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None,
+               tx_type: Optional[str] = None, db: AsyncSession = Depends(get_async_read_db)):
+    try:
+        page = await db.run_sync(bank_lines, month, limit, cursor, tx_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return encoded(request, page, BANK_SCHEMA)
@@ -1,11 +1,21 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from ..database import get_db
-from ..services.metrics import anomalies
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_read_db
+from .formats import ANOMALY_SCHEMA, encoded
+from ..services.lines import anomaly_lines, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter(prefix="/quality", tags=["quality"])
 
 
 @router.get('/anomalies')
-async def get_anomalies(month: str, db: Session = Depends(get_db)):
-    return anomalies(db, month)
+async def get_anomalies(month: str, request: Request,
+                        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None,
+                        kind: Optional[str] = None, db: AsyncSession = Depends(get_async_read_db)):
+    """Findings recorded at ingest (duplicates, invoice gaps, negative lines, outliers), keyset-paginated."""
+    try:
+        page = await db.run_sync(anomaly_lines, month, limit, cursor, kind)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return encoded(request, page, ANOMALY_SCHEMA)
@@ -1,11 +1,32 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from ..database import get_db
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_db
+from .formats import RECON_PAGE_SCHEMA, RECON_SCHEMA, encoded
 from ..services.metrics import reconciliation
+from ..services.lines import recon_lines, recon_has_rows, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter(prefix="/recon", tags=["recon"])
 
 
 @router.get('/card')
-async def recon_card(month: str, db: Session = Depends(get_db)):
-    return reconciliation(db, month)
+async def recon_card(month: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    return encoded(request, await db.run_sync(reconciliation, month), RECON_SCHEMA)
+
+
+@router.get('/card/page')
+async def recon_card_page(month: str, request: Request,
+                          limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                          cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    """Keyset-paginated view over the cached reconciliation rows.
+
+    The cache is filled on the first page if /recon/card has not run for the month yet.
+    """
+    if not cursor and not await db.run_sync(recon_has_rows, month):
+        await db.run_sync(reconciliation, month)
+    try:
+        page = await db.run_sync(recon_lines, month, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return encoded(request, page, RECON_PAGE_SCHEMA)
@@ -0,0 +1,31 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_read_db
+from .formats import BANK_HIT_SCHEMA, PRODUCT_HIT_SCHEMA, encoded
+from ..services.lines import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from ..services.search import search_products, search_bank
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.get('/products')
+async def products(q: str, request: Request, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                   cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_read_db)):
+    try:
+        page = await db.run_sync(search_products, q, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return encoded(request, page, PRODUCT_HIT_SCHEMA)
+
+
+@router.get('/bank')
+async def bank(q: str, request: Request, month: Optional[str] = None,
+               limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None,
+               db: AsyncSession = Depends(get_async_read_db)):
+    try:
+        page = await db.run_sync(search_bank, q, month, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return encoded(request, page, BANK_HIT_SCHEMA)
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..telemetry import CONTENT_TYPE, registry
+
+router = APIRouter(tags=["telemetry"])
+
+
+@router.get('/metrics', response_class=PlainTextResponse)
+async def metrics():
+    """Counters and histograms of this process in the Prometheus text format."""
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
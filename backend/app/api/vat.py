@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from ..database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_read_db
 from ..services.metrics import vat_report
 import csv
 from io import StringIO
@@ -10,13 +10,13 @@ router = APIRouter(prefix="/vat", tags=["vat"])
 
 
 @router.get('/report')
-async def report(month: str, db: Session = Depends(get_db)):
-    return vat_report(db, month)
+async def report(month: str, db: AsyncSession = Depends(get_async_read_db)):
+    return await db.run_sync(vat_report, month)
 
 
 @router.get('/export')
-async def export_csv(month: str, db: Session = Depends(get_db)):
-    data = vat_report(db, month)
+async def export_csv(month: str, db: AsyncSession = Depends(get_async_read_db)):
+    data = await db.run_sync(vat_report, month)
     si = StringIO()
     writer = csv.DictWriter(si, fieldnames=['vat_rate', 'net', 'vat', 'gross'])
     writer.writeheader()
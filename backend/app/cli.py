@@ -0,0 +1,43 @@
+"""Maintenance commands, run from backend/ (or /app in the container).
+
+    python -m app.cli archive 2024-09            # write Parquet, keep the rows
+    python -m app.cli archive 2024-09 --drop     # write Parquet, delete the rows
+    python -m app.cli anomalies 2024-09          # recompute the month's anomaly findings
+"""
+import argparse
+import json
+from typing import List, Optional
+
+from .database import SessionLocal
+from .services.anomalies import rescan_period
+from .services.archive import archive_period
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m app.cli')
+    commands = parser.add_subparsers(dest='command', required=True)
+    archive = commands.add_parser(
+        'archive', help='archive a closed month to Parquet under ARCHIVE_DIR')
+    archive.add_argument('period', help='closed month as YYYY-MM')
+    archive.add_argument('--drop', action='store_true',
+                         help='delete the archived sales, bank and reconciliation rows from the database')
+    rescan = commands.add_parser(
+        'anomalies', help='recompute the anomaly findings of a month already in the database')
+    rescan.add_argument('period', help='month as YYYY-MM')
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.command == 'archive':
+            result = archive_period(db, args.period, drop=args.drop)
+        else:
+            result = rescan_period(db, args.period)
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        db.close()
+    print(json.dumps(result, indent=1))
+
+
+if __name__ == '__main__':
+    main()
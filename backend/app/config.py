@@ -1,5 +1,21 @@
 import os
-from typing import Optional
+from typing import List, Optional
+
+# Sync driver prefix -> asyncio driver prefix used by the async engine
+_ASYNC_DRIVERS = {
+    "postgresql+psycopg2://": "postgresql+asyncpg://",
+    "postgresql://": "postgresql+asyncpg://",
+    "sqlite://": "sqlite+aiosqlite://",
+    "sqlite+pysqlite://": "sqlite+aiosqlite://",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Return the asyncio-driver equivalent of a sync SQLAlchemy URL."""
+    for sync_prefix, async_prefix in _ASYNC_DRIVERS.items():
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
 
 
 class Settings:
@@ -12,18 +28,73 @@ class Settings:
     def __init__(self) -> None:
         self.app_name: str = os.getenv("APP_NAME", "Finance Assistant")
         self.environment: str = os.getenv("ENV", "dev")
+        # A sqlite:/// URL runs the app embedded on a local file (no DB server)
         self.database_url: str = os.getenv(
             "DATABASE_URL", "postgresql+psycopg2://postgres:postgres@db:5432/finance"
         )
+        # Used by the async engine; derived from DATABASE_URL unless set explicitly
+        self.async_database_url: str = os.getenv(
+            "ASYNC_DATABASE_URL") or to_async_url(self.database_url)
+        # Optional read-only replica for analytics reads; unset = use the primary
+        self.database_replica_url: Optional[str] = os.getenv(
+            "DATABASE_REPLICA_URL") or None
+        self.async_database_replica_url: Optional[str] = os.getenv(
+            "ASYNC_DATABASE_REPLICA_URL") or (
+            to_async_url(self.database_replica_url) if self.database_replica_url else None)
+        # In-memory columnar snapshot of the hot months (services/snapshot.py).
+        # SNAPSHOT_MONTHS overrides the default current+previous month ('MM,MM').
+        self.snapshot_enabled: bool = os.getenv(
+            "SNAPSHOT_ENABLED", "1").lower() not in ("0", "false", "no")
+        self.snapshot_max_mb: int = int(os.getenv("SNAPSHOT_MAX_MB", "256"))
+        self.snapshot_months: Optional[str] = os.getenv("SNAPSHOT_MONTHS") or None
+        self.snapshot_revalidate_seconds: float = float(
+            os.getenv("SNAPSHOT_REVALIDATE_SECONDS", "5"))
+        # Ingest-time anomaly detection (services/anomalies.py)
+        self.anomaly_z_threshold: float = float(os.getenv("ANOMALY_Z_THRESHOLD", "3"))
+        self.anomaly_history_days: int = int(os.getenv("ANOMALY_HISTORY_DAYS", "90"))
         self.llm_api_url: str = os.getenv("LLM_API_URL", "stub://local")
         self.llm_api_key: Optional[str] = os.getenv("LLM_API_KEY")
-        # Preferred model name for OpenAI-compatible LLM providers (e.g., Groq)
-        # Accept either LLM_MODEL or LLM_MODELS (first item if comma-separated)
-        raw_models = os.getenv("LLM_MODEL") or os.getenv(
-            "LLM_MODELS") or "llama-3.3-70b-versatile"
-        self.llm_model: str = (raw_models.split(
-            ",")[0].strip() if raw_models else "llama-3.3-70b-versatile")
+        # Model names for OpenAI-compatible LLM providers (e.g., Groq), in order
+        # of preference: LLM_MODELS (comma-separated) when set, else LLM_MODEL.
+        # The first is the preferred model, the others its fallbacks (llm/router.py)
+        raw_models = os.getenv("LLM_MODELS") or os.getenv(
+            "LLM_MODEL") or "llama-3.3-70b-versatile"
+        self.llm_models: List[str] = [m.strip() for m in raw_models.split(",") if m.strip()] \
+            or ["llama-3.3-70b-versatile"]
+        self.llm_model: str = self.llm_models[0]
+        # Model router: deadline of one model attempt in seconds, hedging a
+        # second model after the first one's p95 latency (never sooner than
+        # LLM_HEDGE_MIN_MS), and the recent error rate that demotes a model
+        self.llm_attempt_timeout: float = float(os.getenv("LLM_ATTEMPT_TIMEOUT", "20"))
+        self.llm_hedge: bool = os.getenv("LLM_HEDGE", "0").lower() in ("1", "true", "yes")
+        self.llm_hedge_min_ms: float = float(os.getenv("LLM_HEDGE_MIN_MS", "250"))
+        self.llm_model_max_error_rate: float = float(os.getenv("LLM_MODEL_MAX_ERROR_RATE", "0.5"))
+        # Pooled HTTP client for the LLM provider (llm/http.py): split timeouts
+        # in seconds, pool limits, optional HTTP/2
+        self.llm_connect_timeout: float = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+        self.llm_read_timeout: float = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+        self.llm_write_timeout: float = float(os.getenv("LLM_WRITE_TIMEOUT", "10"))
+        self.llm_pool_timeout: float = float(os.getenv("LLM_POOL_TIMEOUT", "5"))
+        self.llm_max_connections: int = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+        self.llm_max_keepalive: int = int(os.getenv("LLM_MAX_KEEPALIVE", "10"))
+        self.llm_keepalive_expiry: float = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+        self.llm_http2: bool = os.getenv("LLM_HTTP2", "0").lower() in ("1", "true", "yes")
+        # Admission control for provider calls (llm/guard.py)
+        self.llm_max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        self.llm_queue_timeout: float = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))
+        self.llm_breaker_failures: int = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+        self.llm_breaker_reset_seconds: float = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+        # /chat/ask-batch: answers in flight per batch, and the largest batch accepted
+        self.llm_batch_concurrency: int = int(os.getenv("LLM_BATCH_CONCURRENCY", "4"))
+        self.llm_batch_max_items: int = int(os.getenv("LLM_BATCH_MAX_ITEMS", "500"))
+        # Cache of provider answers (llm/answer_cache.py): 'memory' (per process),
+        # 'database' (llm_answer_cache table, shared by all processes) or 'off'
+        self.llm_cache_backend: str = os.getenv("LLM_CACHE_BACKEND", "memory").lower()
+        self.llm_cache_ttl_seconds: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+        self.llm_cache_max_entries: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
         self.upload_dir: str = os.getenv("UPLOAD_DIR", "/data/uploads")
+        # Parquet files of archived months (python -m app.cli archive YYYY-MM)
+        self.archive_dir: str = os.getenv("ARCHIVE_DIR", "/data/archive")
         self.alembic_ini: str = os.getenv("ALEMBIC_INI", "/app/alembic.ini")
 
 
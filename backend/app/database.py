@@ -1,10 +1,148 @@
-from sqlalchemy import create_engine
+from typing import Optional
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
 from .config import settings
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+
+def _engine_options(url: str) -> dict:
+    if url.startswith('sqlite'):
+        # Shared across the threadpool / aiosqlite worker thread; wait on locks
+        return {'pool_pre_ping': True, 'connect_args': {'check_same_thread': False, 'timeout': 30}}
+    return {'pool_pre_ping': True}
+
+
+def _configure_sqlite(sync_engine) -> None:
+    """Embedded-mode connection setup.
+
+    WAL lets readers run alongside the ingest writer. The driver's own
+    transaction handling is switched off and BEGIN emitted explicitly, which
+    is what makes SAVEPOINT (Session.begin_nested) work on pysqlite/aiosqlite.
+    """
+    @event.listens_for(sync_engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+    @event.listens_for(sync_engine, 'begin')
+    def _on_begin(conn):
+        conn.exec_driver_sql('BEGIN')
+
+
+engine = create_engine(settings.database_url, **_engine_options(settings.database_url))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+is_embedded = engine.dialect.name == 'sqlite'
+
+# Async path for request handlers. Services stay written against the sync
+# Session API and are executed with AsyncSession.run_sync, which drives the
+# same ORM code over the asyncio driver without blocking the event loop.
+async_engine = create_async_engine(
+    settings.async_database_url, **_engine_options(settings.async_database_url))
+if is_embedded:
+    _configure_sqlite(engine)
+    _configure_sqlite(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False)
+
+# Read path for analytics (KPI, VAT, quality, line listings, chat facts).
+# With DATABASE_REPLICA_URL set these sessions go to a streaming replica whose
+# connections are also marked read-only; otherwise they share the primary.
+if settings.database_replica_url:
+    read_engine = create_engine(
+        settings.database_replica_url, pool_pre_ping=True,
+        connect_args={'options': '-c default_transaction_read_only=on'})
+    async_read_engine = create_async_engine(
+        settings.async_database_replica_url, pool_pre_ping=True,
+        connect_args={'server_settings': {'default_transaction_read_only': 'on'}})
+else:
+    read_engine = engine
+    async_read_engine = async_engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine, autoflush=False, expire_on_commit=False)
+
+_CURRENT_LSN_SQL = text('SELECT CAST(pg_current_wal_lsn() AS text)')
+_REPLAYED_SQL = text(
+    'SELECT pg_last_wal_replay_lsn() >= CAST(CAST(:lsn AS text) AS pg_lsn)')
+
+
+class ReplicaRouter:
+    """Sends reads to the replica unless it has not caught up with the last ingest.
+
+    After a write that dashboards must see (an upload), mark_write records the
+    primary's WAL position. Until the replica reports having replayed past it,
+    read sessions are opened on the primary; the first successful check clears
+    the mark. The mark is per process, which is enough for read-your-upload
+    within one backend instance.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.pending_lsn: Optional[str] = None
+
+    def mark_write(self) -> None:
+        if not self.enabled:
+            return
+        with engine.connect() as conn:
+            self.pending_lsn = conn.execute(_CURRENT_LSN_SQL).scalar()
+
+    def _settle(self, lsn: str, replayed: Optional[bool]) -> bool:
+        # replayed is NULL when the replica is not a standby: keep using the primary
+        if not replayed:
+            return False
+        if self.pending_lsn == lsn:
+            self.pending_lsn = None
+        return True
+
+    def _replayed(self, lsn: str) -> Optional[bool]:
+        with read_engine.connect() as conn:
+            return conn.execute(_REPLAYED_SQL, {'lsn': lsn}).scalar()
+
+    async def _replayed_async(self, lsn: str) -> Optional[bool]:
+        async with async_read_engine.connect() as conn:
+            return (await conn.execute(_REPLAYED_SQL, {'lsn': lsn})).scalar()
+
+    def use_replica(self) -> bool:
+        lsn = self.pending_lsn
+        if not self.enabled or lsn is None:
+            return self.enabled
+        try:
+            return self._settle(lsn, self._replayed(lsn))
+        except Exception:
+            return False
+
+    async def use_replica_async(self) -> bool:
+        lsn = self.pending_lsn
+        if not self.enabled or lsn is None:
+            return self.enabled
+        try:
+            return self._settle(lsn, await self._replayed_async(lsn))
+        except Exception:
+            return False
+
+
+replica_router = ReplicaRouter(enabled=bool(settings.database_replica_url))
+
+
+def init_embedded_db() -> None:
+    """Create the schema on an embedded SQLite database.
+
+    The Alembic migrations are written for PostgreSQL; in embedded mode the
+    tables come straight from the models, plus the two canonical payment
+    methods that migration 0003 seeds.
+    """
+    from .models.models import PaymentMethodDim, PaymentMethod
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        existing = {name for (name,) in db.query(PaymentMethodDim.name)}
+        db.add_all([PaymentMethodDim(name=m.value) for m in (PaymentMethod.CARTAO, PaymentMethod.NUMERARIO)
+                    if m.value not in existing])
+        db.commit()
 
 
 def get_db():
@@ -13,3 +151,23 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    factory = ReadSessionLocal if replica_router.use_replica() else SessionLocal
+    db = factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    factory = AsyncReadSessionLocal if await replica_router.use_replica_async() else AsyncSessionLocal
+    async with factory() as db:
+        yield db
@@ -0,0 +1,169 @@
+"""Cache of provider answers for the chat.
+
+The same few questions are asked about the same month all day, and each
+one is a paid provider call of several seconds. Answers are cached under
+sha256(model, normalized question, sha256 of the facts text sent in the
+prompt). A new ingest changes the facts, hence the key, so stale answers
+are never served; they simply age out under the TTL and size bounds.
+
+Backends (LLM_CACHE_BACKEND):
+
+  memory    per-process LRU with per-entry expiry (default)
+  database  the llm_answer_cache table (migration 0009) on the primary,
+            shared by every backend process; least recently used rows
+            beyond LLM_CACHE_MAX_ENTRIES are pruned when a new key is
+            written
+  off       no caching
+
+Only real provider answers are stored, never the grounded fallback. A
+backend error counts as a miss, so a cache problem never fails a question.
+Hit and miss counters are per process.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import delete, select, update
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.models import LlmAnswerCache
+
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_question(question: str) -> str:
+    """Lower-cased, single-spaced, without trailing punctuation."""
+    return _SPACES.sub(' ', (question or '').lower()).strip().rstrip('?!.').strip()
+
+
+def cache_key(model: str, question: str, facts_text: str) -> str:
+    facts_hash = hashlib.sha256(facts_text.encode()).hexdigest()
+    raw = '\0'.join((model, normalize_question(question), facts_hash))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class MemoryBackend:
+    name = 'memory'
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Tuple[float, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    async def set(self, key: str, answer: str, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class DatabaseBackend:
+    name = 'database'
+
+    def __init__(self, session_factory, max_entries: int):
+        self.session_factory = session_factory
+        self.max_entries = max_entries
+
+    async def get(self, key: str) -> Optional[str]:
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as db:
+            answer = (await db.execute(select(LlmAnswerCache.answer).where(
+                LlmAnswerCache.key == key, LlmAnswerCache.expires_at > now))).scalar()
+            if answer is not None:
+                await db.execute(update(LlmAnswerCache).where(LlmAnswerCache.key == key).values(used_at=now))
+                await db.commit()
+            return answer
+
+    async def set(self, key: str, answer: str, ttl: float) -> None:
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as db:
+            replaced = (await db.execute(delete(LlmAnswerCache).where(LlmAnswerCache.key == key))).rowcount
+            db.add(LlmAnswerCache(key=key, answer=answer, expires_at=now + timedelta(seconds=ttl), used_at=now))
+            await db.flush()
+            if not replaced:
+                await self._prune(db, now - timedelta(seconds=ttl))
+            await db.commit()
+
+    async def _prune(self, db, stale: datetime) -> None:
+        """Drop rows beyond max_entries by recency, and rows unused since `stale`.
+
+        Both walk the used_at index: no COUNT(*) and no scan of expires_at.
+        Equal used_at values are ordered by key, so exactly max_entries rows
+        stay. A row unused for a whole TTL has expired, since it was written
+        no later than it was last used.
+        """
+        excess = (select(LlmAnswerCache.key)
+                  .order_by(LlmAnswerCache.used_at.desc(), LlmAnswerCache.key)
+                  .offset(self.max_entries))
+        await db.execute(delete(LlmAnswerCache).where(
+            (LlmAnswerCache.used_at <= stale) | LlmAnswerCache.key.in_(excess)))
+
+
+class AnswerCache:
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, model: str, question: str, facts_text: str) -> Optional[str]:
+        if self.backend is None:
+            return None
+        try:
+            answer = await self.backend.get(cache_key(model, question, facts_text))
+        except Exception:
+            answer = None
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return answer
+
+    async def put(self, model: str, question: str, facts_text: str, answer: str) -> None:
+        if self.backend is None:
+            return
+        try:
+            await self.backend.set(cache_key(model, question, facts_text), answer, self.ttl)
+        except Exception:
+            pass
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.backend.name if self.backend is not None else 'off',
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+def make_backend():
+    if settings.llm_cache_backend == 'off':
+        return None
+    if settings.llm_cache_backend == 'database':
+        return DatabaseBackend(AsyncSessionLocal, settings.llm_cache_max_entries)
+    return MemoryBackend(settings.llm_cache_max_entries)
+
+
+answer_cache = AnswerCache(make_backend(), settings.llm_cache_ttl_seconds)
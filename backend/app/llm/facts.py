@@ -0,0 +1,175 @@
+"""Month facts behind the chat answers, shared by llm/groq.py and llm/stub.py.
+
+Facts come in groups, each filling some keys of one facts dict:
+
+  totals       gross, vat, net, card, card_share_pct (kpi_summary)
+  vat_rows     vat_rows and their total vat (vat_report)
+  peak         peak_day, peak_gross (kpi_daily)
+  top_product  top_product (kpi_top_products)
+  sales        all of the above plus invoice_count, in one pass (sales_facts)
+  recon        recon_rows, fees_total, delta_sum (reconciliation, on the primary)
+
+MonthFacts resolves groups on demand and memoizes them for the request, so
+a stub intent pays only for what it reads. The LLM prompt needs everything
+and asks for sales + recon.
+
+Resolved groups are also kept per month until the data version changes:
+the same cheap marker the snapshots use (highest sales and bank ids plus the
+archive manifest version), read on the primary once per request that needs
+any facts. Repeated questions about a month therefore run no aggregation
+and no reconciliation writes; an ingest, in this process or another, moves
+the version and the next question recomputes. A cached `sales` group also
+answers the four narrower sales groups.
+"""
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..services.metrics import (kpi_daily, kpi_summary, kpi_top_products, reconciliation, sales_facts,
+                                vat_report)
+from ..services.money import from_cents
+from ..services.snapshot import data_version
+
+SALES_PARTS = ('totals', 'vat_rows', 'peak', 'top_product')
+ALL_FACTS = ('sales', 'recon')
+
+
+def sales_group(sales: Dict) -> Dict:
+    """Facts in currency units from sales_facts output."""
+    peak = sales['peak']
+    return {
+        'gross': from_cents(sales['gross']),
+        'vat': from_cents(sales['vat']),
+        'net': from_cents(sales['net']),
+        'card': from_cents(sales['card']),
+        'card_share_pct': round((sales['card'] / (sales['gross'] or 1)) * 100, 2),
+        'invoice_count': sales['invoice_count'],
+        'peak_day': (peak[0].isoformat() if peak else 'N/A'),
+        'peak_gross': from_cents(peak[1] if peak else 0),
+        'top_product': sales['top_product'] or 'N/A',
+        'vat_rows': [(rate, from_cents(vat)) for rate, vat in sales['vat_rows']],
+    }
+
+
+def recon_group(recon_rows: List[Dict]) -> Dict:
+    return {
+        'recon_rows': recon_rows,
+        'fees_total': float(sum(float(r.get('fees') or 0) for r in recon_rows)),
+        'delta_sum': float(sum(float(r.get('delta') or 0) for r in recon_rows)),
+    }
+
+
+def _totals(db: Session, month: str) -> Dict:
+    s = kpi_summary(db, month)
+    return {
+        'gross': s['total_gross'],
+        'vat': s['total_vat'],
+        'net': s['total_net'],
+        'card': s['card_gross'],
+        'card_share_pct': s['card_share_pct'],
+    }
+
+
+def _vat_rows(db: Session, month: str) -> Dict:
+    rows = vat_report(db, month)
+    return {'vat_rows': [(r['vat_rate'], r['vat']) for r in rows], 'vat': round(sum(r['vat'] for r in rows), 2)}
+
+
+def _peak(db: Session, month: str) -> Dict:
+    # earliest date wins a tie for the peak
+    peak = min(kpi_daily(db, month), key=lambda r: (-r['gross'], r['date']), default=None)
+    return {'peak_day': peak['date'] if peak else 'N/A', 'peak_gross': peak['gross'] if peak else 0.0}
+
+
+def _top_product(db: Session, month: str) -> Dict:
+    top = kpi_top_products(db, month, 1)
+    return {'top_product': top[0]['product'] if top else 'N/A'}
+
+
+_READ_GROUPS = {
+    'totals': _totals,
+    'vat_rows': _vat_rows,
+    'peak': _peak,
+    'top_product': _top_product,
+    'sales': lambda db, month: sales_group(sales_facts(db, month)),
+}
+
+
+class FactsCache:
+    """Resolved fact groups per month, valid for one data version."""
+
+    def __init__(self):
+        self._months: Dict[str, Tuple[Tuple, Dict[str, Dict]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, month: str, version: Tuple, group: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._months.get(month)
+            groups = entry[1] if entry is not None and entry[0] == version else {}
+            values = groups.get(group)
+            if values is None and group in SALES_PARTS:
+                values = groups.get('sales')
+            if values is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return values
+
+    def put(self, month: str, version: Tuple, group: str, values: Dict) -> None:
+        with self._lock:
+            entry = self._months.get(month)
+            if entry is None or entry[0] != version:
+                entry = self._months[month] = (version, {})
+            entry[1][group] = values
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._months.clear()
+
+    def stats(self) -> Dict:
+        return {'months': sorted(self._months), 'hits': self.hits, 'misses': self.misses}
+
+
+facts_cache = FactsCache()
+
+
+class MonthFacts:
+    """Fact groups of one month, resolved on demand and memoized for one request.
+
+    Reconciliation refreshes its cache table on the primary (db); the
+    aggregates are read through read_db.
+    """
+
+    def __init__(self, db: AsyncSession, read_db: AsyncSession, month: str):
+        self.db = db
+        self.read_db = read_db
+        self.month = month
+        self.facts: Dict = {'month': month}
+        self.resolved: set = set()
+        self._version: Optional[Tuple] = None
+
+    async def _compute(self, group: str) -> Dict:
+        if group == 'recon':
+            return recon_group(await self.db.run_sync(reconciliation, self.month))
+        return await self.read_db.run_sync(_READ_GROUPS[group], self.month)
+
+    async def resolve(self, groups: Iterable[str]) -> Dict:
+        """The facts dict with at least the given groups filled in."""
+        missing = [g for g in groups if g not in self.resolved
+                   and not (g in SALES_PARTS and 'sales' in self.resolved)]
+        if not missing:
+            return self.facts
+        if self._version is None:
+            self._version = await self.db.run_sync(data_version)
+        for group in missing:
+            values = facts_cache.get(self.month, self._version, group)
+            if values is None:
+                values = await self._compute(group)
+                facts_cache.put(self.month, self._version, group, values)
+            self.facts.update(values)
+            self.resolved.add(group)
+        return self.facts
@@ -1,86 +1,16 @@
-from typing import List, Dict
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from sqlalchemy.sql import case
-import httpx
-
-from ..models.models import NormalizedSales
+import json
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from ..config import settings
+from .answer_cache import answer_cache, cache_key
+from .guard import CircuitOpen, provider_guard
+from .router import model_router
+from .telemetry import record_answer, record_prompt, record_usage
+from .stub import answer as stub_answer
+from .http import get_client
 
 
-def _month_filter(month: str):
-    return func.to_char(NormalizedSales.date, 'MM') == month
-
-
-def _collect_facts(db: Session, month: str, recon_rows: List[Dict]):
-    card_case = case((NormalizedSales.payment_method ==
-                     'Cartão Multicaixa', NormalizedSales.gross_amount), else_=0)
-
-    summary = (
-        db.query(
-            func.coalesce(func.sum(NormalizedSales.gross_amount),
-                          0).label('gross'),
-            func.coalesce(func.sum(NormalizedSales.vat_amount),
-                          0).label('vat'),
-            func.coalesce(func.sum(NormalizedSales.net_amount),
-                          0).label('net'),
-            func.coalesce(func.sum(card_case), 0).label('card'),
-        )
-        .filter(_month_filter(month))
-        .first()
-    )
-
-    vat_rows = (
-        db.query(
-            NormalizedSales.vat_rate,
-            func.coalesce(func.sum(NormalizedSales.vat_amount),
-                          0).label('vat'),
-        )
-        .filter(_month_filter(month))
-        .group_by(NormalizedSales.vat_rate)
-        .order_by(NormalizedSales.vat_rate)
-        .all()
-    )
-
-    top_prod = (
-        db.query(NormalizedSales.product, func.coalesce(
-            func.sum(NormalizedSales.gross_amount), 0).label('g'))
-        .filter(_month_filter(month))
-        .group_by(NormalizedSales.product)
-        .order_by(func.sum(NormalizedSales.gross_amount).desc())
-        .first()
-    )
-
-    daily_peak = (
-        db.query(NormalizedSales.date, func.coalesce(
-            func.sum(NormalizedSales.gross_amount), 0).label('g'))
-        .filter(_month_filter(month))
-        .group_by(NormalizedSales.date)
-        .order_by(func.sum(NormalizedSales.gross_amount).desc())
-        .first()
-    )
-
-    fees_total = float(sum(float(r.get('fees') or 0) for r in recon_rows))
-    delta_sum = float(sum(float(r.get('delta') or 0) for r in recon_rows))
-
-    facts = {
-        'month': month,
-        'gross': float(getattr(summary, 'gross', 0) or 0),
-        'vat': float(getattr(summary, 'vat', 0) or 0),
-        'net': float(getattr(summary, 'net', 0) or 0),
-        'card': float(getattr(summary, 'card', 0) or 0),
-        'card_share_pct': round((float(getattr(summary, 'card', 0) or 0) / (float(getattr(summary, 'gross', 0) or 1))) * 100, 2),
-        'peak_day': (daily_peak.date.isoformat() if daily_peak else 'N/A'),
-        'peak_gross': float(getattr(daily_peak, 'g', 0) or 0),
-        'top_product': (top_prod.product if top_prod else 'N/A'),
-        'fees_total': fees_total,
-        'delta_sum': delta_sum,
-        'vat_rows': [(float(v[0]), float(v[1])) for v in vat_rows],
-    }
-    return facts
-
-
-async def _call_openai_compatible(model: str, system_prompt: str, user_prompt: str) -> str:
+def _request(model: str, system_prompt: str, user_prompt: str, **extra) -> Tuple[str, Dict, Dict]:
+    """URL, headers and JSON body of an OpenAI-compatible chat completion."""
     url = settings.llm_api_url.rstrip('/') + '/chat/completions' if settings.llm_api_url.endswith(
         '/v1') or settings.llm_api_url.endswith('/openai/v1') or settings.llm_api_url.endswith('/v1/') else settings.llm_api_url.rstrip('/')
     headers = {
@@ -94,12 +24,44 @@ async def _call_openai_compatible(model: str, system_prompt: str, user_prompt: s
             {'role': 'system', 'content': system_prompt},
             {'role': 'user', 'content': user_prompt},
         ],
+        **extra,
     }
-    async with httpx.AsyncClient(timeout=60) as client:
-        resp = await client.post(url, headers=headers, json=payload)
+    return url, headers, payload
+
+
+async def _call_openai_compatible(model: str, system_prompt: str, user_prompt: str) -> str:
+    url, headers, payload = _request(model, system_prompt, user_prompt)
+    record_prompt(model, system_prompt, user_prompt)
+    resp = await get_client().post(url, headers=headers, json=payload)
+    resp.raise_for_status()
+    data = resp.json()
+    record_usage(model, data.get('usage'))
+    return data['choices'][0]['message']['content']
+
+
+async def _stream_openai_compatible(model: str, system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+    """Content deltas of a `stream: true` completion, read from the provider's SSE lines.
+
+    Raises when the stream ends without its `[DONE]` marker, so a connection
+    dropped midway is reported like any other failure.
+    """
+    url, headers, payload = _request(model, system_prompt, user_prompt, stream=True)
+    record_prompt(model, system_prompt, user_prompt)
+    async with get_client().stream('POST', url, headers=headers, json=payload) as resp:
         resp.raise_for_status()
-        data = resp.json()
-        return data['choices'][0]['message']['content']
+        async for line in resp.aiter_lines():
+            if not line.startswith('data:'):
+                continue
+            data = line[5:].strip()
+            if data == '[DONE]':
+                return
+            chunk = json.loads(data)
+            record_usage(model, chunk.get('usage') or (chunk.get('x_groq') or {}).get('usage'))
+            choices = chunk.get('choices') or [{}]
+            content = (choices[0].get('delta') or {}).get('content')
+            if content:
+                yield content
+    raise RuntimeError('completion stream ended before [DONE]')
 
 
 def format_facts_as_text(facts: Dict) -> str:
@@ -131,8 +93,8 @@ def _mentions_recon(text: str) -> bool:
     return any(k in q for k in keywords)
 
 
-async def answer_groq(db: Session, month: str, question: str, recon_rows: List[Dict]) -> str:
-    facts = _collect_facts(db, month, recon_rows)
+def _short_circuit(month: str, question: str, facts: Dict) -> Optional[str]:
+    """Replies that need no model call."""
     # No data short-circuit
     if facts['gross'] == 0 and facts['net'] == 0:
         return "No sales data found for the selected month. Please upload the Excel/PDF and try again."
@@ -143,7 +105,10 @@ async def answer_groq(db: Session, month: str, question: str, recon_rows: List[D
             f"Hi! I'm your finance assistant for {month}. "
             "Ask me about VAT, card vs cash, top products, peak day, or reconciliation."
         )
+    return None
 
+
+def _prompts(question: str, facts: Dict) -> Tuple[str, str]:
     # Build prompts with instruction gating
     system = (
         "You are a finance analyst. Answer ONLY what the user asked for, using the provided facts. "
@@ -161,15 +126,83 @@ async def answer_groq(db: Session, month: str, question: str, recon_rows: List[D
         f"Facts (ground truth):\n{format_facts_as_text(facts)}\n\n"
         f"{recon_note}"
     )
-    # Choose model from settings (backend env), defaulting to Groq's recommended 70B versatile
-    model = getattr(settings, 'llm_model', None) or 'llama-3.3-70b-versatile'
+    return system, user
+
+
+def _model() -> str:
+    # Any model of the chain may answer, so answers are cached per chain
+    return ','.join(model_router.models)
+
+
+def grounded_fallback(facts: Dict) -> str:
+    """Concise summary from the facts alone, used when the provider fails."""
+    return (
+        f"[LLM unavailable] Grounded summary for {facts['month']}: Gross {facts['gross']:.2f}, "
+        f"VAT {facts['vat']:.2f}, Net {facts['net']:.2f}, Card share {facts['card_share_pct']:.2f}%. "
+        f"Peak day {facts['peak_day']} at {facts['peak_gross']:.2f}. "
+        f"Reconciliation delta sum {facts['delta_sum']:.2f}, fees total {facts['fees_total']:.2f}."
+    )
+
+
+def _breaker_open_answer(month: str, question: str, facts: Dict, recon_rows: List[Dict]) -> str:
+    """The stub engine's answer, given at once while the circuit breaker is open."""
+    return "[LLM unavailable] " + stub_answer(month, question, facts, recon_rows)
+
+
+async def answer_groq(month: str, question: str, facts: Dict, recon_rows: Optional[List[Dict]] = None) -> str:
+    reply = _short_circuit(month, question, facts)
+    if reply is not None:
+        record_answer('short_circuit')
+        return reply
+    model, facts_text = _model(), format_facts_as_text(facts)
+    cached = await answer_cache.get(model, question, facts_text)
+    if cached is not None:
+        record_answer('cached')
+        return cached
+    system, user = _prompts(question, facts)
     try:
-        return await _call_openai_compatible(model, system, user)
+        reply = await provider_guard.call(cache_key(model, question, facts_text), lambda: model_router.complete(
+            lambda name: _call_openai_compatible(name, system, user)))
+    except CircuitOpen:
+        record_answer('unavailable')
+        return _breaker_open_answer(month, question, facts, recon_rows or [])
     except Exception:
-        # Fallback: return a concise grounded summary
-        return (
-            f"[LLM unavailable] Grounded summary for {facts['month']}: Gross {facts['gross']:.2f}, "
-            f"VAT {facts['vat']:.2f}, Net {facts['net']:.2f}, Card share {facts['card_share_pct']:.2f}%. "
-            f"Peak day {facts['peak_day']} at {facts['peak_gross']:.2f}. "
-            f"Reconciliation delta sum {facts['delta_sum']:.2f}, fees total {facts['fees_total']:.2f}."
-        )
+        record_answer('fallback')
+        return grounded_fallback(facts)
+    record_answer('provider')
+    await answer_cache.put(model, question, facts_text, reply)
+    return reply
+
+
+async def stream_groq(month: str, question: str, facts: Dict,
+                      recon_rows: Optional[List[Dict]] = None) -> AsyncIterator[str]:
+    """answer_groq token by token. If the stream fails, the grounded summary
+    follows whatever was already relayed."""
+    reply = _short_circuit(month, question, facts)
+    if reply is not None:
+        record_answer('short_circuit')
+        yield reply
+        return
+    model, facts_text = _model(), format_facts_as_text(facts)
+    cached = await answer_cache.get(model, question, facts_text)
+    if cached is not None:
+        record_answer('cached')
+        yield cached
+        return
+    system, user = _prompts(question, facts)
+    tokens = []
+    try:
+        async with provider_guard.slot():
+            async for token in model_router.stream(lambda name: _stream_openai_compatible(name, system, user)):
+                tokens.append(token)
+                yield token
+    except CircuitOpen:
+        record_answer('unavailable')
+        yield _breaker_open_answer(month, question, facts, recon_rows or [])
+        return
+    except Exception:
+        record_answer('fallback')
+        yield ('\n\n' if tokens else '') + grounded_fallback(facts)
+        return
+    record_answer('provider')
+    await answer_cache.put(model, question, facts_text, ''.join(tokens))
@@ -0,0 +1,175 @@
+"""Admission control for provider calls: coalescing, a concurrency limit and a circuit breaker.
+
+- Identical prompts already in flight share one provider call (SingleFlight,
+  keyed like the answer cache). A burst of the same question costs one call.
+- At most LLM_MAX_CONCURRENCY calls run at once. A request waits up to
+  LLM_QUEUE_TIMEOUT seconds for a slot, then gets ProviderBusy.
+- After LLM_BREAKER_FAILURES consecutive failures the breaker opens. For
+  LLM_BREAKER_RESET_SECONDS every request gets CircuitOpen at once, and the
+  chat answers from the stub engine instead of waiting on timeouts. Then a
+  single trial call is let through: success closes the breaker, failure
+  opens it again.
+
+Streamed answers take a slot and report to the breaker but are not
+coalesced.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Optional
+
+from ..config import settings
+
+
+class CircuitOpen(Exception):
+    """The provider is considered down; do not call it."""
+
+
+class ProviderBusy(Exception):
+    """No provider slot became free within LLM_QUEUE_TIMEOUT."""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_running = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return 'open'
+        return 'half_open'
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half_open' and not self.trial_running:
+            self.trial_running = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.trial_running or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self.trial_running:
+                self.opened += 1
+            self.opened_at = time.monotonic()
+        self.trial_running = False
+
+    def stats(self) -> Dict:
+        return {'state': self.state, 'consecutive_failures': self.failures, 'opened': self.opened}
+
+
+class SingleFlight:
+    """Callers with the same key while a call is running await that call's result."""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self.shared = 0
+
+    @staticmethod
+    def _done(future: asyncio.Future) -> None:
+        # mark the exception retrieved even if every waiter was cancelled
+        if not future.cancelled():
+            future.exception()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._calls[key] = future
+            future.add_done_callback(lambda f: self._calls.pop(key, None))
+            future.add_done_callback(self._done)
+        else:
+            self.shared += 1
+        # one caller giving up must not cancel the call the others wait on
+        return await asyncio.shield(future)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+class ProviderGuard:
+    def __init__(self, max_concurrency: int, queue_timeout: float, breaker: CircuitBreaker):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker
+        self.flights = SingleFlight()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+        self.active = 0
+        self.rejected = 0
+
+    def _slots(self) -> asyncio.Semaphore:
+        # a semaphore belongs to one event loop (tests and scripts start their own)
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore, self._loop = asyncio.Semaphore(self.max_concurrency), loop
+        return self._semaphore
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a provider slot for one call, reporting its outcome to the breaker."""
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpen()
+        slots = self._slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), self.queue_timeout)
+        except BaseException as e:
+            # saturation or a cancelled wait says nothing about the provider: release a trial, count nothing
+            self.breaker.trial_running = False
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected += 1
+                raise ProviderBusy() from None
+            raise
+        self.active += 1
+        try:
+            yield
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # cancelled, or the client went away mid-stream: no verdict on the provider
+            self.breaker.trial_running = False
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            self.active -= 1
+            slots.release()
+
+    async def _guarded(self, fn: Callable[[], Awaitable]):
+        async with self.slot():
+            return await fn()
+
+    async def call(self, key: str, fn: Callable[[], Awaitable]):
+        """fn() under the breaker and the concurrency limit, shared with callers of the same key."""
+        return await self.flights.do(key, lambda: self._guarded(fn))
+
+    def stats(self) -> Dict:
+        return {
+            'breaker': self.breaker.stats(),
+            'active': self.active,
+            'max_concurrency': self.max_concurrency,
+            'coalesced': self.flights.shared,
+            'rejected': self.rejected,
+        }
+
+
+provider_guard = ProviderGuard(
+    settings.llm_max_concurrency, settings.llm_queue_timeout,
+    CircuitBreaker(settings.llm_breaker_failures, settings.llm_breaker_reset_seconds))
@@ -0,0 +1,47 @@
+"""Shared HTTP client for the LLM provider.
+
+One httpx.AsyncClient per process, opened and closed by the FastAPI
+lifespan. Its keep-alive pool lets consecutive chat questions reuse the
+same TCP+TLS connection to the provider instead of handshaking on every
+answer. Limits and the connect/read/write/pool timeouts come from the
+LLM_* settings; LLM_HTTP2=1 multiplexes requests over one HTTP/2
+connection where the provider supports it.
+"""
+from typing import Optional
+
+import httpx
+
+from ..config import settings
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(connect=settings.llm_connect_timeout, read=settings.llm_read_timeout,
+                              write=settings.llm_write_timeout, pool=settings.llm_pool_timeout),
+        limits=httpx.Limits(max_connections=settings.llm_max_connections,
+                            max_keepalive_connections=settings.llm_max_keepalive,
+                            keepalive_expiry=settings.llm_keepalive_expiry),
+        http2=settings.llm_http2,
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """The shared client; created on first use when running outside the app lifespan (scripts, tests)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = build_client()
+    return _client
+
+
+async def open_client() -> None:
+    get_client()
+
+
+async def close_client() -> None:
+    """Close pooled connections; called on application shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,193 @@
+"""Routing a completion over the configured models (LLM_MODELS), fastest healthy answer first.
+
+Every model keeps a rolling window of its recent outcomes: latencies of
+successful attempts and the share of failed ones. A completion tries the
+models in configured order, except that a model whose recent error rate
+reached LLM_MODEL_MAX_ERROR_RATE moves behind the healthy ones. Each
+attempt has its own deadline (LLM_ATTEMPT_TIMEOUT), so a slow or
+rate-limited model costs at most that long before the next one is asked.
+
+With LLM_HEDGE on, a second model is also asked once the running attempt
+has taken longer than its model's p95 latency (and at least
+LLM_HEDGE_MIN_MS). The first successful answer wins and the other request
+is cancelled. Hedging needs a latency baseline, so it starts after a
+model's first successes.
+
+A streamed completion falls over to the next model only until its first
+token: text already relayed cannot be taken back. Streams are not hedged.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from ..config import settings
+from .stream import LatencyWindow
+from .telemetry import record_call
+
+
+class ModelTimeout(Exception):
+    """A model did not answer within LLM_ATTEMPT_TIMEOUT."""
+
+
+class ModelStats:
+    """Recent outcomes of one model."""
+
+    def __init__(self, window: int):
+        self.latency = LatencyWindow(window)
+        self._outcomes: deque = deque(maxlen=window)
+        self.timeouts = 0
+
+    def record(self, ok: bool, ms: Optional[float] = None) -> None:
+        self._outcomes.append(ok)
+        if ok:
+            self.latency.record(ms)
+
+    @property
+    def error_rate(self) -> Optional[float]:
+        if not self._outcomes:
+            return None
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def healthy(self, max_error_rate: float, min_samples: int = 4) -> bool:
+        if len(self._outcomes) < min_samples:
+            return True
+        return self.error_rate < max_error_rate
+
+    def summary(self) -> Dict:
+        rate = self.error_rate
+        return {**self.latency.summary(), 'error_rate': round(rate, 4) if rate is not None else None,
+                'timeouts': self.timeouts}
+
+
+class ModelRouter:
+    def __init__(self, models: List[str], attempt_timeout: float, hedge: bool = False,
+                 hedge_min_ms: float = 250, max_error_rate: float = 0.5, window: int = 100):
+        self.models = list(models)
+        self.attempt_timeout = attempt_timeout
+        self.hedge = hedge
+        self.hedge_min_ms = hedge_min_ms
+        self.max_error_rate = max_error_rate
+        self._stats = {m: ModelStats(window) for m in self.models}
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def order(self) -> List[str]:
+        """Configured order, unhealthy models last."""
+        return sorted(self.models, key=lambda m: not self._stats[m].healthy(self.max_error_rate))
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds to wait on model before asking another one, None to not hedge."""
+        if not self.hedge:
+            return None
+        p95 = self._stats[model].latency.percentile(0.95)
+        if p95 is None:
+            return None
+        return max(p95, self.hedge_min_ms) / 1000
+
+    async def _attempt(self, model: str, call: Callable[[str], Awaitable[str]]) -> str:
+        stats = self._stats[model]
+        started = time.perf_counter()
+        try:
+            text = await asyncio.wait_for(call(model), self.attempt_timeout)
+        except BaseException as e:
+            record_call(model, 'complete', time.perf_counter() - started, e)
+            if isinstance(e, asyncio.TimeoutError):
+                stats.record(False)
+                stats.timeouts += 1
+                raise ModelTimeout(f"{model} did not answer within {self.attempt_timeout:g}s") from None
+            if isinstance(e, Exception):
+                stats.record(False)
+            raise
+        record_call(model, 'complete', time.perf_counter() - started)
+        stats.record(True, round((time.perf_counter() - started) * 1000, 1))
+        return text
+
+    async def complete(self, call: Callable[[str], Awaitable[str]]) -> str:
+        """The first successful call(model), trying the models in order.
+
+        Raises the last model's error when every model failed.
+        """
+        queue = self.order()
+        running: Dict[asyncio.Future, str] = {}
+        hedges = set()
+        error: Optional[BaseException] = None
+        try:
+            while queue or running:
+                if not running:
+                    model = queue.pop(0)
+                    running[asyncio.ensure_future(self._attempt(model, call))] = model
+                delay = self.hedge_delay(next(iter(running.values()))) if queue and len(running) == 1 else None
+                done, _ = await asyncio.wait(running, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # the running attempt is slower than its p95: ask the next model too
+                    model = queue.pop(0)
+                    task = asyncio.ensure_future(self._attempt(model, call))
+                    running[task] = model
+                    hedges.add(task)
+                    self.hedged += 1
+                    continue
+                for task in done:
+                    running.pop(task)
+                    if task.exception() is None:
+                        if task in hedges:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error or RuntimeError('no LLM model configured')
+        finally:
+            for task in running:
+                task.cancel()
+
+    async def stream(self, open_stream: Callable[[str], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Chunks of the first model whose stream starts within the attempt deadline."""
+        error: Optional[BaseException] = None
+        for model in self.order():
+            stats = self._stats[model]
+            started = time.perf_counter()
+            chunks = open_stream(model).__aiter__()
+            try:
+                first = await asyncio.wait_for(chunks.__anext__(), self.attempt_timeout)
+            except StopAsyncIteration:
+                record_call(model, 'stream', time.perf_counter() - started)
+                stats.record(True, round((time.perf_counter() - started) * 1000, 1))
+                return
+            except asyncio.TimeoutError as e:
+                record_call(model, 'stream', time.perf_counter() - started, e)
+                stats.record(False)
+                stats.timeouts += 1
+                error = ModelTimeout(f"{model} did not start answering within {self.attempt_timeout:g}s")
+                continue
+            except Exception as e:
+                record_call(model, 'stream', time.perf_counter() - started, e)
+                stats.record(False)
+                error = e
+                continue
+            try:
+                yield first
+                async for text in chunks:
+                    yield text
+            except BaseException as e:
+                record_call(model, 'stream', time.perf_counter() - started, e)
+                if isinstance(e, Exception):
+                    stats.record(False)
+                raise
+            finally:
+                await chunks.aclose()
+            record_call(model, 'stream', time.perf_counter() - started)
+            stats.record(True, round((time.perf_counter() - started) * 1000, 1))
+            return
+        raise error or RuntimeError('no LLM model configured')
+
+    def stats(self) -> Dict:
+        return {
+            'order': self.order(),
+            'hedge': self.hedge,
+            'hedged': self.hedged,
+            'hedge_wins': self.hedge_wins,
+            'models': {m: s.summary() for m, s in self._stats.items()},
+        }
+
+
+model_router = ModelRouter(settings.llm_models, settings.llm_attempt_timeout, settings.llm_hedge,
+                           settings.llm_hedge_min_ms, settings.llm_model_max_error_rate)
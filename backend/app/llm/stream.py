@@ -0,0 +1,63 @@
+"""Server-sent events for streamed chat answers, and time-to-first-token tracking.
+
+An answer is relayed as `token` events carrying `{"text": ...}` and closed by
+one `done` event with the request's time to first token and total time in
+milliseconds (`error` replaces it if the answer could not be produced). The
+clock starts when the request is received, so fact collection counts
+towards the first token, as it does for the user waiting on it.
+"""
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, Optional
+
+import orjson
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+class LatencyWindow:
+    """The last `size` latencies in milliseconds, summarised as percentiles."""
+
+    def __init__(self, size: int = 500):
+        self._samples: deque = deque(maxlen=size)
+
+    def record(self, ms: float) -> None:
+        self._samples.append(ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self) -> Dict:
+        return {
+            'count': len(self._samples),
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+        }
+
+
+ttft = LatencyWindow()
+
+
+def sse(event: str, data: Dict) -> bytes:
+    return b'event: ' + event.encode() + b'\ndata: ' + orjson.dumps(data) + b'\n\n'
+
+
+async def sse_answer(chunks: AsyncIterator[str], started: float) -> AsyncIterator[bytes]:
+    """Relay answer chunks as SSE; started is the request's time.perf_counter()."""
+    first: Optional[float] = None
+    try:
+        async for text in chunks:
+            if not text:
+                continue
+            if first is None:
+                first = round((time.perf_counter() - started) * 1000, 1)
+                ttft.record(first)
+            yield sse('token', {'text': text})
+    except Exception as e:
+        yield sse('error', {'message': f"Unable to generate chat answer: {e}. "
+                                       "Please ensure data is uploaded for the month."})
+        return
+    yield sse('done', {'ttft_ms': first, 'total_ms': round((time.perf_counter() - started) * 1000, 1)})
@@ -1,7 +1,6 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from sqlalchemy.sql import case
-from ..models.models import NormalizedSales
+import re
+from collections import namedtuple
+from typing import AsyncIterator, Awaitable, Callable, Iterable
 
 REPORT_TEMPLATE = (
     "Monthly Report for {month}: Total gross sales {gross:.2f} with VAT {vat:.2f}. Card share reached {card_share:.2f}%. "
@@ -14,64 +13,7 @@ REPORT_TEMPLATE = (
 )
 
 
-def _facts(db: Session, month: str, recon_rows: list[dict]):
-    summary = db.query(
-        func.coalesce(func.sum(NormalizedSales.gross_amount),
-                      0).label('gross'),
-        func.coalesce(func.sum(NormalizedSales.vat_amount), 0).label('vat'),
-        func.coalesce(func.sum(NormalizedSales.net_amount), 0).label('net'),
-        func.count(func.distinct(NormalizedSales.invoice_number)
-                   ).label('invoice_count'),
-        func.coalesce(func.sum(case((NormalizedSales.payment_method == 'Cartão Multicaixa',
-                      NormalizedSales.gross_amount), else_=0)), 0).label('card'),
-    ).filter(func.to_char(NormalizedSales.date, 'MM') == month).first()
-
-    vat_rows = db.query(
-        NormalizedSales.vat_rate,
-        func.coalesce(func.sum(NormalizedSales.vat_amount), 0).label('vat'),
-    ).filter(func.to_char(NormalizedSales.date, 'MM') == month) \
-     .group_by(NormalizedSales.vat_rate) \
-     .order_by(NormalizedSales.vat_rate).all()
-
-    top_prod = db.query(
-        NormalizedSales.product,
-        func.coalesce(func.sum(NormalizedSales.gross_amount), 0).label('g'),
-    ).filter(func.to_char(NormalizedSales.date, 'MM') == month) \
-     .group_by(NormalizedSales.product) \
-     .order_by(func.sum(NormalizedSales.gross_amount).desc()).first()
-
-    daily_peak = db.query(
-        NormalizedSales.date,
-        func.coalesce(func.sum(NormalizedSales.gross_amount), 0).label('g'),
-    ).filter(func.to_char(NormalizedSales.date, 'MM') == month) \
-     .group_by(NormalizedSales.date) \
-     .order_by(func.sum(NormalizedSales.gross_amount).desc()).first()
-
-    fees_total = float(sum(float(r.get('fees') or 0) for r in recon_rows))
-    delta_sum = float(sum(float(r.get('delta') or 0) for r in recon_rows))
-
-    gross = float(getattr(summary, 'gross', 0) or 0)
-    card = float(getattr(summary, 'card', 0) or 0)
-    card_share = (card / (gross or 1)) * 100.0
-
-    return {
-        'gross': gross,
-        'vat': float(getattr(summary, 'vat', 0) or 0),
-        'net': float(getattr(summary, 'net', 0) or 0),
-        'invoice_count': int(getattr(summary, 'invoice_count', 0) or 0),
-        'card': card,
-        'card_share': card_share,
-        'top_product': (top_prod.product if top_prod else 'N/A'),
-        'peak_day': (daily_peak.date.isoformat() if daily_peak else 'N/A'),
-        'peak_gross': float(getattr(daily_peak, 'g', 0) or 0),
-        'fees_total': fees_total,
-        'delta_sum': delta_sum,
-        'vat_rows': [(float(v[0]), float(v[1])) for v in vat_rows],
-    }
-
-
-def monthly_report(db: Session, month: str, recon_rows: list[dict]):
-    f = _facts(db, month, recon_rows)
+def monthly_report(month: str, f: dict):
     vat_breakdown = ', '.join(
         [f"{int(v[0])}%: {float(v[1]):.2f}" for v in f['vat_rows']])
     return REPORT_TEMPLATE.format(
@@ -79,7 +21,7 @@ def monthly_report(db: Session, month: str, recon_rows: list[dict]):
         gross=f['gross'],
         vat=f['vat'],
         net=f['net'],
-        card_share=f['card_share'],
+        card_share=f['card_share_pct'],
         peak_day=f['peak_day'],
         peak_gross=f['peak_gross'],
         top_product=f['top_product'],
@@ -89,40 +31,27 @@ def monthly_report(db: Session, month: str, recon_rows: list[dict]):
         vat_breakdown=vat_breakdown,
     )
 
-# Chat answer stub grounded: intent-based responses kept minimal unless asked
+# Chat answer stub grounded: intent-based responses kept minimal unless asked.
+#
+# Routing scans the question once with a keyword automaton compiled at import
+# (a lookahead alternation, so overlapping keywords such as "iva" in "private"
+# are all reported). Each intent names the fact groups of llm/facts.py it
+# reads; only those are resolved, so a greeting runs no query and a VAT
+# question only the VAT aggregate.
 
+Intent = namedtuple('Intent', 'name test needs handler')
 
-def _is_greeting(q: str) -> bool:
-    greetings = ['hi', 'hello', 'hey', 'ola', 'olá', 'oi',
-                 'good morning', 'good afternoon', 'good evening']
-    return any(q == g or q.startswith(g + ' ') for g in greetings)
+_GREETING = re.compile(r'^(?:hi|hello|hey|ola|olá|oi|good morning|good afternoon|good evening)(?: |$)')
+_KEYWORDS = ('vat', 'iva', 'card', 'cash', 'multicaixa', 'top', 'product', 'peak', 'max', 'best', 'day',
+             'why', 'explain', 'delta', 'report', 'monthly', 'summary', 'overview')
+_KEYWORD_SCAN = re.compile('(?=(' + '|'.join(sorted(_KEYWORDS, key=len, reverse=True)) + '))')
 
 
-def _mentions_vat(q: str) -> bool:
-    return ('vat' in q) or ('iva' in q)
+def _keywords(q: str) -> frozenset:
+    return frozenset(m.group(1) for m in _KEYWORD_SCAN.finditer(q))
 
 
-def _mentions_card_cash(q: str) -> bool:
-    return ('card' in q) or ('cash' in q) or ('multicaixa' in q)
-
-
-def _mentions_top_product(q: str) -> bool:
-    return ('top product' in q) or ('top' in q and 'product' in q)
-
-
-def _mentions_peak_day(q: str) -> bool:
-    return ('peak' in q) or (('max' in q) and ('day' in q)) or (('best' in q) and ('day' in q))
-
-
-def _mentions_recon_explain(q: str) -> bool:
-    return (('why' in q) or ('explain' in q)) and ('delta' in q)
-
-
-def _mentions_report(q: str) -> bool:
-    return ('report' in q) or ('monthly' in q) or ('summary' in q) or ('overview' in q)
-
-
-def _handle_greeting(month: str) -> str:
+def _handle_greeting(month: str, facts: dict) -> str:
     return (f"Hi! I'm your finance assistant for {month}. "
             "Ask me about VAT, card vs cash, top products, peak day, or reconciliation.")
 
@@ -136,7 +65,7 @@ def _handle_vat(month: str, facts: dict) -> str:
 
 def _handle_card_cash(month: str, facts: dict) -> str:
     return (
-        f"Card vs Cash ({month}): Card {facts['card']:.2f} which is {facts['card_share']:.2f}% of gross {facts['gross']:.2f}."
+        f"Card vs Cash ({month}): Card {facts['card']:.2f} which is {facts['card_share_pct']:.2f}% of gross {facts['gross']:.2f}."
     )
 
 
@@ -148,8 +77,8 @@ def _handle_peak_day(month: str, facts: dict) -> str:
     return f"Peak sales day in {month}: {facts['peak_day']} with gross {facts['peak_gross']:.2f}."
 
 
-def _handle_recon_explain(month: str, recon_rows: list[dict]) -> str:
-    largest = sorted(recon_rows, key=lambda r: abs(
+def _handle_recon_explain(month: str, facts: dict) -> str:
+    largest = sorted(facts['recon_rows'], key=lambda r: abs(
         r['delta']), reverse=True)[:3]
     if not largest:
         return f"No reconciliation rows found for {month}."
@@ -160,24 +89,52 @@ def _handle_recon_explain(month: str, recon_rows: list[dict]) -> str:
     return "Reconciliation mismatches: " + '; '.join(parts)
 
 
-def answer(db: Session, month: str, question: str, recon_rows: list[dict]):
+def _handle_default(month: str, facts: dict) -> str:
+    # Default: brief contextual response — just a compact summary
+    return (f"{month} summary available. Ask for VAT, card vs cash, top products, peak day, or a monthly report.")
+
+
+# Checked in order; the first match answers
+INTENTS = (
+    Intent('vat', lambda k: 'vat' in k or 'iva' in k, ('vat_rows',), _handle_vat),
+    Intent('card_cash', lambda k: bool(k & {'card', 'cash', 'multicaixa'}), ('totals',), _handle_card_cash),
+    Intent('top_product', lambda k: 'top' in k and 'product' in k, ('top_product', 'peak'), _handle_top_product),
+    Intent('peak_day', lambda k: 'peak' in k or ('day' in k and ('max' in k or 'best' in k)), ('peak',),
+           _handle_peak_day),
+    Intent('recon_explain', lambda k: 'delta' in k and ('why' in k or 'explain' in k), ('recon',),
+           _handle_recon_explain),
+    Intent('report', lambda k: bool(k & {'report', 'monthly', 'summary', 'overview'}), ('sales', 'recon'),
+           lambda month, facts: monthly_report(month, facts)),
+)
+GREETING = Intent('greeting', None, (), _handle_greeting)
+DEFAULT = Intent('default', None, (), _handle_default)
+
+
+def route(question: str) -> Intent:
     q = (question or '').lower().strip()
-    facts = _facts(db, month, recon_rows)
-
-    # Intent routing table to reduce branching complexity
-    routes: list[tuple[callable, callable]] = [
-        (_is_greeting, lambda: _handle_greeting(month)),
-        (_mentions_vat, lambda: _handle_vat(month, facts)),
-        (_mentions_card_cash, lambda: _handle_card_cash(month, facts)),
-        (_mentions_top_product, lambda: _handle_top_product(month, facts)),
-        (_mentions_peak_day, lambda: _handle_peak_day(month, facts)),
-        (_mentions_recon_explain, lambda: _handle_recon_explain(month, recon_rows)),
-        (_mentions_report, lambda: monthly_report(db, month, recon_rows)),
-    ]
+    if _GREETING.match(q):
+        return GREETING
+    found = _keywords(q)
+    return next((i for i in INTENTS if i.test(found)), DEFAULT)
 
-    for predicate, handler in routes:
-        if predicate(q):
-            return handler()
 
-    # Default: brief contextual response — just a compact summary
-    return (f"{month} summary available. Ask for VAT, card vs cash, top products, peak day, or a monthly report.")
+def answer(month: str, question: str, facts: dict, recon_rows: list[dict]):
+    """Answer from fully collected facts (see answer_lazy for the request path)."""
+    return route(question).handler(month, dict(facts, recon_rows=recon_rows))
+
+
+async def answer_lazy(month: str, question: str, resolve: Callable[[Iterable[str]], Awaitable[dict]]) -> str:
+    """Answer resolving only the fact groups the matched intent needs."""
+    intent = route(question)
+    facts = await resolve(intent.needs) if intent.needs else {}
+    return intent.handler(month, facts)
+
+
+_CHUNK = re.compile(r'\S+\s*')
+
+
+async def stream_answer(month: str, question: str,
+                        resolve: Callable[[Iterable[str]], Awaitable[dict]]) -> AsyncIterator[str]:
+    """answer_lazy() relayed word by word, through the same streaming interface as llm/groq.stream_groq."""
+    for chunk in _CHUNK.findall(await answer_lazy(month, question, resolve)):
+        yield chunk
@@ -0,0 +1,94 @@
+"""Telemetry of provider calls and chat answers, exposed by GET /metrics.
+
+  llm_call_duration_seconds  one provider request (one model attempt), by
+                             model, kind (complete/stream) and outcome:
+                             success, timeout, http_error, error, or
+                             cancelled (a hedge that lost, a client gone)
+  llm_prompt_chars           characters of system + user prompt per request
+  llm_prompt_tokens          prompt tokens per request, from `usage`
+  llm_tokens_total           prompt and completion tokens, from `usage`
+  llm_answers_total          chat answers by how they were produced:
+                             provider, cached, short_circuit, fallback (the
+                             grounded [LLM unavailable] summary) or
+                             unavailable (circuit breaker open)
+
+Streamed completions report `usage` only if the provider includes it in a
+chunk (OpenAI-style `usage` or Groq's `x_groq.usage`).
+"""
+import asyncio
+from typing import Dict, Optional
+
+import httpx
+
+from ..telemetry import registry
+
+CALL_SECONDS = registry.histogram(
+    'llm_call_duration_seconds', 'Latency of one provider request.',
+    (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60), ('model', 'kind', 'outcome'))
+PROMPT_CHARS = registry.histogram(
+    'llm_prompt_chars', 'Characters in the prompt of one provider request.',
+    (500, 1000, 2000, 4000, 8000, 16000, 32000), ('model',))
+PROMPT_TOKENS = registry.histogram(
+    'llm_prompt_tokens', 'Prompt tokens of one provider request, as reported by the provider.',
+    (250, 500, 1000, 2000, 4000, 8000, 16000), ('model',))
+TOKENS = registry.counter(
+    'llm_tokens_total', 'Tokens used, as reported by the provider.', ('model', 'type'))
+ANSWERS = registry.counter(
+    'llm_answers_total', 'Chat answers by how they were produced.', ('outcome',))
+
+
+def call_outcome(error: Optional[BaseException]) -> str:
+    if error is None:
+        return 'success'
+    if isinstance(error, (asyncio.TimeoutError, httpx.TimeoutException)):
+        return 'timeout'
+    if isinstance(error, asyncio.CancelledError) or not isinstance(error, Exception):
+        return 'cancelled'
+    if isinstance(error, httpx.HTTPStatusError):
+        return 'http_error'
+    return 'error'
+
+
+def record_call(model: str, kind: str, seconds: float, error: Optional[BaseException] = None) -> None:
+    CALL_SECONDS.observe(seconds, model=model, kind=kind, outcome=call_outcome(error))
+
+
+def record_prompt(model: str, system: str, user: str) -> None:
+    PROMPT_CHARS.observe(len(system) + len(user), model=model)
+
+
+def record_usage(model: str, usage: Optional[Dict]) -> None:
+    if not usage:
+        return
+    prompt, completion = usage.get('prompt_tokens'), usage.get('completion_tokens')
+    if prompt is not None:
+        PROMPT_TOKENS.observe(prompt, model=model)
+        TOKENS.inc(prompt, model=model, type='prompt')
+    if completion is not None:
+        TOKENS.inc(completion, model=model, type='completion')
+
+
+def record_answer(outcome: str) -> None:
+    ANSWERS.inc(outcome=outcome)
+
+
+def summary() -> Dict:
+    """Per model: requests by outcome, mean successful latency and tokens; answers by outcome."""
+    models: Dict[str, Dict] = {}
+
+    def entry(model: str) -> Dict:
+        return models.setdefault(model, {'calls': {}, 'mean_success_ms': None,
+                                         'prompt_tokens': 0, 'completion_tokens': 0})
+
+    success = {}
+    for (model, kind, outcome), v in CALL_SECONDS.values().items():
+        calls = entry(model)['calls']
+        calls[outcome] = calls.get(outcome, 0) + v['count']
+        if outcome == 'success':
+            n, total = success.get(model, (0, 0.0))
+            success[model] = (n + v['count'], total + v['sum'])
+    for model, (n, total) in success.items():
+        entry(model)['mean_success_ms'] = round(total / n * 1000, 1)
+    for (model, kind), n in TOKENS.values().items():
+        entry(model)[kind + '_tokens'] = int(n)
+    return {'models': models, 'answers': {k[0]: int(n) for k, n in ANSWERS.values().items()}}
@@ -1,13 +1,37 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from .api.files import router as files_router
 from .api.kpi import router as kpi_router
 from .api.vat import router as vat_router
 from .api.quality import router as quality_router
 from .api.recon import router as recon_router
 from .api.chat import router as chat_router
+from .api.lines import router as lines_router
+from .api.exports import router as exports_router
+from .api.search import router as search_router
+from .api.telemetry import router as telemetry_router
+from .database import init_embedded_db, is_embedded, async_engine, async_read_engine
+from .llm.http import open_client, close_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Embedded SQLite mode has no migration step; create the schema on startup
+    if is_embedded:
+        init_embedded_db()
+    await open_client()
+    yield
+    await close_client()
+    # pooled asyncpg connections belong to this event loop
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+
 
-app = FastAPI(title="Finance Assistant")
+app = FastAPI(title="Finance Assistant", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 origins = [
     "https://finance-assistant1.netlify.app","http://localhost:5173"
@@ -27,6 +51,10 @@ app.include_router(vat_router)
 app.include_router(quality_router)
 app.include_router(recon_router)
 app.include_router(chat_router)
+app.include_router(lines_router)
+app.include_router(exports_router)
+app.include_router(search_router)
+app.include_router(telemetry_router)
 
 
 @app.get("/")
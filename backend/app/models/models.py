@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, Date, DateTime, Float, Numeric, Text, Enum, Index
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, SmallInteger, BigInteger, String, Date, DateTime, Float, Text, Enum, Index, ForeignKey
+from sqlalchemy.sql import func, extract
 from sqlalchemy.orm import relationship
 from ..database import Base
 import enum
 
 
+def month_of(column):
+    """Month number (1-12) of a date column. The hot tables index this
+    expression so per-month filters are index range conditions."""
+    return extract('month', column)
+
+
 class PaymentMethod(str, enum.Enum):
     CARTAO = "Cartão Multicaixa"
     NUMERARIO = "Numerário"
@@ -18,24 +24,80 @@ class RawSales(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
+# Dimension tables: normalized_sales stores small integer keys into these
+# instead of repeating the text on every line.
+class ProductDim(Base):
+    __tablename__ = 'products'
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), unique=True, nullable=False)
+
+
+class CustomerDim(Base):
+    __tablename__ = 'customers'
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), unique=True, nullable=False)
+
+
+class PaymentMethodDim(Base):
+    __tablename__ = 'payment_methods'
+    # SQLite only auto-assigns keys to INTEGER PRIMARY KEY columns
+    id = Column(SmallInteger().with_variant(Integer, 'sqlite'), primary_key=True)
+    name = Column(String(50), unique=True, nullable=False)
+
+
+# Trigram index for /search/products (migration 0008, when pg_trgm is available)
+Index('ix_products_name_trgm', ProductDim.name, postgresql_using='gin',
+      postgresql_ops={'name': 'gin_trgm_ops'}).ddl_if(dialect='postgresql')
+
+
 class NormalizedSales(Base):
     __tablename__ = 'normalized_sales'
     id = Column(Integer, primary_key=True)
     date = Column(Date, index=True, nullable=False)
     invoice_number = Column(String(100), index=True, nullable=False)
-    customer = Column(String(255), default="Consumidor Final")
-    product = Column(String(255), nullable=False)
+    customer_id = Column(Integer, ForeignKey('customers.id'))
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
     quantity = Column(Float, nullable=False)
-    unit_price_net = Column(Numeric(18, 2), nullable=False)
+    # Money columns hold integer cents (see services/money.py)
+    unit_price_net_cents = Column(BigInteger, nullable=False)
     vat_rate = Column(Float, nullable=False)  # 0,5,7,14
-    net_amount = Column(Numeric(18, 2), nullable=False)
-    vat_amount = Column(Numeric(18, 2), nullable=False)
-    gross_amount = Column(Numeric(18, 2), nullable=False)
-    payment_method = Column(String(50), nullable=False)
+    net_cents = Column(BigInteger, nullable=False)
+    vat_cents = Column(BigInteger, nullable=False)
+    gross_cents = Column(BigInteger, nullable=False)
+    payment_method_id = Column(SmallInteger, ForeignKey(
+        'payment_methods.id'), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
 Index('idx_sales_month', NormalizedSales.date)
+# Month-prefixed indexes matched to the KPI and keyset query shapes. The
+# INCLUDE columns let PostgreSQL answer them with index-only scans.
+Index('ix_sales_month_date_id', month_of(NormalizedSales.date), NormalizedSales.date, NormalizedSales.id,
+      postgresql_include=['payment_method_id', 'net_cents', 'vat_cents', 'gross_cents'])
+Index('ix_sales_pm_month_date_id', NormalizedSales.payment_method_id, month_of(NormalizedSales.date),
+      NormalizedSales.date, NormalizedSales.id, postgresql_include=['gross_cents'])
+Index('ix_sales_vat_month_date_id', NormalizedSales.vat_rate, month_of(NormalizedSales.date),
+      NormalizedSales.date, NormalizedSales.id)
+Index('ix_sales_month_product', month_of(NormalizedSales.date), NormalizedSales.product_id,
+      postgresql_include=['date', 'gross_cents'])
+Index('ix_sales_month_vat', month_of(NormalizedSales.date), NormalizedSales.vat_rate,
+      postgresql_include=['date', 'net_cents', 'vat_cents', 'gross_cents'])
+
+
+class DailySalesAgg(Base):
+    """Per-day sales totals in cents, refreshed for the affected dates on ingest.
+
+    Backs the date-range endpoint so multi-month views read one row per day
+    instead of scanning normalized_sales.
+    """
+    __tablename__ = 'daily_sales_agg'
+    date = Column(Date, primary_key=True)
+    line_count = Column(Integer, nullable=False)
+    net_cents = Column(BigInteger, nullable=False)
+    vat_cents = Column(BigInteger, nullable=False)
+    gross_cents = Column(BigInteger, nullable=False)
+    card_cents = Column(BigInteger, nullable=False)
+    cash_cents = Column(BigInteger, nullable=False)
 
 
 class BankTx(Base):
@@ -43,21 +105,59 @@ class BankTx(Base):
     id = Column(Integer, primary_key=True)
     date = Column(Date, index=True, nullable=False)
     description = Column(Text, nullable=False)
-    debit = Column(Numeric(18, 2))
-    credit = Column(Numeric(18, 2))
-    balance = Column(Numeric(18, 2))
+    debit_cents = Column(BigInteger)
+    credit_cents = Column(BigInteger)
+    balance_cents = Column(BigInteger)
     # FECHO_TPA, COMISSAO_STC, IVA_COMISSAO, TRANSF_INTERNA, RESERVA, OTHER
     tx_type = Column(String(50), index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
+Index('ix_bank_tx_month_date_id', month_of(BankTx.date), BankTx.date, BankTx.id)
+Index('ix_bank_tx_type_month_date_id', BankTx.tx_type, month_of(BankTx.date), BankTx.date, BankTx.id,
+      postgresql_include=['credit_cents'])
+Index('ix_bank_tx_description_trgm', BankTx.description, postgresql_using='gin',
+      postgresql_ops={'description': 'gin_trgm_ops'}).ddl_if(dialect='postgresql')
+
+
 class ReconciliationCache(Base):
     __tablename__ = 'reconciliation_cache'
     id = Column(Integer, primary_key=True)
     date = Column(Date, index=True, nullable=False)
-    sales_card = Column(Numeric(18, 2), nullable=False)
-    bank_tpa = Column(Numeric(18, 2), nullable=False)
-    fees = Column(Numeric(18, 2), nullable=False)
-    delta = Column(Numeric(18, 2), nullable=False)
+    sales_card_cents = Column(BigInteger, nullable=False)
+    bank_tpa_cents = Column(BigInteger, nullable=False)
+    fees_cents = Column(BigInteger, nullable=False)
+    delta_cents = Column(BigInteger, nullable=False)
     detail_json = Column(Text, nullable=False)  # stores which lines were used
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+Index('ix_recon_month_date_id', month_of(ReconciliationCache.date),
+      ReconciliationCache.date, ReconciliationCache.id)
+
+
+class Anomaly(Base):
+    """Data-quality finding recorded at ingest (see services/anomalies.py)."""
+    __tablename__ = 'anomalies'
+    id = Column(Integer, primary_key=True)
+    date = Column(Date, nullable=False)
+    # duplicate_invoice, duplicate_line, invoice_gap, negative_line, sales_outlier, bank_outlier
+    kind = Column(String(30), nullable=False)
+    subject = Column(String(255), nullable=False)  # invoice number or series, product, tx_type
+    amount_cents = Column(BigInteger)
+    score = Column(Float)  # z-score of outliers
+    detail_json = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+Index('ix_anomalies_month_date_id', month_of(Anomaly.date), Anomaly.date, Anomaly.id)
+Index('ix_anomalies_kind_month_date_id', Anomaly.kind, month_of(Anomaly.date), Anomaly.date, Anomaly.id)
+
+
+class LlmAnswerCache(Base):
+    """Provider answers keyed by model, question and facts (see llm/answer_cache.py)."""
+    __tablename__ = 'llm_answer_cache'
+    key = Column(String(64), primary_key=True)  # sha256 hex
+    answer = Column(Text, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    used_at = Column(DateTime(timezone=True), nullable=False, index=True)
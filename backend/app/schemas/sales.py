@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import date
-from typing import Optional
+from typing import List, Optional
 
 
 class NormalizedSaleBase(BaseModel):
@@ -24,7 +24,17 @@ class NormalizedSale(NormalizedSaleBase):
         from_attributes = True
 
 
+class IngestStage(BaseModel):
+    stage: str
+    wall_ms: float
+    cpu_ms: float
+    rows: Optional[int] = None
+    bytes: Optional[int] = None
+
+
 class UploadResponse(BaseModel):
     sales_rows: int
     bank_rows: int
     month: str
+    total_ms: float = 0.0
+    stages: List[IngestStage] = []
@@ -0,0 +1,261 @@
+"""Anomaly detection over each ingested batch.
+
+ingest_files runs detect_sales and detect_bank on the new lines before they
+are added and stores the findings in the anomalies table, so
+/quality/anomalies is an indexed, keyset-paginated read. Detection looks
+only at the batch plus a bounded window of existing rows:
+
+  duplicate_invoice  invoice number already in the database (a re-upload),
+                     by hash-set membership against the existing keys
+  duplicate_line     same (invoice, product, quantity, gross) more than once
+                     in the batch
+  invoice_gap        missing numbers in an invoice series ('FR 2024/123' is
+                     number 123 of series 'FR 2024/') next to a batch invoice
+  negative_line      sales line with a negative gross amount
+  sales_outlier      product/day gross with |z| >= ANOMALY_Z_THRESHOLD among
+                     that product's daily totals over ANOMALY_HISTORY_DAYS
+  bank_outlier       bank transaction with |z| >= ANOMALY_Z_THRESHOLD among
+                     the amounts of its tx_type over the same window
+
+The z-scores are computed per group with pandas transforms, not row loops.
+`period` excludes a date range from the existing-row queries; rescan_period
+uses it to re-run detection for a month that is already in the database.
+"""
+import json
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.models import Anomaly, NormalizedSales, BankTx, ProductDim
+from .archive import parse_period
+from .money import from_cents
+
+GAP_LOOKBACK_DAYS = 31
+# With the value itself in the sample, |z| can only reach 3 from 11 values on
+MIN_SAMPLES = 11
+IN_CHUNK = 1000
+INVOICE_NUMBER = r'^(.*?)(\d+)\s*$'
+KINDS = ('duplicate_invoice', 'duplicate_line', 'invoice_gap', 'negative_line', 'sales_outlier', 'bank_outlier')
+
+SALES_COLUMNS = ['date', 'invoice_number', 'product', 'product_id', 'quantity', 'gross_cents']
+BANK_COLUMNS = ['date', 'description', 'tx_type', 'amount_cents']
+
+Period = Optional[Tuple[date, date]]
+
+
+def sales_frame(lines: List[Dict], product_ids: Dict[str, int]) -> pd.DataFrame:
+    """Parsed sales lines (parse_excel output) -> detection input."""
+    frame = pd.DataFrame(lines, columns=['date', 'invoice_number', 'product', 'quantity', 'gross_cents'])
+    frame['product_id'] = frame['product'].map(product_ids)
+    return frame[SALES_COLUMNS]
+
+
+def bank_frame(rows: List[Dict]) -> pd.DataFrame:
+    """Parsed bank rows (parse_bank_pdf output) -> detection input, amount = credit - debit."""
+    frame = pd.DataFrame(rows, columns=['date', 'description', 'tx_type', 'debit_cents', 'credit_cents'])
+    frame['tx_type'] = frame['tx_type'].fillna('OTHER')
+    frame['amount_cents'] = (frame['credit_cents'].astype('float64').fillna(0)
+                             - frame['debit_cents'].astype('float64').fillna(0)).astype(np.int64)
+    return frame[BANK_COLUMNS]
+
+
+def _finding(kind: str, day: date, subject, amount=None, score=None, **detail) -> Anomaly:
+    return Anomaly(date=day, kind=kind, subject=str(subject)[:255],
+                   amount_cents=None if amount is None else int(amount),
+                   score=None if score is None else round(float(score), 3),
+                   detail_json=json.dumps(detail, sort_keys=True))
+
+
+def _outside(model, period: Period) -> List:
+    if period is None:
+        return []
+    first, after = period
+    return [or_(model.date < first, model.date >= after)]
+
+
+def _chunks(values: List):
+    for i in range(0, len(values), IN_CHUNK):
+        yield values[i:i + IN_CHUNK]
+
+
+def _zscores(frame: pd.DataFrame, key: str, value: str) -> pd.DataFrame:
+    """Rows of the batch (frame.new) whose value is a z-score outlier within its key group."""
+    groups = frame.groupby(key)[value]
+    mean = groups.transform('mean')
+    std = groups.transform('std', ddof=0)
+    n = groups.transform('size')
+    z = (frame[value] - mean) / std.replace(0, np.nan)
+    flagged = frame['new'] & (n >= MIN_SAMPLES) & (z.abs() >= settings.anomaly_z_threshold)
+    return frame.assign(mean=mean, std=std, n=n, z=z)[flagged]
+
+
+# -- sales -------------------------------------------------------------------
+
+def _duplicate_invoices(db: Session, frame: pd.DataFrame, outside: List) -> List[Anomaly]:
+    invoices = frame['invoice_number'].unique().tolist()
+    existing = set()
+    for chunk in _chunks(invoices):
+        existing.update(inv for (inv,) in db.query(NormalizedSales.invoice_number)
+                        .filter(NormalizedSales.invoice_number.in_(chunk), *outside).distinct())
+    hit = frame[frame['invoice_number'].isin(existing)]
+    grouped = hit.groupby('invoice_number', sort=True).agg(
+        day=('date', 'min'), lines=('gross_cents', 'size'), gross=('gross_cents', 'sum'))
+    return [_finding('duplicate_invoice', r.day, inv, r.gross, lines=int(r.lines))
+            for inv, r in grouped.iterrows()]
+
+
+def _duplicate_lines(frame: pd.DataFrame) -> List[Anomaly]:
+    keys = ['invoice_number', 'product', 'quantity', 'gross_cents']
+    repeated = frame[frame.duplicated(keys, keep=False)]
+    grouped = repeated.groupby(keys, sort=True).agg(day=('date', 'min'), copies=('date', 'size'))
+    return [_finding('duplicate_line', r.day, inv, gross, product=product, quantity=float(qty),
+                     copies=int(r.copies))
+            for (inv, product, qty, gross), r in grouped.iterrows()]
+
+
+def _numbered(invoices: pd.DataFrame) -> pd.DataFrame:
+    """(invoice_number, date) rows with their series and number; unnumbered invoices dropped."""
+    parts = invoices['invoice_number'].astype(str).str.extract(INVOICE_NUMBER)
+    out = invoices.assign(series=parts[0], number=parts[1]).dropna(subset=['number'])
+    return out.astype({'number': np.int64})
+
+
+def _invoice_gaps(db: Session, frame: pd.DataFrame, outside: List) -> List[Anomaly]:
+    batch = _numbered(frame.groupby('invoice_number', as_index=False)['date'].min()).assign(new=True)
+    if batch.empty:
+        return []
+    series = sorted(batch['series'].unique())
+    lo = batch['date'].min() - timedelta(days=GAP_LOOKBACK_DAYS)
+    hi = batch['date'].max() + timedelta(days=GAP_LOOKBACK_DAYS)
+    rows = (db.query(NormalizedSales.invoice_number, func.min(NormalizedSales.date))
+            .filter(NormalizedSales.date >= lo, NormalizedSales.date <= hi, *outside)
+            .group_by(NormalizedSales.invoice_number).all())
+    existing = _numbered(pd.DataFrame(rows, columns=['invoice_number', 'date'])).assign(new=False)
+    existing = existing[existing['series'].isin(series)]
+
+    # Stored gaps next to a batch number are recomputed below (filled, split or unchanged)
+    touched = []
+    for a in db.query(Anomaly).filter(Anomaly.kind == 'invoice_gap', Anomaly.subject.in_(series)):
+        d = json.loads(a.detail_json)
+        numbers = batch.loc[batch['series'] == a.subject, 'number']
+        if numbers.between(d['first_missing'] - 1, d['last_missing'] + 1).any():
+            touched.append(a.id)
+    if touched:
+        db.query(Anomaly).filter(Anomaly.id.in_(touched)).delete(synchronize_session=False)
+
+    numbered = (pd.concat([batch, existing], ignore_index=True)
+                .drop_duplicates(['series', 'number'])
+                .sort_values(['series', 'number'], kind='stable'))
+    findings = []
+    for name, group in numbered.groupby('series', sort=True):
+        number, new = group['number'].to_numpy(), group['new'].to_numpy(dtype=bool)
+        invoice, day = group['invoice_number'].to_numpy(), group['date'].to_numpy()
+        for i in np.flatnonzero((np.diff(number) > 1) & (new[:-1] | new[1:])):
+            findings.append(_finding(
+                'invoice_gap', day[i + 1], name, after=invoice[i], before=invoice[i + 1],
+                missing=int(number[i + 1] - number[i] - 1),
+                first_missing=int(number[i] + 1), last_missing=int(number[i + 1] - 1)))
+    return findings
+
+
+def _negative_lines(frame: pd.DataFrame) -> List[Anomaly]:
+    neg = frame[frame['gross_cents'] < 0]
+    return [_finding('negative_line', d, inv, gross, product=product)
+            for d, inv, gross, product in zip(neg['date'], neg['invoice_number'], neg['gross_cents'], neg['product'])]
+
+
+def _sales_outliers(db: Session, frame: pd.DataFrame, outside: List) -> List[Anomaly]:
+    daily = frame.groupby(['product_id', 'date'], as_index=False).agg(
+        product=('product', 'first'), gross=('gross_cents', 'sum'))
+    lo = daily['date'].min() - timedelta(days=settings.anomaly_history_days)
+    hi = daily['date'].max()
+    rows = []
+    for chunk in _chunks([int(p) for p in daily['product_id'].unique()]):
+        rows += (db.query(NormalizedSales.product_id, NormalizedSales.date, func.sum(NormalizedSales.gross_cents))
+                 .filter(NormalizedSales.product_id.in_(chunk), NormalizedSales.date >= lo,
+                         NormalizedSales.date <= hi, *outside)
+                 .group_by(NormalizedSales.product_id, NormalizedSales.date).all())
+    history = pd.DataFrame(rows, columns=['product_id', 'date', 'gross']).assign(new=False, product=None)
+    # Days already partly in the database are judged on their total after this ingest
+    days = (pd.concat([history, daily.assign(new=True)], ignore_index=True)
+            .groupby(['product_id', 'date'], as_index=False)
+            .agg(gross=('gross', 'sum'), new=('new', 'any'), product=('product', 'first')))
+    days['gross'] = days['gross'].astype('float64')
+    return [_finding('sales_outlier', r.date, r.product, r.gross, r.z, mean=from_cents(round(r.mean)),
+                     std=from_cents(round(r.std)), days=int(r.n))
+            for r in _zscores(days, 'product_id', 'gross').itertuples()]
+
+
+def detect_sales(db: Session, frame: pd.DataFrame, period: Period = None) -> List[Anomaly]:
+    """Findings for a batch of sales lines not yet in the database (or outside `period`)."""
+    if frame.empty:
+        return []
+    outside = _outside(NormalizedSales, period)
+    return (_duplicate_invoices(db, frame, outside) + _duplicate_lines(frame) + _invoice_gaps(db, frame, outside)
+            + _negative_lines(frame) + _sales_outliers(db, frame, outside))
+
+
+# -- bank --------------------------------------------------------------------
+
+def detect_bank(db: Session, frame: pd.DataFrame, period: Period = None) -> List[Anomaly]:
+    """Per-tx_type amount outliers for a batch of bank transactions."""
+    if frame.empty:
+        return []
+    lo = frame['date'].min() - timedelta(days=settings.anomaly_history_days)
+    amount = func.coalesce(BankTx.credit_cents, 0) - func.coalesce(BankTx.debit_cents, 0)
+    rows = (db.query(BankTx.date, BankTx.description, BankTx.tx_type, amount)
+            .filter(BankTx.tx_type.in_(frame['tx_type'].unique().tolist()), BankTx.date >= lo,
+                    BankTx.date <= frame['date'].max(), *_outside(BankTx, period))
+            .all())
+    txs = pd.concat([pd.DataFrame(rows, columns=BANK_COLUMNS).assign(new=False), frame.assign(new=True)],
+                    ignore_index=True)
+    txs['amount_cents'] = txs['amount_cents'].astype('float64')
+    return [_finding('bank_outlier', r.date, r.tx_type, r.amount_cents, r.z, description=r.description,
+                     mean=from_cents(round(r.mean)), std=from_cents(round(r.std)), transactions=int(r.n))
+            for r in _zscores(txs, 'tx_type', 'amount_cents').itertuples()]
+
+
+# -- storage -----------------------------------------------------------------
+
+def store(db: Session, findings: List[Anomaly]) -> int:
+    """Add findings not already stored with the same kind, date, subject, amount and detail (no commit)."""
+    if not findings:
+        return 0
+    days = sorted({f.date for f in findings})
+    seen = set()
+    for chunk in _chunks(days):
+        seen.update(db.query(Anomaly.kind, Anomaly.date, Anomaly.subject, Anomaly.amount_cents, Anomaly.detail_json)
+                    .filter(Anomaly.date.in_(chunk)).all())
+    added = 0
+    for f in findings:
+        key = (f.kind, f.date, f.subject, f.amount_cents, f.detail_json)
+        if key not in seen:
+            seen.add(key)
+            db.add(f)
+            added += 1
+    return added
+
+
+def rescan_period(db: Session, period: str) -> Dict:
+    """Recompute the findings of a month already in the database (e.g. ingested before detection existed)."""
+    first, after = parse_period(period)
+    db.query(Anomaly).filter(Anomaly.date >= first, Anomaly.date < after).delete(synchronize_session=False)
+    sales = (db.query(NormalizedSales.date, NormalizedSales.invoice_number, ProductDim.name,
+                      NormalizedSales.product_id, NormalizedSales.quantity, NormalizedSales.gross_cents)
+             .join(ProductDim, ProductDim.id == NormalizedSales.product_id)
+             .filter(NormalizedSales.date >= first, NormalizedSales.date < after)
+             .order_by(NormalizedSales.date, NormalizedSales.id).all())
+    bank = (db.query(BankTx.date, BankTx.description, BankTx.tx_type, BankTx.debit_cents, BankTx.credit_cents)
+            .filter(BankTx.date >= first, BankTx.date < after)
+            .order_by(BankTx.date, BankTx.id).all())
+    findings = (detect_sales(db, pd.DataFrame(sales, columns=SALES_COLUMNS), (first, after))
+                + detect_bank(db, bank_frame([r._asdict() for r in bank]), (first, after)))
+    added = store(db, findings)
+    db.commit()
+    return {'period': period, 'findings': added, 'by_kind': dict(Counter(f.kind for f in findings))}
@@ -0,0 +1,255 @@
+"""Parquet archive of closed months.
+
+archive_period writes one calendar month (YYYY-MM) of normalized_sales,
+bank_tx and reconciliation_cache to zstd-compressed Parquet under
+ARCHIVE_DIR/<YYYY-MM>/ and can then delete those rows from the database.
+A manifest records which periods were dropped; only dropped periods are
+read back, so a period that is archived but still in the database is
+never counted twice. For the same reason ingest_files refuses files with
+rows in a dropped period.
+
+The metrics services fold dropped periods into their results with the
+arrow_* kernels below (pyarrow.compute, no row loops). The daily_sales_agg
+rollup is left in place, so /kpi/range keeps covering archived months.
+Reconciliation covers live rows only; anomaly findings stored at ingest
+are kept.
+"""
+import json
+import os
+import re
+import time
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.models import (NormalizedSales, BankTx, ReconciliationCache, ProductDim, CustomerDim,
+                             PaymentMethodDim, PaymentMethod)
+
+MANIFEST = 'manifest.json'
+_PERIOD = re.compile(r'^(\d{4})-(\d{2})$')
+
+SALES_SCHEMA = pa.schema([
+    ('id', pa.int64()), ('date', pa.date32()), ('invoice_number', pa.string()),
+    ('customer_id', pa.int64()), ('customer', pa.string()),
+    ('product_id', pa.int64()), ('product', pa.string()),
+    ('quantity', pa.float64()), ('unit_price_net_cents', pa.int64()), ('vat_rate', pa.float64()),
+    ('net_cents', pa.int64()), ('vat_cents', pa.int64()), ('gross_cents', pa.int64()),
+    ('payment_method_id', pa.int64()), ('payment_method', pa.string()),
+])
+BANK_SCHEMA = pa.schema([
+    ('id', pa.int64()), ('date', pa.date32()), ('description', pa.string()),
+    ('debit_cents', pa.int64()), ('credit_cents', pa.int64()), ('balance_cents', pa.int64()),
+    ('tx_type', pa.string()),
+])
+RECON_SCHEMA = pa.schema([
+    ('id', pa.int64()), ('date', pa.date32()), ('sales_card_cents', pa.int64()),
+    ('bank_tpa_cents', pa.int64()), ('fees_cents', pa.int64()), ('delta_cents', pa.int64()),
+    ('detail_json', pa.string()),
+])
+
+
+def parse_period(period: str) -> Tuple[date, date]:
+    """'YYYY-MM' -> (first day, first day of the next month)."""
+    m = _PERIOD.match(period or '')
+    if not m or not 1 <= int(m.group(2)) <= 12:
+        raise ValueError(f"period must be YYYY-MM, got {period!r}")
+    year, month = int(m.group(1)), int(m.group(2))
+    return date(year, month, 1), date(year + month // 12, month % 12 + 1, 1)
+
+
+def _period_dir(period: str) -> str:
+    return os.path.join(settings.archive_dir, period)
+
+
+# -- manifest ----------------------------------------------------------------
+
+_manifest_cache: Dict = {'mtime': None, 'data': {}}
+
+
+def load_manifest() -> Dict[str, Dict]:
+    """Archived periods -> details, re-read only when the file changes."""
+    path = os.path.join(settings.archive_dir, MANIFEST)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    if _manifest_cache['mtime'] != (path, mtime):
+        with open(path) as f:
+            _manifest_cache['data'] = json.load(f).get('periods', {})
+        _manifest_cache['mtime'] = (path, mtime)
+    return _manifest_cache['data']
+
+
+def _save_manifest(periods: Dict[str, Dict]) -> None:
+    os.makedirs(settings.archive_dir, exist_ok=True)
+    path = os.path.join(settings.archive_dir, MANIFEST)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'periods': periods}, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def archive_version() -> Optional[Tuple[str, int]]:
+    """Changes whenever a period is archived or dropped (manifest path and mtime)."""
+    path = os.path.join(settings.archive_dir, MANIFEST)
+    try:
+        return path, os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def dropped_periods(month: str) -> List[str]:
+    """Dropped periods whose month matches a month string 'MM'."""
+    return sorted(p for p, e in load_manifest().items() if e.get('dropped') and p[5:7] == month)
+
+
+# -- writing -----------------------------------------------------------------
+
+def _to_table(rows, schema: pa.Schema) -> pa.Table:
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    return pa.table([pa.array(list(col), type=field.type) for col, field in zip(columns, schema)],
+                    schema=schema)
+
+
+def _write(table: pa.Table, path: str) -> None:
+    tmp = path + '.tmp'
+    pq.write_table(table, tmp, compression='zstd')
+    os.replace(tmp, path)
+
+
+def archive_period(db: Session, period: str, drop: bool = False) -> Dict:
+    """Write a closed month to Parquet and optionally delete it from the database."""
+    first, after = parse_period(period)
+    if first >= date.today().replace(day=1):
+        raise ValueError(f"{period} is not a closed month")
+    periods = dict(load_manifest())
+    if periods.get(period, {}).get('dropped'):
+        raise ValueError(f"{period} is already archived and dropped")
+
+    sales = (
+        db.query(NormalizedSales.id, NormalizedSales.date, NormalizedSales.invoice_number,
+                 NormalizedSales.customer_id, CustomerDim.name, NormalizedSales.product_id, ProductDim.name,
+                 NormalizedSales.quantity, NormalizedSales.unit_price_net_cents, NormalizedSales.vat_rate,
+                 NormalizedSales.net_cents, NormalizedSales.vat_cents, NormalizedSales.gross_cents,
+                 NormalizedSales.payment_method_id, PaymentMethodDim.name)
+        .outerjoin(CustomerDim, CustomerDim.id == NormalizedSales.customer_id)
+        .join(ProductDim, ProductDim.id == NormalizedSales.product_id)
+        .join(PaymentMethodDim, PaymentMethodDim.id == NormalizedSales.payment_method_id)
+        .filter(NormalizedSales.date >= first, NormalizedSales.date < after)
+        .order_by(NormalizedSales.id)
+        .all()
+    )
+    bank = (
+        db.query(BankTx.id, BankTx.date, BankTx.description, BankTx.debit_cents, BankTx.credit_cents,
+                 BankTx.balance_cents, BankTx.tx_type)
+        .filter(BankTx.date >= first, BankTx.date < after)
+        .order_by(BankTx.id)
+        .all()
+    )
+    recon = (
+        db.query(ReconciliationCache.id, ReconciliationCache.date, ReconciliationCache.sales_card_cents,
+                 ReconciliationCache.bank_tpa_cents, ReconciliationCache.fees_cents,
+                 ReconciliationCache.delta_cents, ReconciliationCache.detail_json)
+        .filter(ReconciliationCache.date >= first, ReconciliationCache.date < after)
+        .order_by(ReconciliationCache.id)
+        .all()
+    )
+
+    os.makedirs(_period_dir(period), exist_ok=True)
+    for name, rows, schema in (('normalized_sales', sales, SALES_SCHEMA), ('bank_tx', bank, BANK_SCHEMA),
+                               ('reconciliation_cache', recon, RECON_SCHEMA)):
+        _write(_to_table(rows, schema), os.path.join(_period_dir(period), f'{name}.parquet'))
+
+    entry = {
+        'sales_rows': len(sales), 'bank_rows': len(bank), 'recon_rows': len(recon),
+        'archived_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'dropped': False,
+    }
+    periods[period] = entry
+    _save_manifest(periods)
+    if drop:
+        for model in (NormalizedSales, BankTx, ReconciliationCache):
+            db.query(model).filter(model.date >= first, model.date < after).delete(synchronize_session=False)
+        # Mark dropped before committing: a failed commit is undone below, while
+        # a committed delete must never be left unreadable.
+        periods[period] = dict(entry, dropped=True)
+        _save_manifest(periods)
+        try:
+            db.commit()
+        except Exception:
+            db.rollback()
+            periods[period] = entry
+            _save_manifest(periods)
+            raise
+    return {'period': period, **periods[period]}
+
+
+# -- reading -----------------------------------------------------------------
+
+_tables: Dict[str, Tuple[int, pa.Table]] = {}
+
+
+def _read(period: str, name: str) -> pa.Table:
+    path = os.path.join(_period_dir(period), f'{name}.parquet')
+    mtime = os.stat(path).st_mtime_ns
+    cached = _tables.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, pq.read_table(path))
+        _tables[path] = cached
+    return cached[1]
+
+
+def archived_sales(month: str) -> Optional[pa.Table]:
+    """Sales lines of every dropped period for a month string 'MM', or None."""
+    periods = dropped_periods(month)
+    if not periods:
+        return None
+    return pa.concat_tables([_read(p, 'normalized_sales') for p in periods])
+
+
+def _method_gross(table: pa.Table, method: str) -> pa.Array:
+    return pc.if_else(pc.equal(table['payment_method'], method), table['gross_cents'], pa.scalar(0, pa.int64()))
+
+
+def _sum(values) -> int:
+    return pc.sum(values).as_py() or 0
+
+
+def arrow_summary(table: pa.Table) -> Tuple[int, int, int, int, int]:
+    """(net, vat, gross, card, cash) cents."""
+    return (_sum(table['net_cents']), _sum(table['vat_cents']), _sum(table['gross_cents']),
+            _sum(_method_gross(table, PaymentMethod.CARTAO.value)),
+            _sum(_method_gross(table, PaymentMethod.NUMERARIO.value)))
+
+
+def arrow_daily(table: pa.Table) -> Dict[date, Tuple[int, int, int]]:
+    """date -> (gross, card, cash) cents."""
+    grouped = pa.table({
+        'date': table['date'],
+        'gross': table['gross_cents'],
+        'card': _method_gross(table, PaymentMethod.CARTAO.value),
+        'cash': _method_gross(table, PaymentMethod.NUMERARIO.value),
+    }).group_by('date').aggregate([('gross', 'sum'), ('card', 'sum'), ('cash', 'sum')])
+    return {r['date']: (r['gross_sum'], r['card_sum'], r['cash_sum']) for r in grouped.to_pylist()}
+
+
+def arrow_key_sums(table: pa.Table, key: str) -> Dict[Optional[int], int]:
+    """Dimension key (None for NULL) -> gross cents."""
+    grouped = table.group_by(key).aggregate([('gross_cents', 'sum')])
+    return dict(zip(grouped[key].to_pylist(), grouped['gross_cents_sum'].to_pylist()))
+
+
+def arrow_vat(table: pa.Table) -> Dict[float, Tuple[int, int, int]]:
+    """VAT rate -> (net, vat, gross) cents."""
+    grouped = table.group_by('vat_rate').aggregate(
+        [('net_cents', 'sum'), ('vat_cents', 'sum'), ('gross_cents', 'sum')])
+    return {r['vat_rate']: (r['net_cents_sum'], r['vat_cents_sum'], r['gross_cents_sum'])
+            for r in grouped.to_pylist()}
+
+
+def arrow_invoices(table: pa.Table) -> List[str]:
+    return pc.unique(table['invoice_number']).to_pylist()
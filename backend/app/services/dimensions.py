@@ -0,0 +1,56 @@
+"""Ingest-time resolution of dimension names to surrogate keys."""
+from typing import Dict, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models.models import PaymentMethodDim
+
+
+class DimensionLookup:
+    """In-memory name -> id map for one dimension table.
+
+    Loaded once per ingest; names not seen before are inserted in a single
+    batch, so resolving a file costs one SELECT plus at most one INSERT per
+    dimension instead of a lookup per line.
+    """
+
+    MAX_ATTEMPTS = 5
+
+    def __init__(self, db: Session, model):
+        self.db = db
+        self.model = model
+        self.ids: Dict[str, int] = dict(
+            db.query(model.name, model.id).all())
+
+    def resolve(self, names: Iterable[str]) -> Dict[str, int]:
+        missing = {n for n in names if n is not None and n not in self.ids}
+        attempts = 0
+        while missing:
+            attempts += 1
+            try:
+                with self.db.begin_nested():
+                    self.db.add_all([self.model(name=n)
+                                    for n in sorted(missing)])
+            except IntegrityError:
+                # a concurrent ingest inserted some of them and the whole batch
+                # was rolled back: take their ids below, insert the rest again
+                if attempts >= self.MAX_ATTEMPTS:
+                    raise
+            self.ids.update(
+                self.db.query(self.model.name, self.model.id)
+                .filter(self.model.name.in_(missing))
+                .all()
+            )
+            missing -= self.ids.keys()
+        return self.ids
+
+
+def payment_method_id(name: str):
+    """Scalar subquery for the surrogate key of a payment method name.
+
+    Uncorrelated, so the database evaluates it once per statement and the
+    surrounding filter/CASE compares small integers row by row.
+    """
+    return select(PaymentMethodDim.id).where(PaymentMethodDim.name == name).scalar_subquery()
@@ -0,0 +1,81 @@
+"""Line-level CSV exports streamed from a server-side cursor.
+
+The query runs with yield_per, which on PostgreSQL opens a named
+(server-side) cursor and on every driver fetches EXPORT_CHUNK_ROWS rows at
+a time. Each batch is formatted to CSV, optionally gzip-compressed, and
+handed to the response before the next one is fetched, so memory stays at
+one batch whatever the size of the month.
+
+The generators open their own session: they are consumed after the
+endpoint has returned, while the body is being sent, so they cannot use
+the request-scoped one.
+"""
+import csv
+import io
+import zlib
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models.models import NormalizedSales, BankTx, ReconciliationCache
+from .lines import sales_query, bank_query, recon_query, sales_item, bank_item, recon_item
+
+EXPORT_CHUNK_ROWS = 2000
+
+SALES_FIELDS = ['id', 'date', 'invoice_number', 'customer', 'product', 'quantity', 'unit_price_net',
+                'vat_rate', 'net_amount', 'vat_amount', 'gross_amount', 'payment_method']
+BANK_FIELDS = ['id', 'date', 'description', 'debit', 'credit', 'balance', 'tx_type']
+RECON_FIELDS = ['id', 'date', 'sales_card', 'bank_tpa', 'fees', 'delta']
+
+
+def csv_chunks(q, model, fields: List[str], item: Callable[..., Dict]) -> Iterator[bytes]:
+    """Header, then one UTF-8 CSV chunk per batch of rows, in (date, id) order."""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=fields)
+    writer.writeheader()
+    rows = iter(q.order_by(model.date, model.id).yield_per(EXPORT_CHUNK_ROWS))
+    while True:
+        batch = list(islice(rows, EXPORT_CHUNK_ROWS))
+        writer.writerows(item(r) for r in batch)
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+        if len(batch) < EXPORT_CHUNK_ROWS:
+            return
+
+
+def gzip_chunks(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Compress a byte stream into a single gzip member as it goes."""
+    z = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
+def _export(session_factory: Callable[[], Session], build, model, fields, item, compress: bool) -> Iterator[bytes]:
+    db = session_factory()
+    try:
+        chunks = csv_chunks(build(db), model, fields, item)
+        yield from gzip_chunks(chunks) if compress else chunks
+    finally:
+        db.close()
+
+
+def export_sales(session_factory: Callable[[], Session], month: str, payment_method: Optional[str] = None,
+                 vat_rate: Optional[float] = None, compress: bool = False) -> Iterator[bytes]:
+    return _export(session_factory, lambda db: sales_query(db, month, payment_method, vat_rate),
+                   NormalizedSales, SALES_FIELDS, sales_item, compress)
+
+
+def export_bank(session_factory: Callable[[], Session], month: str, tx_type: Optional[str] = None,
+                compress: bool = False) -> Iterator[bytes]:
+    return _export(session_factory, lambda db: bank_query(db, month, tx_type),
+                   BankTx, BANK_FIELDS, bank_item, compress)
+
+
+def export_recon(session_factory: Callable[[], Session], month: str, compress: bool = False) -> Iterator[bytes]:
+    return _export(session_factory, lambda db: recon_query(db, month),
+                   ReconciliationCache, RECON_FIELDS, recon_item, compress)
@@ -0,0 +1,98 @@
+"""Per-stage timing of uploads: wall and CPU time, rows and bytes.
+
+An upload goes through these stages, each timed on its own:
+
+  upload_copy          request files copied to UPLOAD_DIR (bytes of both)
+  detect_excel_months  month scan of the workbook
+  detect_bank_months   month scan of the statement
+  parse_excel          workbook -> sales lines
+  parse_bank_pdf       statement -> bank transactions
+  resolve_dimensions   product/customer/payment-method keys (rows: distinct names)
+  detect_anomalies     checks of the new lines against stored ones (rows: findings)
+  write_rows           ORM objects built and flushed, i.e. the INSERTs
+  store_anomalies      new findings added (rows: findings stored)
+  refresh_daily_agg    rollup rows recomputed (rows: days)
+  commit               transaction commit
+
+CPU time is the ingesting thread's own (time.thread_time), so a wall time
+well above it means waiting: on the database, on disk, or for the GIL.
+Every stage is recorded in the Prometheus metrics (GET /metrics), the
+upload response lists its stages, and the last RECENT_UPLOADS uploads are
+kept for GET /files/timings.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from ..telemetry import registry
+
+RECENT_UPLOADS = 50
+
+STAGE_SECONDS = registry.histogram(
+    'ingest_stage_duration_seconds', 'Wall time of one ingestion stage.',
+    (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120), ('stage',))
+STAGE_CPU_SECONDS = registry.histogram(
+    'ingest_stage_cpu_seconds', 'CPU time of the ingesting thread in one ingestion stage.',
+    (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120), ('stage',))
+STAGE_ROWS = registry.counter(
+    'ingest_stage_rows_total', 'Rows produced or written by an ingestion stage.', ('stage',))
+STAGE_BYTES = registry.counter(
+    'ingest_stage_bytes_total', 'Input bytes read by an ingestion stage.', ('stage',))
+UPLOADS = registry.counter(
+    'ingest_uploads_total', 'Uploads by outcome.', ('outcome',))
+
+
+class StageTimer:
+    """Collects the stages of one ingestion, in the order they ran."""
+
+    def __init__(self):
+        self.stages: List[Dict] = []
+
+    @contextmanager
+    def stage(self, name: str, nbytes: Optional[int] = None):
+        """Time the block; the block may set 'rows' on the yielded record."""
+        record = {'stage': name, 'wall_ms': 0.0, 'cpu_ms': 0.0, 'rows': None, 'bytes': nbytes}
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield record
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+            record['wall_ms'], record['cpu_ms'] = round(wall * 1000, 2), round(cpu * 1000, 2)
+            self.stages.append(record)
+            STAGE_SECONDS.observe(wall, stage=name)
+            STAGE_CPU_SECONDS.observe(cpu, stage=name)
+            if record['rows']:
+                STAGE_ROWS.inc(record['rows'], stage=name)
+            if nbytes:
+                STAGE_BYTES.inc(nbytes, stage=name)
+
+    def total_ms(self) -> float:
+        return round(sum(s['wall_ms'] for s in self.stages), 2)
+
+
+_recent: deque = deque(maxlen=RECENT_UPLOADS)
+_lock = threading.Lock()
+
+
+def record_upload(month: str, files: Dict[str, Dict], timer: StageTimer, outcome: str) -> Dict:
+    """Keep one upload's stages (files: form field -> name and bytes) and count its outcome."""
+    UPLOADS.inc(outcome=outcome)
+    upload = {
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'month': month,
+        'files': files,
+        'outcome': outcome,
+        'total_ms': timer.total_ms(),
+        'stages': timer.stages,
+    }
+    with _lock:
+        _recent.appendleft(upload)
+    return upload
+
+
+def recent_uploads() -> List[Dict]:
+    """Newest first."""
+    with _lock:
+        return list(_recent)
@@ -0,0 +1,206 @@
+"""Line-level drill-down with keyset pagination.
+
+Pages are ordered by (date, id) and continue from an opaque cursor that
+encodes the last row returned, so every page is an index range scan that
+starts where the previous one stopped instead of an OFFSET over all the
+rows before it.
+"""
+import base64
+import json
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from ..models.models import (NormalizedSales, BankTx, ReconciliationCache, Anomaly, ProductDim, CustomerDim,
+                             PaymentMethodDim)
+from .anomalies import KINDS
+from .dimensions import payment_method_id
+from .metrics import month_filter
+from .money import from_cents
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(d: date, row_id: int) -> str:
+    """Encode the (date, id) position of a row as an opaque URL-safe token."""
+    raw = f"{d.isoformat()}:{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    """Decode a token produced by encode_cursor. Raises ValueError when malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        day, row_id = base64.urlsafe_b64decode(padded).decode().split(':')
+        return date.fromisoformat(day), int(row_id)
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {cursor!r}") from e
+
+
+def _page(q, model, limit: int, cursor: Optional[str]) -> Tuple[List, Optional[str]]:
+    """Apply the keyset predicate/order to q and fetch one page plus a lookahead row."""
+    if cursor:
+        after_date, after_id = decode_cursor(cursor)
+        q = q.filter(tuple_(model.date, model.id) > tuple_(after_date, after_id))
+    rows = q.order_by(model.date, model.id).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].date, rows[-1].id)
+    return rows, next_cursor
+
+
+def sales_item(r) -> Dict:
+    """One sales line as returned by the API and written by the exports."""
+    return {
+        'id': r.id,
+        'date': r.date.isoformat(),
+        'invoice_number': r.invoice_number,
+        'customer': r.customer,
+        'product': r.product,
+        'quantity': float(r.quantity),
+        'unit_price_net': from_cents(r.unit_price_net_cents),
+        'vat_rate': float(r.vat_rate),
+        'net_amount': from_cents(r.net_cents),
+        'vat_amount': from_cents(r.vat_cents),
+        'gross_amount': from_cents(r.gross_cents),
+        'payment_method': r.payment_method,
+    }
+
+
+def bank_item(r) -> Dict:
+    """One bank transaction as returned by the API and written by the exports."""
+    return {
+        'id': r.id,
+        'date': r.date.isoformat(),
+        'description': r.description,
+        'debit': from_cents(r.debit_cents),
+        'credit': from_cents(r.credit_cents),
+        'balance': from_cents(r.balance_cents),
+        'tx_type': r.tx_type,
+    }
+
+
+def recon_item(r) -> Dict:
+    """One reconciliation row as returned by the API and written by the exports."""
+    return {
+        'id': r.id,
+        'date': r.date.isoformat(),
+        'sales_card': from_cents(r.sales_card_cents),
+        'bank_tpa': from_cents(r.bank_tpa_cents),
+        'fees': from_cents(r.fees_cents),
+        'delta': from_cents(r.delta_cents),
+    }
+
+
+def anomaly_item(r) -> Dict:
+    """One stored anomaly finding as returned by /quality/anomalies."""
+    return {
+        'id': r.id,
+        'date': r.date.isoformat(),
+        'kind': r.kind,
+        'subject': r.subject,
+        'amount': from_cents(r.amount_cents),
+        'score': r.score,
+        'detail': json.loads(r.detail_json),
+    }
+
+
+def sales_query(db: Session, month: str, payment_method: Optional[str] = None,
+                vat_rate: Optional[float] = None):
+    """normalized_sales lines for the month with dimension names, optionally filtered."""
+    q = (
+        db.query(
+            NormalizedSales.id,
+            NormalizedSales.date,
+            NormalizedSales.invoice_number,
+            CustomerDim.name.label('customer'),
+            ProductDim.name.label('product'),
+            NormalizedSales.quantity,
+            NormalizedSales.unit_price_net_cents,
+            NormalizedSales.vat_rate,
+            NormalizedSales.net_cents,
+            NormalizedSales.vat_cents,
+            NormalizedSales.gross_cents,
+            PaymentMethodDim.name.label('payment_method'),
+        )
+        .join(ProductDim, ProductDim.id == NormalizedSales.product_id)
+        .outerjoin(CustomerDim, CustomerDim.id == NormalizedSales.customer_id)
+        .join(PaymentMethodDim, PaymentMethodDim.id == NormalizedSales.payment_method_id)
+        .filter(month_filter(NormalizedSales.date, month))
+    )
+    if payment_method:
+        q = q.filter(NormalizedSales.payment_method_id ==
+                     payment_method_id(payment_method))
+    if vat_rate is not None:
+        q = q.filter(NormalizedSales.vat_rate == vat_rate)
+    return q
+
+
+def bank_query(db: Session, month: str, tx_type: Optional[str] = None):
+    """bank_tx rows for the month, optionally filtered by tx_type."""
+    q = db.query(BankTx).filter(month_filter(BankTx.date, month))
+    if tx_type:
+        q = q.filter(BankTx.tx_type == tx_type)
+    return q
+
+
+def recon_query(db: Session, month: str):
+    """Cached reconciliation rows for the month."""
+    return db.query(ReconciliationCache).filter(month_filter(ReconciliationCache.date, month))
+
+
+def sales_lines(db: Session, month: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                payment_method: Optional[str] = None, vat_rate: Optional[float] = None) -> Dict:
+    """Page through normalized_sales lines for the month, optionally filtered."""
+    q = sales_query(db, month, payment_method, vat_rate)
+    rows, next_cursor = _page(q, NormalizedSales, limit, cursor)
+    return {
+        'items': [sales_item(r) for r in rows],
+        'next_cursor': next_cursor,
+    }
+
+
+def bank_lines(db: Session, month: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+               tx_type: Optional[str] = None) -> Dict:
+    """Page through bank_tx lines for the month, optionally filtered by tx_type."""
+    rows, next_cursor = _page(bank_query(db, month, tx_type), BankTx, limit, cursor)
+    return {
+        'items': [bank_item(r) for r in rows],
+        'next_cursor': next_cursor,
+    }
+
+
+def recon_has_rows(db: Session, month: str) -> bool:
+    return db.query(ReconciliationCache.id).filter(
+        month_filter(ReconciliationCache.date, month)).first() is not None
+
+
+def recon_lines(db: Session, month: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Dict:
+    """Page through the cached reconciliation rows for the month."""
+    rows, next_cursor = _page(recon_query(db, month), ReconciliationCache, limit, cursor)
+    return {
+        'items': [recon_item(r) for r in rows],
+        'next_cursor': next_cursor,
+    }
+
+
+def anomaly_lines(db: Session, month: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                  kind: Optional[str] = None) -> Dict:
+    """Page through the anomaly findings recorded at ingest for the month, optionally of one kind.
+
+    Raises ValueError for a kind detection never records, rather than returning an empty page.
+    """
+    if kind and kind not in KINDS:
+        raise ValueError(f"unknown anomaly kind: {kind!r}")
+    q = db.query(Anomaly).filter(month_filter(Anomaly.date, month))
+    if kind:
+        q = q.filter(Anomaly.kind == kind)
+    rows, next_cursor = _page(q, Anomaly, limit, cursor)
+    return {
+        'items': [anomaly_item(r) for r in rows],
+        'next_cursor': next_cursor,
+    }
@@ -1,196 +1,66 @@
-from datetime import date
+"""Financial metrics and reconciliation services.
+
+This module provides KPI aggregations and a simple reconciliation between
+card sales and bank FECHO_TPA credits. Uses SQLAlchemy 2.x compatible case().
+Aggregations group and filter on the integer dimension keys of
+normalized_sales; names are joined in only for the rows returned. Money is
+summed as integer cents and converted with from_cents on the way out.
+
+For the hot months the aggregates come from the in-memory snapshot
+(services/snapshot.py) instead; its kernels return rows shaped like the
+queries below, and ties are broken the same way on both paths. Months
+archived to Parquet and dropped from the database (services/archive.py)
+are folded into the SQL results with Arrow kernels; the snapshot loads
+them as rows.
+"""
 from typing import List, Dict, Optional
 
-from sqlalchemy import func
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import case
 
-from ..models.models import NormalizedSales, BankTx, ReconciliationCache
+from ..models.models import NormalizedSales, BankTx, ReconciliationCache, ProductDim, CustomerDim, PaymentMethod, month_of
+from .dimensions import payment_method_id
+from .archive import archived_sales, arrow_summary, arrow_daily, arrow_key_sums, arrow_vat, arrow_invoices
+from .money import from_cents
+from .snapshot import snapshots, Summary, Daily, Top, VatGroup
 
 ALLOWED_VAT = [0, 5, 7, 14]
 
 
-def _month_filter(month: str):
-    """Return a SQLAlchemy expression filtering NormalizedSales.date by month string 'MM'."""
-    return func.to_char(NormalizedSales.date, 'MM') == month
-
-
-def kpi_summary(db: Session, month: str) -> Optional[Dict]:
-    """Return total net, vat, gross and card/cash split for the month."""
-    card_case = case((NormalizedSales.payment_method ==
-                     'Cartão Multicaixa', NormalizedSales.gross_amount), else_=0)
-    cash_case = case((NormalizedSales.payment_method ==
-                     'Numerário', NormalizedSales.gross_amount), else_=0)
-
-    q = (
-        db.query(
-            func.coalesce(func.sum(NormalizedSales.net_amount),
-                          0).label('net'),
-            func.coalesce(func.sum(NormalizedSales.vat_amount),
-                          0).label('vat'),
-            func.coalesce(func.sum(NormalizedSales.gross_amount),
-                          0).label('gross'),
-            func.coalesce(func.sum(card_case), 0).label('card'),
-            func.coalesce(func.sum(cash_case), 0).label('cash'),
-        )
-        .filter(_month_filter(month))
-    )
-
-    res = q.first()
-    if not res or res.gross is None:
-        return None
-
-    gross = float(res.gross)
-    card = float(res.card)
-
-    return {
-        'month': month,
-        'total_net': float(res.net),
-        'total_vat': float(res.vat),
-        'total_gross': gross,
-        'card_gross': card,
-        'cash_gross': float(res.cash),
-        'card_share_pct': round((card / (gross or 1)) * 100, 2),
-    }
-
-
-def kpi_daily(db: Session, month: str) -> List[Dict]:
-    card_case = case((NormalizedSales.payment_method ==
-                     'Cartão Multicaixa', NormalizedSales.gross_amount), else_=0)
-    cash_case = case((NormalizedSales.payment_method ==
-                     'Numerário', NormalizedSales.gross_amount), else_=0)
-
-    rows = (
-        db.query(
-            NormalizedSales.date,
-            func.coalesce(func.sum(NormalizedSales.gross_amount),
-                          0).label('gross'),
-            func.coalesce(func.sum(card_case), 0).label('card'),
-            func.coalesce(func.sum(cash_case), 0).label('cash'),
-        )
-        .filter(_month_filter(month))
-        .group_by(NormalizedSales.date)
-        .order_by(NormalizedSales.date)
-        .all()
-    )
-
-    return [
-        {
-            'date': r.date.isoformat(),
-            'gross': float(r.gross),
-            'card': float(r.card),
-            'cash': float(r.cash),
-        }
-        for r in rows
-    ]
-
-
-def kpi_top_products(db: Session, month: str, limit: int = 10) -> List[Dict]:
-    rows = (
-        db.query(NormalizedSales.product, func.coalesce(
-            func.sum(NormalizedSales.gross_amount), 0).label('gross'))
-        .filter(_month_filter(month))
-        .group_by(NormalizedSales.product)
-        .order_by(func.sum(NormalizedSales.gross_amount).desc())
-        .limit(limit)
-        .all()
-    )
-    return [{'product': r.product, 'gross': float(r.gross)} for r in rows]
-
-
-def kpi_top_customers(db: Session, month: str, limit: int = 10) -> List[Dict]:
-    rows = (
-        db.query(NormalizedSales.customer, func.coalesce(
-            func.sum(NormalizedSales.gross_amount), 0).label('gross'))
-        .filter(_month_filter(month))
-        .group_by(NormalizedSales.customer)
-        .order_by(func.sum(NormalizedSales.gross_amount).desc())
-        .limit(limit)
-        .all()
-    )
-    return [{'customer': r.customer, 'gross': float(r.gross)} for r in rows]
+def month_filter(column, month: str):
+    """Filter expression matching a date column to a month string 'MM'.
 
-
-def vat_report(db: Session, month: str) -> List[Dict]:
-    rows = (
-        db.query(
-            NormalizedSales.vat_rate,
-            func.coalesce(func.sum(NormalizedSales.net_amount),
-                          0).label('net'),
-            func.coalesce(func.sum(NormalizedSales.vat_amount),
-                          0).label('vat'),
-            func.coalesce(func.sum(NormalizedSales.gross_amount),
-                          0).label('gross'),
-        )
-        .filter(_month_filter(month))
-        .group_by(NormalizedSales.vat_rate)
-        .order_by(NormalizedSales.vat_rate)
-        .all()
-    )
-
-    return [
-        {
-            'vat_rate': float(r.vat_rate),
-            'net': float(r.net),
-            'vat': float(r.vat),
-            'gross': float(r.gross),
-        }
-        for r in rows
-    ]
-
-
-def anomalies(db: Session, month: str) -> Dict:
-    # Duplicate invoice numbers (more than 1), negative amounts
-    dup_invoices = (
-        db.query(NormalizedSales.invoice_number,
-                 func.count(NormalizedSales.id).label('cnt'))
-        .filter(_month_filter(month))
-        .group_by(NormalizedSales.invoice_number)
-        .having(func.count(NormalizedSales.id) > 1)
-        .all()
-    )
-
-    negatives = (
-        db.query(NormalizedSales)
-        .filter(_month_filter(month), NormalizedSales.gross_amount < 0)
-        .limit(50)
-        .all()
-    )
-
-    return {
-        'duplicate_invoices': [{'invoice_number': d.invoice_number, 'lines': d.cnt} for d in dup_invoices],
-        'negative_lines': [{'invoice_number': n.invoice_number, 'gross': float(n.gross_amount)} for n in negatives],
-    }
-
-
-"""Financial metrics and reconciliation services.
-
-This module provides KPI aggregations and a simple reconciliation between
-card sales and bank FECHO_TPA credits. Uses SQLAlchemy 2.x compatible case().
-"""
+    Compares EXTRACT(month) with an integer so the month-prefixed indexes
+    apply; an unparsable month matches nothing.
+    """
+    return month_of(column) == (int(month) if month.isdigit() else 0)
 
 
 def _month_filter(month: str):
     """Filter expression for a month string 'MM'."""
-    return func.to_char(NormalizedSales.date, 'MM') == month
+    return month_filter(NormalizedSales.date, month)
 
 
 def _payment_case(method: str):
-    """Helper returning a CASE selecting gross_amount when payment method matches."""
-    return case((NormalizedSales.payment_method == method, NormalizedSales.gross_amount), else_=0)
+    """Helper returning a CASE selecting gross_cents when payment method matches."""
+    return case((NormalizedSales.payment_method_id == payment_method_id(method), NormalizedSales.gross_cents), else_=0)
 
 
 def kpi_summary(db: Session, month: str) -> Optional[Dict]:
-    card_case = _payment_case('Cartão Multicaixa')
-    cash_case = _payment_case('Numerário')
+    snap = snapshots.get(db, month)
+    if snap is not None:
+        return _format_summary(month, snap.summary())
+    card_case = _payment_case(PaymentMethod.CARTAO.value)
+    cash_case = _payment_case(PaymentMethod.NUMERARIO.value)
 
     res = (
         db.query(
-            func.coalesce(func.sum(NormalizedSales.net_amount),
+            func.coalesce(func.sum(NormalizedSales.net_cents),
                           0).label('net'),
-            func.coalesce(func.sum(NormalizedSales.vat_amount),
+            func.coalesce(func.sum(NormalizedSales.vat_cents),
                           0).label('vat'),
-            func.coalesce(func.sum(NormalizedSales.gross_amount),
+            func.coalesce(func.sum(NormalizedSales.gross_cents),
                           0).label('gross'),
             func.coalesce(func.sum(card_case), 0).label('card'),
             func.coalesce(func.sum(cash_case), 0).label('cash'),
@@ -198,28 +68,38 @@ def kpi_summary(db: Session, month: str) -> Optional[Dict]:
         .filter(_month_filter(month))
         .first()
     )
+    archived = archived_sales(month)
+    if archived is not None:
+        res = Summary(*(int(a or 0) + b for a, b in zip(res, arrow_summary(archived))))
+    return _format_summary(month, res)
+
+
+def _format_summary(month: str, res) -> Optional[Dict]:
     if not res or res.gross is None:
         return None
-    gross = float(res.gross)
-    card = float(res.card)
+    gross = int(res.gross)
+    card = int(res.card)
     return {
         'month': month,
-        'total_net': float(res.net),
-        'total_vat': float(res.vat),
-        'total_gross': gross,
-        'card_gross': card,
-        'cash_gross': float(res.cash),
+        'total_net': from_cents(res.net),
+        'total_vat': from_cents(res.vat),
+        'total_gross': from_cents(gross),
+        'card_gross': from_cents(card),
+        'cash_gross': from_cents(res.cash),
         'card_share_pct': round((card / (gross or 1)) * 100, 2),
     }
 
 
-def kpi_daily(db: Session, month: str) -> List[Dict]:
-    card_case = _payment_case('Cartão Multicaixa')
-    cash_case = _payment_case('Numerário')
+def _daily_rows(db: Session, month: str):
+    snap = snapshots.get(db, month)
+    if snap is not None:
+        return snap.daily()
+    card_case = _payment_case(PaymentMethod.CARTAO.value)
+    cash_case = _payment_case(PaymentMethod.NUMERARIO.value)
     rows = (
         db.query(
             NormalizedSales.date,
-            func.coalesce(func.sum(NormalizedSales.gross_amount),
+            func.coalesce(func.sum(NormalizedSales.gross_cents),
                           0).label('gross'),
             func.coalesce(func.sum(card_case), 0).label('card'),
             func.coalesce(func.sum(cash_case), 0).label('cash'),
@@ -229,58 +109,101 @@ def kpi_daily(db: Session, month: str) -> List[Dict]:
         .order_by(NormalizedSales.date)
         .all()
     )
+    archived = archived_sales(month)
+    if archived is None:
+        return rows
+    merged = {r.date: [int(r.gross), int(r.card), int(r.cash)] for r in rows}
+    for day, values in arrow_daily(archived).items():
+        acc = merged.setdefault(day, [0, 0, 0])
+        for i, v in enumerate(values):
+            acc[i] += v
+    return [Daily(day, *merged[day]) for day in sorted(merged)]
+
+
+def kpi_daily(db: Session, month: str) -> List[Dict]:
+    rows = _daily_rows(db, month)
     return [
         {
             'date': r.date.isoformat(),
-            'gross': float(r.gross),
-            'card': float(r.card),
-            'cash': float(r.cash),
+            'gross': from_cents(r.gross),
+            'card': from_cents(r.card),
+            'cash': from_cents(r.cash),
         }
         for r in rows
     ]
 
 
-def kpi_top_products(db: Session, month: str, limit: int = 10) -> List[Dict]:
-    rows = (
+def _top_by(db: Session, month: str, key_col, dim, limit: int):
+    """Top-N gross by a dimension key; names are joined only for the N winners.
+
+    Equal totals are ordered by key (NULL last) so the result is deterministic.
+    """
+    snap = snapshots.get(db, month)
+    if snap is not None:
+        return snap.top_by(key_col.key, limit)
+    archived = archived_sales(month)
+    if archived is not None:
+        return _merged_top_by(db, month, key_col, dim, limit, archived)
+    top = (
         db.query(
-            NormalizedSales.product,
-            func.coalesce(func.sum(NormalizedSales.gross_amount),
+            key_col.label('key'),
+            func.coalesce(func.sum(NormalizedSales.gross_cents),
                           0).label('gross'),
         )
         .filter(_month_filter(month))
-        .group_by(NormalizedSales.product)
-        .order_by(func.sum(NormalizedSales.gross_amount).desc())
+        .group_by(key_col)
+        .order_by(func.sum(NormalizedSales.gross_cents).desc(), key_col.asc().nulls_last())
         .limit(limit)
+        .subquery()
+    )
+    return (
+        db.query(dim.name, top.c.gross)
+        .select_from(top)
+        .outerjoin(dim, dim.id == top.c.key)
+        .order_by(top.c.gross.desc(), top.c.key.asc().nulls_last())
         .all()
     )
-    return [{'product': r.product, 'gross': float(r.gross)} for r in rows]
 
 
-def kpi_top_customers(db: Session, month: str, limit: int = 10) -> List[Dict]:
-    rows = (
-        db.query(
-            NormalizedSales.customer,
-            func.coalesce(func.sum(NormalizedSales.gross_amount),
-                          0).label('gross'),
-        )
+def _merged_top_by(db: Session, month: str, key_col, dim, limit: int, archived):
+    """_top_by over live rows plus archived periods: full per-key sums, ranked here."""
+    sums = dict(
+        db.query(key_col, func.sum(NormalizedSales.gross_cents))
         .filter(_month_filter(month))
-        .group_by(NormalizedSales.customer)
-        .order_by(func.sum(NormalizedSales.gross_amount).desc())
-        .limit(limit)
+        .group_by(key_col)
         .all()
     )
-    return [{'customer': r.customer, 'gross': float(r.gross)} for r in rows]
+    sums = {k: int(v) for k, v in sums.items()}
+    for key, gross in arrow_key_sums(archived, key_col.key).items():
+        sums[key] = sums.get(key, 0) + gross
+    ranked = sorted(sums.items(), key=lambda kv: (-kv[1], kv[0] is None, kv[0] or 0))[:max(limit, 0)]
+    keys = [k for k, _ in ranked if k is not None]
+    names = dict(db.query(dim.id, dim.name).filter(dim.id.in_(keys)).all()) if keys else {}
+    return [Top(names.get(k), gross) for k, gross in ranked]
 
 
-def vat_report(db: Session, month: str) -> List[Dict]:
+def kpi_top_products(db: Session, month: str, limit: int = 10) -> List[Dict]:
+    rows = _top_by(db, month, NormalizedSales.product_id, ProductDim, limit)
+    return [{'product': r.name, 'gross': from_cents(r.gross)} for r in rows]
+
+
+def kpi_top_customers(db: Session, month: str, limit: int = 10) -> List[Dict]:
+    rows = _top_by(db, month, NormalizedSales.customer_id, CustomerDim, limit)
+    return [{'customer': r.name, 'gross': from_cents(r.gross)} for r in rows]
+
+
+def _vat_rows(db: Session, month: str):
+    snap = snapshots.get(db, month)
+    if snap is not None:
+        return snap.vat_groups()
     rows = (
         db.query(
             NormalizedSales.vat_rate,
-            func.coalesce(func.sum(NormalizedSales.net_amount),
+            func.coalesce(func.sum(NormalizedSales.net_cents),
                           0).label('net'),
-            func.coalesce(func.sum(NormalizedSales.vat_amount),
+            func.coalesce(func.sum(NormalizedSales.vat_cents),
                           0).label('vat'),
-            func.coalesce(func.sum(NormalizedSales.gross_amount),
+            func.coalesce(func.sum(NormalizedSales.gross_cents),
                           0).label('gross'),
         )
         .filter(_month_filter(month))
@@ -288,35 +211,117 @@ def vat_report(db: Session, month: str) -> List[Dict]:
         .order_by(NormalizedSales.vat_rate)
         .all()
     )
+    archived = archived_sales(month)
+    if archived is None:
+        return rows
+    merged = {float(r.vat_rate): [int(r.net), int(r.vat), int(r.gross)] for r in rows}
+    for rate, values in arrow_vat(archived).items():
+        acc = merged.setdefault(rate, [0, 0, 0])
+        for i, v in enumerate(values):
+            acc[i] += v
+    return [VatGroup(rate, *merged[rate]) for rate in sorted(merged)]
+
+
+def vat_report(db: Session, month: str) -> List[Dict]:
+    rows = _vat_rows(db, month)
     return [
         {
             'vat_rate': float(r.vat_rate),
-            'net': float(r.net),
-            'vat': float(r.vat),
-            'gross': float(r.gross),
+            'net': from_cents(r.net),
+            'vat': from_cents(r.vat),
+            'gross': from_cents(r.gross),
         }
         for r in rows
     ]
 
 
-def anomalies(db: Session, month: str) -> Dict:
-    dup_invoices = (
-        db.query(NormalizedSales.invoice_number,
-                 func.count(NormalizedSales.id).label('cnt'))
-        .filter(_month_filter(month))
-        .group_by(NormalizedSales.invoice_number)
-        .having(func.count(NormalizedSales.id) > 1)
-        .all()
-    )
-    negatives = (
-        db.query(NormalizedSales)
-        .filter(_month_filter(month), NormalizedSales.gross_amount < 0)
-        .limit(50)
-        .all()
+def _facts_pass(db: Session, month: str):
+    """One GROUP BY (date, vat_rate, product) over the month, folded into every chat figure.
+
+    Returns (net, vat, gross, card) totals, the distinct invoice count (an
+    uncorrelated subquery of the same statement), gross per day, VAT per rate
+    and gross per product key.
+    """
+    invoices = (
+        select(func.count(func.distinct(NormalizedSales.invoice_number)))
+        .where(_month_filter(month))
+        .correlate(None)
+        .scalar_subquery()
     )
+    rows = db.execute(
+        select(
+            NormalizedSales.date,
+            NormalizedSales.vat_rate,
+            NormalizedSales.product_id,
+            func.sum(NormalizedSales.net_cents),
+            func.sum(NormalizedSales.vat_cents),
+            func.sum(NormalizedSales.gross_cents),
+            func.sum(_payment_case(PaymentMethod.CARTAO.value)),
+            invoices,
+        )
+        .where(_month_filter(month))
+        .group_by(NormalizedSales.date, NormalizedSales.vat_rate, NormalizedSales.product_id)
+    ).all()
+    totals = [0, 0, 0, 0]
+    daily: Dict = {}
+    vat_by_rate: Dict[float, int] = {}
+    products: Dict[int, int] = {}
+    for day, rate, product, net, vat, gross, card, _ in rows:
+        net, vat, gross, card = int(net), int(vat), int(gross), int(card)
+        for i, v in enumerate((net, vat, gross, card)):
+            totals[i] += v
+        daily[day] = daily.get(day, 0) + gross
+        vat_by_rate[float(rate)] = vat_by_rate.get(float(rate), 0) + vat
+        products[product] = products.get(product, 0) + gross
+    invoice_count = int(rows[0][7]) if rows else 0
+
+    archived = archived_sales(month)
+    if archived is not None:
+        for i, v in enumerate(arrow_summary(archived)[:4]):
+            totals[i] += v
+        for day, (gross, _, _) in arrow_daily(archived).items():
+            daily[day] = daily.get(day, 0) + gross
+        for rate, (_, vat, _) in arrow_vat(archived).items():
+            vat_by_rate[rate] = vat_by_rate.get(rate, 0) + vat
+        for key, gross in arrow_key_sums(archived, 'product_id').items():
+            products[key] = products.get(key, 0) + gross
+        live = {inv for (inv,) in db.query(NormalizedSales.invoice_number)
+                .filter(_month_filter(month)).distinct()}
+        invoice_count = len(live.union(arrow_invoices(archived)))
+    return Summary(*totals, cash=0), invoice_count, daily, vat_by_rate, products
+
+
+def sales_facts(db: Session, month: str) -> Dict:
+    """Month aggregates behind the chat answers, in integer cents.
+
+    Returns gross/vat/net/card totals, the distinct invoice count, VAT per rate
+    as (rate, vat_cents), the peak day as (date, gross_cents) or None and the
+    name of the top product by gross (None without sales). Outside the
+    snapshot this is a single query (_facts_pass).
+    """
+    snap = snapshots.get(db, month)
+    if snap is not None:
+        summary, invoice_count = snap.summary(), snap.invoice_count()
+        daily = {r.date: r.gross for r in snap.daily()}
+        vat_by_rate = {g.vat_rate: g.vat for g in snap.vat_groups()}
+        top = snap.top_by('product_id', 1)
+        top_product = top[0].name if top else None
+    else:
+        summary, invoice_count, daily, vat_by_rate, products = _facts_pass(db, month)
+        # ties go to the lower key, as in _top_by
+        best = min(products.items(), key=lambda kv: (-kv[1], kv[0]), default=None)
+        top_product = db.get(ProductDim, best[0]).name if best else None
+    # earliest date wins a tie for the peak
+    peak = max(daily.items(), key=lambda kv: (int(kv[1]), -kv[0].toordinal()), default=None)
     return {
-        'duplicate_invoices': [{'invoice_number': d.invoice_number, 'lines': d.cnt} for d in dup_invoices],
-        'negative_lines': [{'invoice_number': n.invoice_number, 'gross': float(n.gross_amount)} for n in negatives],
+        'gross': int(summary.gross or 0),
+        'vat': int(summary.vat or 0),
+        'net': int(summary.net or 0),
+        'card': int(summary.card or 0),
+        'invoice_count': int(invoice_count or 0),
+        'vat_rows': [(float(rate), int(vat_by_rate[rate])) for rate in sorted(vat_by_rate)],
+        'peak': (peak[0], int(peak[1])) if peak else None,
+        'top_product': top_product,
     }
 
 
@@ -327,42 +332,50 @@ def reconciliation(db: Session, month: str) -> List[Dict]:
     We store fees as 0 for now (future: derive commissions), delta = sales_card - bank_tpa - fees.
     detail_json contains a compact JSON summary.
     """
-    # Daily card sales
-    sales_rows = (
-        db.query(NormalizedSales.date, func.coalesce(
-            func.sum(NormalizedSales.gross_amount), 0).label('card_gross'))
-        .filter(_month_filter(month), NormalizedSales.payment_method == 'Cartão Multicaixa')
-        .group_by(NormalizedSales.date)
-        .all()
-    )
-    # Bank credits
-    bank_rows = (
-        db.query(BankTx.date, func.coalesce(
-            func.sum(BankTx.credit), 0).label('bank_credit'))
-        .filter(BankTx.tx_type == 'FECHO_TPA', func.to_char(BankTx.date, 'MM') == month)
-        .group_by(BankTx.date)
-        .all()
-    )
-    bank_map = {b.date: float(b.bank_credit) for b in bank_rows}
+    snap = snapshots.get(db, month)
+    if snap is not None:
+        sales_rows = snap.card_sales_by_day()
+        bank_rows = snap.tpa_credits_by_day()
+    else:
+        # Daily card sales
+        sales_rows = (
+            db.query(NormalizedSales.date, func.coalesce(
+                func.sum(NormalizedSales.gross_cents), 0).label('total'))
+            .filter(_month_filter(month),
+                    NormalizedSales.payment_method_id == payment_method_id(PaymentMethod.CARTAO.value))
+            .group_by(NormalizedSales.date)
+            .order_by(NormalizedSales.date)
+            .all()
+        )
+        # Bank credits
+        bank_rows = (
+            db.query(BankTx.date, func.coalesce(
+                func.sum(BankTx.credit_cents), 0).label('total'))
+            .filter(BankTx.tx_type == 'FECHO_TPA', month_filter(BankTx.date, month))
+            .group_by(BankTx.date)
+            .all()
+        )
+    bank_map = {b.date: int(b.total) for b in bank_rows}
 
     results: List[Dict] = []
     db.query(ReconciliationCache).filter(ReconciliationCache.date.in_(
         [r.date for r in sales_rows])).delete(synchronize_session=False)
     for s in sales_rows:
-        card = float(s.card_gross)
-        bank = bank_map.get(s.date, 0.0)
-        fees = 0.0  # placeholder
-        delta = round(card - bank - fees, 2)
-        detail_json = f"{{\"card\":{card},\"bank\":{bank},\"fees\":{fees}}}"
+        card = int(s.total)
+        bank = bank_map.get(s.date, 0)
+        fees = 0  # placeholder
+        delta = card - bank - fees
+        detail_json = f"{{\"card\":{from_cents(card)},\"bank\":{from_cents(bank)},\"fees\":{from_cents(fees)}}}"
         cache = ReconciliationCache(
-            date=s.date, sales_card=card, bank_tpa=bank, fees=fees, delta=delta, detail_json=detail_json)
+            date=s.date, sales_card_cents=card, bank_tpa_cents=bank, fees_cents=fees, delta_cents=delta,
+            detail_json=detail_json)
         db.add(cache)
         results.append({
             'date': s.date.isoformat(),
-            'sales_card': card,
-            'bank_tpa': bank,
-            'fees': fees,
-            'delta': delta,
+            'sales_card': from_cents(card),
+            'bank_tpa': from_cents(bank),
+            'fees': from_cents(fees),
+            'delta': from_cents(delta),
         })
     try:
         db.commit()
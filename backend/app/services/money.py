@@ -0,0 +1,48 @@
+"""Money as integer minor units (kwanza cêntimos).
+
+Amounts are stored and aggregated as BIGINT cents; conversion to currency
+units happens only when a value leaves the service layer.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Optional, Union
+
+import numpy as np
+
+CENTS_PER_UNIT = 100
+
+
+def to_cents(value: Union[int, float, str, Decimal, None]) -> Optional[int]:
+    """Exact conversion of an amount in currency units to integer cents (half-up)."""
+    if value is None:
+        return None
+    amount = Decimal(str(value)) * CENTS_PER_UNIT
+    return int(amount.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents: Union[int, Decimal, None]) -> Optional[float]:
+    """Integer cents -> amount in currency units for serialization."""
+    if cents is None:
+        return None
+    return int(cents) / CENTS_PER_UNIT
+
+
+def parse_amount_cents(text: str) -> Optional[int]:
+    """Parse a statement amount such as '1.234,56' or '-80,00' into cents.
+
+    Returns None when the token is not an amount.
+    """
+    s = text.strip().replace('.', '').replace(' ', '').replace(',', '.')
+    if not s:
+        return None
+    try:
+        return to_cents(Decimal(s))
+    except InvalidOperation:
+        return None
+
+
+def percent_of_cents(cents: np.ndarray, rate_pct: np.ndarray) -> np.ndarray:
+    """Vectorized cents * rate% with half-away-from-zero rounding, in int64 math."""
+    cents = cents.astype(np.int64)
+    rate_pct = rate_pct.astype(np.int64)
+    scaled = np.abs(cents) * rate_pct
+    return np.sign(cents) * ((scaled + CENTS_PER_UNIT // 2) // CENTS_PER_UNIT)
@@ -1,11 +1,20 @@
+import numpy as np
 import pandas as pd
 import pdfplumber
 from datetime import datetime, date
-from typing import List, Dict, Any, Set
+from typing import List, Dict, Any, Optional, Set
+import os
 import re
 import json
-from ..models.models import BankTx, NormalizedSales, RawSales
+from ..models.models import BankTx, NormalizedSales, RawSales, ProductDim, CustomerDim, PaymentMethodDim
 from ..database import SessionLocal
+from . import anomalies
+from .archive import load_manifest
+from .dimensions import DimensionLookup
+from .ingest_timing import StageTimer
+from .money import parse_amount_cents, percent_of_cents
+from .snapshot import snapshots
+from .timeseries import refresh_daily_agg
 
 CARD_KEY = "Fecho TPA"
 COMISSAO_KEY = "Comissão"
@@ -75,45 +84,81 @@ def _normalize_payment_method(value: Any) -> str:
     return str(value) if value else 'Numerário'
 
 
+def _column(df: pd.DataFrame, name: str) -> pd.Series:
+    """Column by normalized name, or an all-missing series if the sheet lacks it."""
+    if name in df.columns:
+        return df[name]
+    return pd.Series([None] * len(df), index=df.index, dtype=object)
+
+
+def _map_unique(series: pd.Series, fn) -> pd.Series:
+    """Apply a scalar parser once per distinct value instead of once per line."""
+    uniq = series.drop_duplicates()
+    lookup = {}
+    for v in uniq:
+        try:
+            lookup[v] = fn(v)
+        except Exception:
+            lookup[v] = None
+    return series.map(lookup)
+
+
 def parse_excel(path: str, month: str) -> Dict[str, Any]:
+    """Parse the sales sheet into normalized lines with integer-cent amounts.
+
+    Column conversion and money math are vectorized over the whole sheet:
+    unit prices become int64 cents, net = unit cents * quantity, VAT is an
+    integer percentage of net (half away from zero) and gross = net + VAT,
+    so no float rounding reaches the stored amounts.
+    """
     df = pd.read_excel(
         path, sheet_name='Detalhes de Documentos Emitidos', engine='openpyxl')
     df = df.rename(
         columns={k: v for k, v in excel_col_map.items() if k in df.columns})
-    rows = []
-    for _, r in df.iterrows():
-        try:
-            raw_date = r.get('data_emissao')
-            if pd.isna(raw_date):
-                continue
-            dt = _parse_date(raw_date)
-            if month and dt.strftime('%m') != month:
-                continue
-            vat_rate = _parse_vat_rate(r.get('imposto', 0))
-            if vat_rate not in VAT_RATES_ALLOWED:
-                vat_rate = 14.0 if vat_rate > 0 else 0.0
-            quantity = float(r.get('quantidade', 1) or 1)
-            unit_net = float(r.get('preco_unit_net', 0) or 0)
-            net_amount = round(unit_net * quantity, 2)
-            vat_amount = round(net_amount * (vat_rate/100.0), 2)
-            gross_amount = round(net_amount + vat_amount, 2)
-            line = {
-                'date': dt,
-                'invoice_number': str(r.get('numero') or r.get('documento')),
-                'customer': 'Consumidor Final',
-                'product': str(r.get('artigo')),
-                'quantity': quantity,
-                'unit_price_net': unit_net,
-                'vat_rate': vat_rate,
-                'net_amount': net_amount,
-                'vat_amount': vat_amount,
-                'gross_amount': gross_amount,
-                'payment_method': _normalize_payment_method(r.get('tipo_pagamento')),
-            }
-            rows.append(line)
-        except Exception:
-            continue
-    return {'normalized': rows, 'raw_count': len(df)}
+    raw_count = len(df)
+
+    df = df[_column(df, 'data_emissao').notna()]
+    dates = _map_unique(_column(df, 'data_emissao'), _parse_date)
+    keep = dates.notna()
+    if month:
+        keep &= dates.map(lambda d: d is not None and d.strftime('%m') == month)
+    df, dates = df[keep], dates[keep]
+
+    # Non-numeric quantities/prices invalidate the line; blanks fall back to defaults
+    qty_raw, price_raw = _column(df, 'quantidade'), _column(df, 'preco_unit_net')
+    quantity = pd.to_numeric(qty_raw, errors='coerce')
+    unit_net = pd.to_numeric(price_raw, errors='coerce')
+    valid = ~((quantity.isna() & qty_raw.notna()) | (unit_net.isna() & price_raw.notna()))
+    df, dates = df[valid], dates[valid]
+    quantity = quantity[valid].fillna(1.0).replace(0, 1.0).astype(float)
+    unit_net = unit_net[valid].fillna(0.0).astype(float)
+
+    vat_rate = _map_unique(_column(df, 'imposto'), _parse_vat_rate).fillna(0.0).astype(float)
+    allowed = vat_rate.isin(VAT_RATES_ALLOWED)
+    vat_rate = vat_rate.where(allowed, np.where(vat_rate > 0, 14.0, 0.0))
+
+    unit_cents = np.rint(unit_net.to_numpy() * 100).astype(np.int64)
+    net_cents = np.rint(unit_cents * quantity.to_numpy()).astype(np.int64)
+    vat_cents = percent_of_cents(net_cents, vat_rate.to_numpy())
+    gross_cents = net_cents + vat_cents
+
+    numero, documento = _column(df, 'numero'), _column(df, 'documento')
+    invoice = numero.where(numero.notna() & (numero != ''), documento).map(str)
+
+    out = pd.DataFrame({
+        'date': dates.to_numpy(dtype=object),
+        'invoice_number': invoice.to_numpy(),
+        'customer': 'Consumidor Final',
+        'product': _column(df, 'artigo').map(str).to_numpy(),
+        'quantity': quantity.to_numpy(),
+        'unit_price_net_cents': unit_cents,
+        'vat_rate': vat_rate.to_numpy(),
+        'net_cents': net_cents,
+        'vat_cents': vat_cents,
+        'gross_cents': gross_cents,
+        'payment_method': _map_unique(_column(df, 'tipo_pagamento'), _normalize_payment_method).to_numpy(),
+    })
+    return {'normalized': out.to_dict('records'), 'raw_count': raw_count}
 
 
 bank_patterns = [
@@ -155,13 +200,7 @@ def parse_bank_pdf(path: str, month: str) -> List[Dict[str, Any]]:
                     balance = None
                     # last three tokens guess
                     maybe_vals = parts[-3:]
-                    nums = []
-                    for v in maybe_vals:
-                        v2 = v.replace('.', '').replace(',', '.')
-                        try:
-                            nums.append(float(v2))
-                        except ValueError:
-                            nums.append(None)
+                    nums = [parse_amount_cents(v) for v in maybe_vals]
                     if len(nums) == 3:
                         debit, credit, balance = nums
                     tx_type = 'OTHER'
@@ -172,9 +211,9 @@ def parse_bank_pdf(path: str, month: str) -> List[Dict[str, Any]]:
                     out.append({
                         'date': dt,
                         'description': description,
-                        'debit': debit,
-                        'credit': credit,
-                        'balance': balance,
+                        'debit_cents': debit,
+                        'credit_cents': credit,
+                        'balance_cents': balance,
                         'tx_type': tx_type
                     })
                 except Exception:
@@ -228,17 +267,66 @@ def detect_bank_months(path: str) -> Set[str]:
     return months
 
 
-def ingest_files(excel_path: str, pdf_path: str, month: str):
+def ingest_files(excel_path: str, pdf_path: str, month: str, timer: Optional[StageTimer] = None):
+    """Parse both files and store their rows in one transaction; stages are timed into `timer`."""
+    timer = timer or StageTimer()
+    with timer.stage('parse_excel', os.path.getsize(excel_path)) as stage:
+        excel_res = parse_excel(excel_path, month)
+        stage['rows'] = len(excel_res['normalized'])
+    with timer.stage('parse_bank_pdf', os.path.getsize(pdf_path)) as stage:
+        bank_rows = parse_bank_pdf(pdf_path, month)
+        stage['rows'] = len(bank_rows)
+    # A dropped period is served from its Parquet copy; new rows would count twice
+    days = {r['date'] for r in excel_res['normalized']} | {r['date'] for r in bank_rows}
+    manifest = load_manifest()
+    dropped = sorted({d.strftime('%Y-%m') for d in days} & {p for p, e in manifest.items() if e.get('dropped')})
+    if dropped:
+        raise ValueError(f"{', '.join(dropped)} already archived and dropped from the database")
     db = SessionLocal()
-    excel_res = parse_excel(excel_path, month)
-    bank_rows = parse_bank_pdf(pdf_path, month)
-    # store raw and normalized
-    raw_record = RawSales(source=excel_path, raw_json=json.dumps(
-        {'raw_count': excel_res['raw_count']}))
-    db.add(raw_record)
-    for line in excel_res['normalized']:
-        db.add(NormalizedSales(**line))
-    for b in bank_rows:
-        db.add(BankTx(**b))
-    db.commit()
+    try:
+        # store raw and normalized
+        raw_record = RawSales(source=excel_path, raw_json=json.dumps(
+            {'raw_count': excel_res['raw_count']}))
+        db.add(raw_record)
+        lines = excel_res['normalized']
+        with timer.stage('resolve_dimensions') as stage:
+            # Resolve dimension names to surrogate keys once per distinct value
+            product_ids = DimensionLookup(db, ProductDim).resolve(
+                {l['product'] for l in lines})
+            customer_ids = DimensionLookup(db, CustomerDim).resolve(
+                {l['customer'] for l in lines})
+            method_ids = DimensionLookup(db, PaymentMethodDim).resolve(
+                {l['payment_method'] for l in lines})
+            stage['rows'] = len(product_ids) + len(customer_ids) + len(method_ids)
+        with timer.stage('detect_anomalies') as stage:
+            # Checked against the rows already stored, so before this batch is added
+            findings = (anomalies.detect_sales(db, anomalies.sales_frame(lines, product_ids))
+                        + anomalies.detect_bank(db, anomalies.bank_frame(bank_rows)))
+            stage['rows'] = len(findings)
+        with timer.stage('write_rows') as stage:
+            for line in lines:
+                line = dict(line)
+                line['product_id'] = product_ids[line.pop('product')]
+                customer = line.pop('customer')
+                line['customer_id'] = customer_ids[customer] if customer is not None else None
+                line['payment_method_id'] = method_ids[line.pop('payment_method')]
+                db.add(NormalizedSales(**line))
+            for b in bank_rows:
+                db.add(BankTx(**b))
+            db.flush()
+            stage['rows'] = len(lines) + len(bank_rows)
+        with timer.stage('store_anomalies') as stage:
+            stage['rows'] = anomalies.store(db, findings)
+        with timer.stage('refresh_daily_agg') as stage:
+            days = {l['date'] for l in lines}
+            refresh_daily_agg(db, days)
+            stage['rows'] = len(days)
+        with timer.stage('commit'):
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    snapshots.invalidate()
     return len(excel_res['normalized']), len(bank_rows)
@@ -0,0 +1,130 @@
+"""Fuzzy search over product names and bank transaction descriptions.
+
+With pg_trgm (migration 0008) matching and ranking run in PostgreSQL. A row
+matches when its text contains the query (ILIKE) or has a word close to it
+(`text %> q`, word similarity >= 0.6, which tolerates typos); both are
+answered from the GIN trigram index. Rows are ranked by word_similarity.
+
+Without the extension (embedded SQLite, or a server where pg_trgm is not
+installed) rows containing every word of the query are found with LIKE and
+ranked here with the same trigram measure computed in Python; typos are
+not matched on this path.
+
+Results are ordered by (score desc, id) and paginated with a cursor that
+encodes the last (score, id), like the keyset cursors of services/lines.py.
+"""
+import base64
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import REAL, and_, cast, func, or_, select, text
+from sqlalchemy.orm import Session
+
+from ..models.models import BankTx, ProductDim
+from .lines import bank_item, DEFAULT_PAGE_SIZE
+from .metrics import month_filter
+
+MIN_QUERY_LENGTH = 3
+_WORD = re.compile(r'[^\W_]+')  # pg_trgm splits words on non-alphanumerics
+
+_trgm_installed: Dict[str, bool] = {}
+
+
+def encode_rank_cursor(score: float, row_id: int) -> str:
+    raw = f"{score!r}:{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, int]:
+    """Decode a token produced by encode_rank_cursor. Raises ValueError when malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        score, row_id = base64.urlsafe_b64decode(padded).decode().split(':')
+        return float(score), int(row_id)
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {cursor!r}") from e
+
+
+def trigrams(value: str) -> Set[str]:
+    """pg_trgm-style trigrams: lower-cased words padded with two leading and one trailing space."""
+    out: Set[str] = set()
+    for word in _WORD.findall(value.lower()):
+        padded = f"  {word} "
+        out.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return out
+
+
+def word_score(query: str, value: str) -> float:
+    """Share of the query's trigrams found in value (0..1)."""
+    wanted = trigrams(query)
+    return round(len(wanted & trigrams(value or '')) / len(wanted), 4) if wanted else 0.0
+
+
+def _like(term: str) -> str:
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+def has_trgm(db: Session) -> bool:
+    """Whether pg_trgm is installed in the database behind db (checked once per URL)."""
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _trgm_installed:
+        _trgm_installed[key] = bind.dialect.name == 'postgresql' and db.execute(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+    return _trgm_installed[key]
+
+
+def _ranked(db: Session, q: str, model, column, filters: List, limit: int,
+            cursor: Optional[str]) -> Tuple[List[Tuple[int, float]], Optional[str]]:
+    """(id, score) of one page of matches, best first, and the cursor of the next page."""
+    q = q.strip()
+    if len(q) < MIN_QUERY_LENGTH:
+        raise ValueError(f"query must have at least {MIN_QUERY_LENGTH} characters")
+    after = decode_rank_cursor(cursor) if cursor else None
+
+    if has_trgm(db):
+        score = func.word_similarity(q, column)
+        stmt = (select(model.id, score)
+                .where(or_(column.ilike(_like(q), escape='\\'), column.op('%>')(q)), *filters))
+        if after:
+            # word_similarity is a float4: compare in float4 so the boundary score matches exactly
+            last = cast(after[0], REAL)
+            stmt = stmt.where(or_(score < last, and_(score == last, model.id > after[1])))
+        hits = [(i, float(s)) for i, s in db.execute(stmt.order_by(score.desc(), model.id).limit(limit + 1))]
+    else:
+        words = [w for w in q.split() if w]
+        rows = db.execute(select(model.id, column).where(
+            *[column.ilike(_like(w), escape='\\') for w in words], *filters)).all()
+        hits = sorted(((i, word_score(q, v)) for i, v in rows), key=lambda h: (-h[1], h[0]))
+        if after:
+            hits = [h for h in hits if (-h[1], h[0]) > (-after[0], after[1])]
+        hits = hits[:limit + 1]
+
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_cursor = encode_rank_cursor(hits[-1][1], hits[-1][0])
+    return hits, next_cursor
+
+
+def search_products(db: Session, q: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Dict:
+    """Products whose name matches q, best match first."""
+    hits, next_cursor = _ranked(db, q, ProductDim, ProductDim.name, [], limit, cursor)
+    names = dict(db.query(ProductDim.id, ProductDim.name).filter(ProductDim.id.in_([i for i, _ in hits])).all())
+    return {
+        'items': [{'id': i, 'name': names[i], 'score': s} for i, s in hits],
+        'next_cursor': next_cursor,
+    }
+
+
+def search_bank(db: Session, q: str, month: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                cursor: Optional[str] = None) -> Dict:
+    """Bank transactions whose description matches q, optionally within a month, best match first."""
+    filters = [month_filter(BankTx.date, month)] if month else []
+    hits, next_cursor = _ranked(db, q, BankTx, BankTx.description, filters, limit, cursor)
+    rows = {r.id: r for r in db.query(BankTx).filter(BankTx.id.in_([i for i, _ in hits])).all()}
+    return {
+        'items': [dict(bank_item(rows[i]), score=s) for i, s in hits],
+        'next_cursor': next_cursor,
+    }
@@ -0,0 +1,263 @@
+"""In-memory columnar snapshots of the hot months.
+
+The current and previous month take almost all dashboard and chat traffic.
+For those months the sales lines and bank transactions are loaded once into
+pandas frames (one column per field, integer cents) and the metrics services
+answer from them instead of aggregating in PostgreSQL. Snapshots are keyed
+by month, evicted least-recently-used under a byte cap, and dropped whenever
+the data version changes (new ingest in this process, or new rows seen by
+the periodic max-id check from another process, or a change to the
+Parquet archive manifest). Rows of archived-and-dropped periods are loaded
+alongside the live ones, flagged so that reconciliation keeps covering live
+rows only, as its SQL counterpart does.
+
+Each kernel returns rows with the same attributes as the corresponding SQL
+query in services/metrics.py, so both paths share the formatting code and
+produce identical output.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import date
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.models import (NormalizedSales, BankTx, ProductDim, CustomerDim, PaymentMethodDim,
+                             PaymentMethod, month_of)
+from .archive import archived_sales, archive_version
+
+# Sorts after every real key, like NULL under ORDER BY ... NULLS LAST
+NULL_KEY = np.iinfo(np.int64).max
+
+SALES_COLUMNS = ['id', 'date', 'invoice_number', 'customer_id', 'product_id', 'payment_method_id',
+                 'vat_rate', 'net_cents', 'vat_cents', 'gross_cents']
+BANK_COLUMNS = ['id', 'date', 'tx_type', 'credit_cents']
+
+Summary = namedtuple('Summary', 'net vat gross card cash')
+Daily = namedtuple('Daily', 'date gross card cash')
+Top = namedtuple('Top', 'name gross')
+VatGroup = namedtuple('VatGroup', 'vat_rate net vat gross')
+DayTotal = namedtuple('DayTotal', 'date total')
+
+
+def hot_months(today: Optional[date] = None) -> Set[str]:
+    """Months served from snapshots: SNAPSHOT_MONTHS, or the current and previous month."""
+    if settings.snapshot_months:
+        return {m.strip().zfill(2) for m in settings.snapshot_months.split(',') if m.strip()}
+    today = today or date.today()
+    previous = 12 if today.month == 1 else today.month - 1
+    return {f"{today.month:02d}", f"{previous:02d}"}
+
+
+def data_version(db: Session) -> Tuple:
+    """Cheap change marker: the highest sales and bank ids (primary-key lookups)
+    plus the archive manifest version (deletes on archiving keep the max ids)."""
+    return tuple(db.execute(select(
+        select(func.max(NormalizedSales.id)).scalar_subquery(),
+        select(func.max(BankTx.id)).scalar_subquery(),
+    )).one()) + (archive_version(),)
+
+
+class MonthSnapshot:
+    """Columnar copy of one month of normalized_sales and bank_tx."""
+
+    def __init__(self, month: str, sales: pd.DataFrame, bank: pd.DataFrame,
+                 products: Dict[int, str], customers: Dict[int, str],
+                 card_id: Optional[int], cash_id: Optional[int]):
+        self.month = month
+        self.sales = sales
+        self.bank = bank
+        self.products = products
+        self.customers = customers
+        self.card_id = -1 if card_id is None else card_id
+        self.cash_id = -1 if cash_id is None else cash_id
+        self._live = None
+        self.nbytes = int(sales.memory_usage(deep=True).sum() + bank.memory_usage(deep=True).sum()
+                          + sum(len(n or '') + 64 for n in products.values())
+                          + sum(len(n or '') + 64 for n in customers.values()))
+
+    @classmethod
+    def from_rows(cls, month: str, sales_rows, bank_rows, products, customers, card_id, cash_id,
+                  archived: Optional[pd.DataFrame] = None):
+        sales = pd.DataFrame(list(sales_rows), columns=SALES_COLUMNS)
+        sales['archived'] = False
+        if archived is not None and len(archived):
+            sales = pd.concat([sales, archived[SALES_COLUMNS].assign(archived=True)], ignore_index=True)
+        bank = pd.DataFrame(list(bank_rows), columns=BANK_COLUMNS)
+        sales['date'] = pd.to_datetime(sales['date'])
+        sales['customer_id'] = sales['customer_id'].astype('float64').fillna(NULL_KEY).astype(np.int64)
+        for col in ('id', 'product_id', 'payment_method_id', 'net_cents', 'vat_cents', 'gross_cents'):
+            sales[col] = sales[col].astype(np.int64)
+        sales['vat_rate'] = sales['vat_rate'].astype('float64')
+        sales['invoice_number'] = sales['invoice_number'].astype(object)
+        bank['date'] = pd.to_datetime(bank['date'])
+        bank['credit_cents'] = bank['credit_cents'].astype('float64').fillna(0).astype(np.int64)
+        return cls(month, sales, bank, products, customers, card_id, cash_id)
+
+    @property
+    def live(self) -> pd.DataFrame:
+        """Rows still in the database (reconciliation ignores the archive)."""
+        if self._live is None:
+            self._live = self.sales[~self.sales['archived'].to_numpy()]
+        return self._live
+
+    def _method_gross(self, method_id: int) -> np.ndarray:
+        s = self.sales
+        return np.where(s['payment_method_id'].to_numpy() == method_id, s['gross_cents'].to_numpy(), 0)
+
+    def summary(self) -> Summary:
+        s = self.sales
+        return Summary(int(s['net_cents'].sum()), int(s['vat_cents'].sum()), int(s['gross_cents'].sum()),
+                       int(self._method_gross(self.card_id).sum()), int(self._method_gross(self.cash_id).sum()))
+
+    def daily(self) -> List[Daily]:
+        frame = pd.DataFrame({
+            'date': self.sales['date'],
+            'gross': self.sales['gross_cents'],
+            'card': self._method_gross(self.card_id),
+            'cash': self._method_gross(self.cash_id),
+        }).groupby('date', sort=True).sum()
+        return [Daily(d.date(), int(g), int(c), int(k))
+                for d, g, c, k in zip(frame.index, frame['gross'], frame['card'], frame['cash'])]
+
+    def top_by(self, key: str, limit: int) -> List[Top]:
+        names = self.products if key == 'product_id' else self.customers
+        gross = self.sales.groupby(key, sort=True)['gross_cents'].sum()
+        # stable sort keeps ties in ascending key order, as the SQL ORDER BY does
+        gross = gross.sort_values(ascending=False, kind='stable').head(max(limit, 0))
+        return [Top(names.get(int(k)), int(g)) for k, g in gross.items()]
+
+    def vat_groups(self) -> List[VatGroup]:
+        frame = self.sales.groupby('vat_rate', sort=True)[['net_cents', 'vat_cents', 'gross_cents']].sum()
+        return [VatGroup(float(rate), int(r.net_cents), int(r.vat_cents), int(r.gross_cents))
+                for rate, r in frame.iterrows()]
+
+    def invoice_count(self) -> int:
+        return int(self.sales['invoice_number'].nunique())
+
+    def card_sales_by_day(self) -> List[DayTotal]:
+        s = self.live
+        card = s[s['payment_method_id'] == self.card_id].groupby('date', sort=True)['gross_cents'].sum()
+        return [DayTotal(d.date(), int(v)) for d, v in card.items()]
+
+    def tpa_credits_by_day(self) -> List[DayTotal]:
+        b = self.bank
+        credits = b[b['tx_type'] == 'FECHO_TPA'].groupby('date', sort=True)['credit_cents'].sum()
+        return [DayTotal(d.date(), int(v)) for d, v in credits.items()]
+
+
+def load_snapshot(db: Session, month: str) -> MonthSnapshot:
+    m = int(month)
+    sales_rows = db.execute(
+        select(*[getattr(NormalizedSales, c) for c in SALES_COLUMNS])
+        .where(month_of(NormalizedSales.date) == m)
+        .order_by(NormalizedSales.id)
+    ).all()
+    bank_rows = db.execute(
+        select(*[getattr(BankTx, c) for c in BANK_COLUMNS])
+        .where(month_of(BankTx.date) == m)
+        .order_by(BankTx.id)
+    ).all()
+    table = archived_sales(month)
+    archived = table.select(SALES_COLUMNS).to_pandas(date_as_object=True) if table is not None else None
+    product_ids = {r[4] for r in sales_rows}
+    customer_ids = {r[3] for r in sales_rows if r[3] is not None}
+    if archived is not None:
+        product_ids.update(int(k) for k in archived['product_id'].unique())
+        customer_ids.update(int(k) for k in archived['customer_id'].dropna().unique())
+    products = dict(db.execute(select(ProductDim.id, ProductDim.name)
+                               .where(ProductDim.id.in_(product_ids))).all()) if product_ids else {}
+    customers = dict(db.execute(select(CustomerDim.id, CustomerDim.name)
+                                .where(CustomerDim.id.in_(customer_ids))).all()) if customer_ids else {}
+    methods = {name: id_ for id_, name in db.execute(select(PaymentMethodDim.id, PaymentMethodDim.name)).all()}
+    return MonthSnapshot.from_rows(month, sales_rows, bank_rows, products, customers,
+                                   methods.get(PaymentMethod.CARTAO.value),
+                                   methods.get(PaymentMethod.NUMERARIO.value), archived)
+
+
+class SnapshotCache:
+    """LRU of MonthSnapshot under a byte cap, invalidated on data-version change.
+
+    Loading happens outside the lock: request handlers run the services via
+    AsyncSession.run_sync on the event-loop thread, so a lock held across a
+    query would block every other request. Two concurrent first requests for
+    a month may both load it; the second result simply replaces the first.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._months: 'OrderedDict[str, MonthSnapshot]' = OrderedDict()
+        self._oversize: Set[str] = set()
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(s.nbytes for s in self._months.values())
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._months.clear()
+            self._oversize.clear()
+            self._version = None
+            self._checked_at = 0.0
+
+    def _revalidate(self, db: Session) -> None:
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < settings.snapshot_revalidate_seconds:
+            return
+        version = data_version(db)
+        with self._lock:
+            if version != self._version:
+                self._months.clear()
+                self._oversize.clear()
+                self._version = version
+            self._checked_at = now
+
+    def get(self, db: Session, month: str) -> Optional[MonthSnapshot]:
+        """Snapshot for a hot month, loading it on first use; None means use SQL."""
+        if not settings.snapshot_enabled or month not in hot_months():
+            return None
+        self._revalidate(db)
+        with self._lock:
+            if month in self._oversize:
+                return None
+            snap = self._months.get(month)
+            if snap is not None:
+                self._months.move_to_end(month)
+                self.hits += 1
+                return snap
+        snap = load_snapshot(db, month)
+        with self._lock:
+            self.loads += 1
+            if snap.nbytes > self.max_bytes:
+                self._oversize.add(month)
+                return None
+            self._months[month] = snap
+            self._months.move_to_end(month)
+            while self.nbytes > self.max_bytes:
+                self._months.popitem(last=False)
+                self.evictions += 1
+        return snap
+
+    def stats(self) -> Dict:
+        return {
+            'months': list(self._months),
+            'bytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'loads': self.loads,
+            'evictions': self.evictions,
+        }
+
+
+snapshots = SnapshotCache(settings.snapshot_max_mb * 1024 * 1024)
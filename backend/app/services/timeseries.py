@@ -0,0 +1,184 @@
+"""Sales time series over arbitrary date ranges.
+
+Reads the daily_sales_agg rollup (one row per day, maintained at ingest)
+and buckets it by day, ISO week or calendar month in Python, so a 24-month
+view costs one indexed range read of ~730 rows. Each bucket carries a
+delta against its comparison bucket: the previous bucket, or the same
+bucket one year earlier. The totals compare the whole range with the
+equal-length window just before it, or with the same buckets one year
+earlier.
+"""
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import case
+
+from ..models.models import NormalizedSales, DailySalesAgg, PaymentMethod
+from .dimensions import payment_method_id
+from .money import from_cents
+
+BUCKETS = ('day', 'week', 'month')
+COMPARE = ('previous', 'year')
+METRICS = ('gross', 'net', 'vat', 'card', 'cash')
+MAX_BUCKETS = 1000
+
+
+def refresh_daily_agg(db: Session, dates: Iterable[date]) -> None:
+    """Recompute the rollup rows for the given dates from normalized_sales (no commit)."""
+    dates = sorted(set(dates))
+    if not dates:
+        return
+    db.flush()
+    db.query(DailySalesAgg).filter(DailySalesAgg.date.in_(dates)).delete(synchronize_session=False)
+
+    def method_sum(name: str):
+        return func.coalesce(func.sum(case(
+            (NormalizedSales.payment_method_id == payment_method_id(name), NormalizedSales.gross_cents),
+            else_=0)), 0)
+    db.execute(insert(DailySalesAgg).from_select(
+        ['date', 'line_count', 'net_cents', 'vat_cents', 'gross_cents', 'card_cents', 'cash_cents'],
+        select(
+            NormalizedSales.date,
+            func.count(NormalizedSales.id),
+            func.sum(NormalizedSales.net_cents),
+            func.sum(NormalizedSales.vat_cents),
+            func.sum(NormalizedSales.gross_cents),
+            method_sum(PaymentMethod.CARTAO.value),
+            method_sum(PaymentMethod.NUMERARIO.value),
+        ).where(NormalizedSales.date.in_(dates)).group_by(NormalizedSales.date)
+    ))
+
+
+def _add_months(d: date, months: int) -> date:
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def bucket_start(d: date, bucket: str) -> date:
+    if bucket == 'week':
+        return d - timedelta(days=d.weekday())
+    if bucket == 'month':
+        return d.replace(day=1)
+    return d
+
+
+def next_bucket(period: date, bucket: str) -> date:
+    return shift_bucket(period, bucket, 1)
+
+
+def shift_bucket(period: date, bucket: str, n: int) -> date:
+    """Start of the bucket `n` buckets after (n < 0: before) `period`."""
+    if bucket == 'week':
+        return period + timedelta(weeks=n)
+    if bucket == 'month':
+        return _add_months(period, n)
+    return period + timedelta(days=n)
+
+
+def compare_period(period: date, bucket: str, compare: str) -> date:
+    """Start of the bucket that `period` is compared against."""
+    if compare == 'year':
+        if bucket == 'week':
+            return period - timedelta(weeks=52)
+        if bucket == 'month':
+            return _add_months(period, -12)
+        return period.replace(year=period.year - 1, day=28) if (period.month, period.day) == (2, 29) \
+            else period.replace(year=period.year - 1)
+    return shift_bucket(period, bucket, -1)
+
+
+def base_periods(periods: List[date], bucket: str, compare: str) -> List[date]:
+    """Bucket starts the range's totals are compared against.
+
+    For 'previous' that is the equal-length window ending just before the
+    range; each bucket's own predecessor would overlap the range itself.
+    """
+    if compare == 'previous':
+        first = shift_bucket(periods[0], bucket, -len(periods))
+        return [shift_bucket(first, bucket, i) for i in range(len(periods))]
+    return [compare_period(p, bucket, compare) for p in periods]
+
+
+def _periods(start: date, end: date, bucket: str, compare: str) -> List[date]:
+    """Validate the request and list the bucket starts covering [start, end]."""
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+    if compare not in COMPARE:
+        raise ValueError(f"compare must be one of {', '.join(COMPARE)}")
+    if end < start:
+        raise ValueError('end must not be before start')
+    periods, period = [], bucket_start(start, bucket)
+    while period <= end:
+        periods.append(period)
+        if len(periods) > MAX_BUCKETS:
+            raise ValueError(f"range spans more than {MAX_BUCKETS} {bucket} buckets")
+        period = next_bucket(period, bucket)
+    return periods
+
+
+def build_series(daily: Dict[date, Tuple[int, ...]], start: date, end: date,
+                 bucket: str = 'month', compare: str = 'previous') -> Dict:
+    """Bucket daily (lines, net, vat, gross, card, cash) cent tuples into a series.
+
+    The range is widened to whole buckets so every bucket, including the
+    first and last, is compared like for like.
+    """
+    periods = _periods(start, end, bucket, compare)
+
+    sums: Dict[date, List[int]] = {}
+    for day, (lines, net, vat, gross, card, cash) in daily.items():
+        acc = sums.setdefault(bucket_start(day, bucket), [0] * 6)
+        for i, v in enumerate((gross, net, vat, card, cash, lines)):
+            acc[i] += int(v)
+
+    empty = [0] * 6
+    buckets, total, base_total = [], [0] * 6, [0] * 6
+    for period in periods:
+        base_period = compare_period(period, bucket, compare)
+        cur, base = sums.get(period, empty), sums.get(base_period, empty)
+        total = [a + b for a, b in zip(total, cur)]
+        buckets.append({
+            'period': period.isoformat(),
+            **_values(cur),
+            'compare_period': base_period.isoformat(),
+            **_deltas(cur, base),
+        })
+    for period in base_periods(periods, bucket, compare):
+        base_total = [a + b for a, b in zip(base_total, sums.get(period, empty))]
+    return {
+        'start': periods[0].isoformat(),
+        'end': (next_bucket(periods[-1], bucket) - timedelta(days=1)).isoformat(),
+        'bucket': bucket,
+        'compare': compare,
+        'buckets': buckets,
+        'totals': {**_values(total), **_deltas(total, base_total)},
+    }
+
+
+def _values(acc: List[int]) -> Dict:
+    out = {m: from_cents(v) for m, v in zip(METRICS, acc)}
+    out['lines'] = acc[5]
+    return out
+
+
+def _deltas(cur: List[int], base: List[int]) -> Dict:
+    return {
+        'delta': {m: from_cents(c - b) for m, c, b in zip(METRICS, cur, base)},
+        'delta_pct': {m: (round((c - b) / b * 100, 2) if b else None) for m, c, b in zip(METRICS, cur, base)},
+    }
+
+
+def kpi_range(db: Session, start: date, end: date, bucket: str = 'month', compare: str = 'previous') -> Dict:
+    """Bucketed gross/net/VAT/card/cash over [start, end] with period-over-period deltas."""
+    periods = _periods(start, end, bucket, compare)
+    fetch_from = base_periods(periods, bucket, compare)[0]
+    fetch_to = next_bucket(periods[-1], bucket) - timedelta(days=1)
+    rows = (
+        db.query(DailySalesAgg.date, DailySalesAgg.line_count, DailySalesAgg.net_cents, DailySalesAgg.vat_cents,
+                 DailySalesAgg.gross_cents, DailySalesAgg.card_cents, DailySalesAgg.cash_cents)
+        .filter(DailySalesAgg.date >= fetch_from, DailySalesAgg.date <= fetch_to)
+        .all()
+    )
+    return build_series({r[0]: tuple(r[1:]) for r in rows}, start, end, bucket, compare)
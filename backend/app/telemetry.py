@@ -0,0 +1,123 @@
+"""Process-local counters and histograms, rendered in the Prometheus text format.
+
+A deliberately small subset of the Prometheus client: labelled counters and
+fixed-bucket histograms, registered once at import time and exposed by
+GET /metrics (api/telemetry.py). Values are per process and reset on
+restart; scrape every backend process to aggregate them.
+"""
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self) -> Dict[Labels, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self) -> Iterable[str]:
+        for key, value in sorted(self.values().items()):
+            yield f'{self.name}{_label_text(self.labelnames, key)} {_number(value)}'
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # per label set: bucket counts (not cumulative), sum, count
+        self._values: Dict[Labels, Tuple[List[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            counts, total, n = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            counts[next(i for i, bound in enumerate(self.buckets) if value <= bound)] += 1
+            self._values[key] = (counts, total + value, n + 1)
+
+    def values(self) -> Dict[Labels, Dict]:
+        """count, sum and cumulative bucket counts per label set."""
+        with self._lock:
+            out = {}
+            for key, (counts, total, n) in self._values.items():
+                running, cumulative = 0, []
+                for c in counts:
+                    running += c
+                    cumulative.append(running)
+                out[key] = {'count': n, 'sum': total, 'buckets': dict(zip(self.buckets, cumulative))}
+            return out
+
+    def samples(self) -> Iterable[str]:
+        for key, v in sorted(self.values().items()):
+            for bound, count in v['buckets'].items():
+                le = 'le="' + _number(bound) + '"'
+                yield f'{self.name}_bucket{_label_text(self.labelnames, key, le)} {count}'
+            yield f'{self.name}_sum{_label_text(self.labelnames, key)} {_number(v["sum"])}'
+            yield f'{self.name}_count{_label_text(self.labelnames, key)} {v["count"]}'
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float],
+                  labelnames: Sequence[str] = ()) -> Histogram:
+        return self.register(Histogram(name, help, buckets, labelnames))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
@@ -0,0 +1,144 @@
+"""Throughput and event-loop lag of parallel dashboard loads, sync vs async DB paths.
+
+One "dashboard load" issues the same queries the Dashboard page triggers:
+summary, daily, top products, top customers, VAT report and reconciliation.
+Each mode runs `--clients` loads concurrently on one event loop, which is how
+a single uvicorn worker sees parallel browser tabs:
+
+  sync   services called with a SessionLocal session inside the coroutine
+         (what the routers did before the async path existed)
+  async  services driven through AsyncSessionLocal.run_sync, as the routers
+         do now
+  http   real requests against a running server (--url)
+
+Besides throughput and per-load latency, a probe coroutine ticks every 5 ms
+while the loads run; its overshoot (loop lag) is how long any other request
+on the same worker would have been stuck behind a query.
+
+Usage (from backend/, with DATABASE_URL pointing at a populated database):
+
+    python -m benchmarks.concurrency --month 09 --clients 20 --rounds 5
+    python -m benchmarks.concurrency --mode http --url http://localhost:8000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+from app.database import SessionLocal, AsyncSessionLocal, async_engine
+from app.services.metrics import (
+    kpi_summary, kpi_daily, kpi_top_products, kpi_top_customers, vat_report, reconciliation,
+)
+
+DASHBOARD_SERVICES = [
+    (kpi_summary, ()),
+    (kpi_daily, ()),
+    (kpi_top_products, (10,)),
+    (kpi_top_customers, (10,)),
+    (vat_report, ()),
+    (reconciliation, ()),
+]
+DASHBOARD_PATHS = ['/kpi/summary', '/kpi/daily', '/kpi/top-products',
+                   '/kpi/top-customers', '/vat/report', '/recon/card']
+
+
+async def _sync_load(month: str) -> None:
+    db = SessionLocal()
+    try:
+        for fn, extra in DASHBOARD_SERVICES:
+            fn(db, month, *extra)
+    finally:
+        db.close()
+
+
+async def _async_load(month: str) -> None:
+    async with AsyncSessionLocal() as db:
+        for fn, extra in DASHBOARD_SERVICES:
+            await db.run_sync(fn, month, *extra)
+
+
+def _http_load_factory(url: str):
+    import httpx
+
+    client = httpx.AsyncClient(base_url=url, timeout=60)
+
+    async def _load(month: str) -> None:
+        for path in DASHBOARD_PATHS:
+            resp = await client.get(path, params={'month': month})
+            if resp.status_code >= 500:
+                resp.raise_for_status()
+
+    return _load, client
+
+
+async def _probe_loop_lag(lags: List[float], stop: asyncio.Event, interval: float = 0.005) -> None:
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - t0 - interval)
+
+
+def _pct(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, int(len(sorted_values) * pct) - 1)]
+
+
+async def _run(load: Callable[[str], Awaitable[None]], month: str, clients: int, rounds: int) -> dict:
+    latencies: List[float] = []
+    lags: List[float] = []
+
+    async def _timed() -> None:
+        t0 = time.perf_counter()
+        await load(month)
+        latencies.append(time.perf_counter() - t0)
+
+    await load(month)  # warm pools and caches
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe_loop_lag(lags, stop))
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*[_timed() for _ in range(clients)])
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    latencies.sort()
+    lags.sort()
+    return {
+        'loads': len(latencies),
+        'elapsed_s': round(elapsed, 3),
+        'loads_per_s': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'p95_ms': round(_pct(latencies, 0.95) * 1000, 1),
+        'loop_lag_p95_ms': round(_pct(lags, 0.95) * 1000, 1),
+        'loop_lag_max_ms': round(lags[-1] * 1000, 1) if lags else 0.0,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--month', default='09')
+    parser.add_argument('--clients', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--mode', choices=['sync', 'async', 'http', 'both'], default='both')
+    parser.add_argument('--url', default='http://localhost:8000')
+    args = parser.parse_args()
+
+    modes = ['sync', 'async'] if args.mode == 'both' else [args.mode]
+    for mode in modes:
+        if mode == 'http':
+            load, client = _http_load_factory(args.url)
+            try:
+                res = await _run(load, args.month, args.clients, args.rounds)
+            finally:
+                await client.aclose()
+        else:
+            load = _sync_load if mode == 'sync' else _async_load
+            res = await _run(load, args.month, args.clients, args.rounds)
+        print(f"{mode:>5}: " + ', '.join(f"{k}={v}" for k, v in res.items()))
+    await async_engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,148 @@
+"""EXPLAIN ANALYZE of the KPI queries with and without the covering indexes.
+
+The SELECTs are captured from the real service calls (kpi_summary,
+kpi_daily, kpi_top_products, vat_report, reconciliation), then each one is
+explained twice on PostgreSQL:
+
+  before  inside a transaction that drops the indexes added by migration
+          0005, rolled back afterwards (takes ACCESS EXCLUSIVE locks, so do
+          not run it against a busy production database)
+  after   with the indexes in place
+
+Index-only scans need an up-to-date visibility map; pass --vacuum to run
+VACUUM ANALYZE on the tables first.
+
+Usage (from backend/, DATABASE_URL pointing at a populated database at head):
+
+    python -m benchmarks.explain_kpi --month 09 --vacuum
+"""
+import argparse
+import json
+import os
+import time
+from typing import Dict, List, Tuple
+
+from sqlalchemy import event
+
+from app.database import SessionLocal, engine
+from app.services.metrics import kpi_summary, kpi_daily, kpi_top_products, vat_report, reconciliation
+
+COVERING_INDEXES = [
+    'ix_sales_month_date_id', 'ix_sales_pm_month_date_id', 'ix_sales_vat_month_date_id',
+    'ix_sales_month_product', 'ix_sales_month_vat', 'ix_bank_tx_month_date_id',
+    'ix_bank_tx_type_month_date_id', 'ix_recon_month_date_id',
+]
+SERVICES = [
+    ('kpi_summary', kpi_summary, ()),
+    ('kpi_daily', kpi_daily, ()),
+    ('kpi_top_products', kpi_top_products, (10,)),
+    ('vat_report', vat_report, ()),
+    ('reconciliation', reconciliation, ()),
+]
+
+
+def capture_selects(month: str) -> List[Tuple[str, str, Dict]]:
+    """Run each service once and record the SELECT statements it issues."""
+    captured: List[Tuple[str, str, Dict]] = []
+    current = {'name': None}
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            captured.append((current['name'], statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', _record)
+    try:
+        db = SessionLocal()
+        try:
+            for name, fn, extra in SERVICES:
+                current['name'] = name
+                fn(db, month, *extra)
+        finally:
+            db.close()
+    finally:
+        event.remove(engine, 'before_cursor_execute', _record)
+    # reconciliation issues two SELECTs (card sales, FECHO_TPA credits)
+    counts: Dict[str, int] = {}
+    labelled = []
+    for name, statement, params in captured:
+        counts[name] = counts.get(name, 0) + 1
+        label = name if counts[name] == 1 else f"{name}#{counts[name]}"
+        labelled.append((label, statement, params))
+    return labelled
+
+
+def _walk(node: Dict, nodes: List[Dict]) -> None:
+    nodes.append(node)
+    for child in node.get('Plans', []):
+        _walk(child, nodes)
+
+
+def _summarize(plan: Dict) -> Dict:
+    nodes: List[Dict] = []
+    _walk(plan['Plan'], nodes)
+    return {
+        'execution_ms': plan.get('Execution Time'),
+        'planning_ms': plan.get('Planning Time'),
+        'scans': sorted({f"{n['Node Type']}({n.get('Index Name', n.get('Relation Name', ''))})"
+                         for n in nodes if 'Scan' in n['Node Type']}),
+        'heap_fetches': sum(n.get('Heap Fetches', 0) for n in nodes),
+        'shared_hit': plan['Plan'].get('Shared Hit Blocks', 0),
+        'shared_read': plan['Plan'].get('Shared Read Blocks', 0),
+    }
+
+
+def explain_all(statements, drop_indexes: bool) -> Dict[str, Dict]:
+    out: Dict[str, Dict] = {}
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        if drop_indexes:
+            for name in COVERING_INDEXES:
+                cur.execute(f'DROP INDEX IF EXISTS {name}')
+        for label, statement, params in statements:
+            cur.execute('EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + statement, params)
+            plan = cur.fetchone()[0][0]
+            out[label] = {'summary': _summarize(plan), 'plan': plan}
+        cur.close()
+    finally:
+        raw.rollback()
+        raw.close()
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--month', default='09')
+    parser.add_argument('--vacuum', action='store_true')
+    parser.add_argument('--out', default=os.path.join(os.path.dirname(__file__), 'results'))
+    args = parser.parse_args()
+
+    if engine.dialect.name != 'postgresql':
+        raise SystemExit('explain_kpi needs PostgreSQL (DATABASE_URL)')
+    if args.vacuum:
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            for table in ('normalized_sales', 'bank_tx', 'reconciliation_cache'):
+                conn.exec_driver_sql(f'VACUUM ANALYZE {table}')
+
+    statements = capture_selects(args.month)
+    result = {
+        'month': args.month,
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'before': explain_all(statements, drop_indexes=True),
+        'after': explain_all(statements, drop_indexes=False),
+    }
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"explain_kpi_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=1, default=str)
+
+    for label, _, _ in statements:
+        b, a = result['before'][label]['summary'], result['after'][label]['summary']
+        print(f"{label:<18} before {b['execution_ms']:>9.2f} ms  {', '.join(b['scans'])}")
+        print(f"{'':<18} after  {a['execution_ms']:>9.2f} ms  {', '.join(a['scans'])}"
+              f"  heap_fetches={a['heap_fetches']}")
+    print(f"plans saved to {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Payload size and serialization time of the negotiated response formats.
+
+Encodes a year of data shaped like the API output (365 /kpi/daily rows,
+365 /recon/card rows and a 500-line /lines/sales page) with:
+
+  fastapi   jsonable_encoder + json.dumps, what the endpoints did before
+  orjson    the default JSON path now
+  msgpack   Accept: application/msgpack
+  arrow     Accept: application/vnd.apache.arrow.stream
+
+Sizes are reported raw and gzip-compressed (what a proxy applying gzip would
+send); times are the median of --rounds encodings, in milliseconds.
+
+Usage (from backend/, no database needed):
+
+    python -m benchmarks.formats --rounds 200
+"""
+import argparse
+import gzip
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.api.formats import DAILY_SCHEMA, RECON_SCHEMA, SALES_SCHEMA, arrow_ipc
+from app.models.models import PaymentMethod
+import msgpack
+
+
+def _money(rng: random.Random, low: int, high: int) -> float:
+    return rng.randint(low, high) / 100
+
+
+def year_of_daily(rng: random.Random, days: int = 365) -> List[Dict]:
+    start = date(2024, 1, 1)
+    rows = []
+    for i in range(days):
+        card, cash = _money(rng, 50_000_00, 400_000_00), _money(rng, 10_000_00, 150_000_00)
+        rows.append({'date': (start + timedelta(days=i)).isoformat(), 'gross': round(card + cash, 2),
+                     'card': card, 'cash': cash})
+    return rows
+
+
+def year_of_recon(rng: random.Random, days: int = 365) -> List[Dict]:
+    start = date(2024, 1, 1)
+    rows = []
+    for i in range(days):
+        card = _money(rng, 50_000_00, 400_000_00)
+        bank = round(card - _money(rng, 0, 2_000_00), 2)
+        rows.append({'date': (start + timedelta(days=i)).isoformat(), 'sales_card': card, 'bank_tpa': bank,
+                     'fees': 0.0, 'delta': round(card - bank, 2)})
+    return rows
+
+
+def sales_page(rng: random.Random, size: int = 500) -> Dict:
+    products = [f'Produto {i:03d}' for i in range(200)]
+    items = []
+    for i in range(size):
+        net = rng.randint(100_00, 50_000_00)
+        rate = rng.choice([14.0, 7.0, 5.0, 0.0])
+        vat = round(net * rate / 100)
+        items.append({
+            'id': 1_000_000 + i, 'date': date(2024, 9, 1 + i * 30 // size).isoformat(),
+            'invoice_number': f'FR 2024/{10_000 + i // 3}', 'customer': rng.choice([None, 'Consumidor final', 'Ana']),
+            'product': rng.choice(products), 'quantity': float(rng.randint(1, 5)), 'unit_price_net': net / 100,
+            'vat_rate': rate, 'net_amount': net / 100, 'vat_amount': vat / 100, 'gross_amount': (net + vat) / 100,
+            'payment_method': rng.choice([PaymentMethod.CARTAO.value, PaymentMethod.NUMERARIO.value]),
+        })
+    return {'items': items, 'next_cursor': 'MjAyNC0wOS0zMDoxMDAwNDk5'}
+
+
+ENCODERS: Dict[str, Callable] = {
+    'fastapi': lambda payload, schema: JSONResponse(jsonable_encoder(payload)).body,
+    'orjson': lambda payload, schema: ORJSONResponse(payload).body,
+    'msgpack': lambda payload, schema: msgpack.packb(payload, use_bin_type=True),
+    'arrow': lambda payload, schema: arrow_ipc(payload['items'] if isinstance(payload, dict) else payload, schema),
+}
+
+
+def bench(payload, schema, rounds: int) -> List[Dict]:
+    results = []
+    for name, encode in ENCODERS.items():
+        body = encode(payload, schema)
+        timings = []
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            encode(payload, schema)
+            timings.append((time.perf_counter() - t0) * 1000)
+        results.append({'format': name, 'bytes': len(body), 'gzip_bytes': len(gzip.compress(body)),
+                         'ms': statistics.median(timings)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    datasets = [('kpi/daily x365', year_of_daily(rng), DAILY_SCHEMA),
+                ('recon/card x365', year_of_recon(rng), RECON_SCHEMA),
+                ('lines/sales 500', sales_page(rng), SALES_SCHEMA)]
+    for title, payload, schema in datasets:
+        results = bench(payload, schema, args.rounds)
+        base = results[0]
+        print(f"\n{title}")
+        print(f"  {'format':<8} {'bytes':>8} {'gzip':>8} {'ms':>8} {'vs fastapi':>11}")
+        for r in results:
+            print(f"  {r['format']:<8} {r['bytes']:>8} {r['gzip_bytes']:>8} {r['ms']:>8.3f} "
+                  f"{base['ms'] / r['ms']:>10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""End-to-end ingest and analytics timings on synthetic data, saved for regression comparison.
+
+For every size in --sizes (sales lines; the statement gets --bank-lines
+lines, at least three per card day) the suite generates the input files
+with benchmarks.synthetic (reused from --workdir when already there), then
+times:
+
+  parse_excel, parse_bank_pdf   one run each
+  ingest_files                  one run (parses again, then writes), with
+                                its stages as ingest.<stage>
+  kpi_summary, kpi_daily, kpi_top_products, kpi_top_customers,
+  vat_report, sales_facts, reconciliation
+                                median of --rounds runs on the SQL path
+                                (in-memory snapshots disabled)
+
+Each size is ingested as its own month (the first size as January, the
+second as February, ...) so the KPIs of one size never include the rows of
+another. Without --database-url or DATABASE_URL the suite runs on a fresh
+SQLite file in --workdir; point it at PostgreSQL only with a scratch
+database, since ingest_files writes the generated rows.
+
+Results go to benchmarks/results/suite_<dialect>_<timestamp>.json. With
+--compare, stages slower than --threshold times the baseline (and by more
+than 5 ms) are reported as regressions, and the exit status is 1.
+
+Usage (from backend/):
+
+    python -m benchmarks.suite --sizes 1000,10000,100000
+    python -m benchmarks.suite --sizes 1000,10000 --compare benchmarks/results/suite_sqlite_20240901_120000.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+MIN_REGRESSION_SECONDS = 0.005
+
+
+def _timed(fn: Callable, rounds: int = 1) -> Tuple[float, object]:
+    """Median wall time in seconds of `rounds` calls, and the last result."""
+    times, result = [], None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), result
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_size(lines: int, bank_lines: int, period: str, workdir: str, rounds: int) -> Dict:
+    # imported here: DATABASE_URL must be settled before app.database creates its engines
+    from app.database import SessionLocal
+    from app.services.metrics import (kpi_daily, kpi_summary, kpi_top_customers, kpi_top_products,
+                                      reconciliation, sales_facts, vat_report)
+    from app.services.ingest_timing import StageTimer
+    from app.services.parsing import ingest_files, parse_bank_pdf, parse_excel
+    from benchmarks.synthetic import generate
+
+    month = period[-2:]
+    started = time.perf_counter()
+    files = generate(workdir, period, lines, bank_lines)
+    stages: Dict[str, Dict] = {}
+    print(f'{lines} lines: generated in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+
+    def record(name: str, seconds: float, rows: int) -> None:
+        stages[name] = {'seconds': round(seconds, 6), 'rows': rows,
+                        'rows_per_second': round(rows / seconds) if seconds else None}
+        print(f'  {name:28s} {seconds * 1000:10.1f} ms  {rows:>9} rows', file=sys.stderr)
+
+    seconds, parsed = _timed(lambda: parse_excel(files['excel'], month))
+    record('parse_excel', seconds, len(parsed['normalized']))
+    seconds, bank = _timed(lambda: parse_bank_pdf(files['pdf'], month))
+    record('parse_bank_pdf', seconds, len(bank))
+    timer = StageTimer()
+    seconds, counts = _timed(lambda: ingest_files(files['excel'], files['pdf'], month, timer))
+    record('ingest_files', seconds, sum(counts))
+    for stage in timer.stages:
+        record('ingest.' + stage['stage'], stage['wall_ms'] / 1000, stage['rows'] or 0)
+
+    services = [
+        ('kpi_summary', kpi_summary, ()),
+        ('kpi_daily', kpi_daily, ()),
+        ('kpi_top_products', kpi_top_products, (10,)),
+        ('kpi_top_customers', kpi_top_customers, (10,)),
+        ('vat_report', vat_report, ()),
+        ('sales_facts', sales_facts, ()),
+        ('reconciliation', reconciliation, ()),
+    ]
+    db = SessionLocal()
+    try:
+        for name, fn, extra in services:
+            seconds, result = _timed(lambda: fn(db, month, *extra), rounds)
+            record(name, seconds, len(result) if isinstance(result, list) else 1)
+    finally:
+        db.close()
+    return {'period': period, 'bank_lines': files['bank_lines'], 'stages': stages}
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> Tuple[List[str], List[str]]:
+    """Lines of a current-vs-baseline table; regressions are marked and returned last."""
+    rows, regressions = [], []
+    for size, result in current['sizes'].items():
+        before = baseline.get('sizes', {}).get(size)
+        if before is None:
+            continue
+        for stage, now in result['stages'].items():
+            then = before['stages'].get(stage)
+            if then is None:
+                continue
+            ratio = now['seconds'] / then['seconds'] if then['seconds'] else float('inf')
+            slower = ratio > threshold and now['seconds'] - then['seconds'] > MIN_REGRESSION_SECONDS
+            line = (f"{size:>8} {stage:28s} {then['seconds'] * 1000:10.1f} -> {now['seconds'] * 1000:10.1f} ms"
+                    f"  x{ratio:.2f}{'  REGRESSION' if slower else ''}")
+            rows.append(line)
+            if slower:
+                regressions.append(line)
+    return rows, regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000', help='comma-separated sales line counts')
+    parser.add_argument('--bank-lines', type=int, default=500)
+    parser.add_argument('--year', type=int, default=2024)
+    parser.add_argument('--rounds', type=int, default=5, help='runs per analytics service (median kept)')
+    parser.add_argument('--database-url', help='defaults to DATABASE_URL, else a fresh SQLite file')
+    parser.add_argument('--workdir', help='generated files, reused across runs, and the SQLite database; '
+                                          'a temp dir by default')
+    parser.add_argument('--out', default=RESULTS_DIR)
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown ratio counted as a regression')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    if not 1 <= len(sizes) <= 12:
+        parser.error('between 1 and 12 sizes, one month each')
+    workdir = args.workdir or tempfile.mkdtemp(prefix='finance-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(workdir, f'bench_{int(time.time())}.db'))
+    os.environ['SNAPSHOT_ENABLED'] = '0'
+
+    from app.database import engine, init_embedded_db, is_embedded
+    if is_embedded:
+        init_embedded_db()
+
+    result = {
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': _git_revision(),
+        'database': engine.dialect.name,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'rounds': args.rounds,
+        'sizes': {},
+    }
+    for i, lines in enumerate(sizes, 1):
+        result['sizes'][str(lines)] = run_size(lines, args.bank_lines, f'{args.year}-{i:02d}', workdir, args.rounds)
+
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"suite_{engine.dialect.name}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=1)
+    print(f'saved {path}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows, regressions = compare(result, baseline, args.threshold)
+        print('\n'.join(rows))
+        if regressions:
+            print(f'{len(regressions)} regression(s) over x{args.threshold}')
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
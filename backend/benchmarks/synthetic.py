@@ -0,0 +1,206 @@
+"""Synthetic monthly input files: a sales workbook and a bank statement PDF.
+
+The workbook has the 'Detalhes de Documentos Emitidos' sheet with the
+columns of services.parsing.excel_col_map: invoices of one to six lines over
+every day of the month, a catalogue of products with fixed prices, VAT at
+0/5/7/14 %, and about 60 % of invoices paid by card.
+
+The statement has, for every day with card sales, the FECHO_TPA credit of
+that day's card gross (a few days deliberately short, so reconciliation has
+deltas to report), the STC commission debit and the IVA on the commission,
+padded to the requested size with internal transfers, reserves and other
+movements, 55 lines per page. It is written directly in PDF 1.4 with the
+standard Helvetica font, which pdfplumber reads like a bank export.
+
+Same seed, same files. Usage (from backend/):
+
+    python -m benchmarks.synthetic --month 2024-09 --lines 100000 --bank-lines 5000 --out /tmp/synthetic
+"""
+import argparse
+import calendar
+import os
+import zlib
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import numpy as np
+from openpyxl import Workbook
+
+from app.services.money import percent_of_cents
+from app.services.parsing import excel_col_map
+
+SHEET = 'Detalhes de Documentos Emitidos'
+CARD, CASH = 'Cartão Multicaixa', 'Numerário'
+VAT_RATES = np.array([14, 14, 14, 7, 5, 0])
+LINES_PER_PAGE = 55
+
+_ITEMS = ['Pão', 'Leite', 'Café', 'Arroz', 'Açúcar', 'Farinha', 'Óleo', 'Feijão', 'Massa', 'Sumo',
+          'Água', 'Bolacha', 'Queijo', 'Fiambre', 'Manteiga', 'Iogurte', 'Sabão', 'Detergente']
+_VARIANTS = ['', ' 1kg', ' 500g', ' 1L', ' 1,5L', ' Pack 6', ' Familiar', ' Premium']
+
+
+def month_days(period: str) -> List[datetime]:
+    year, month = (int(p) for p in period.split('-'))
+    return [datetime(year, month, d) for d in range(1, calendar.monthrange(year, month)[1] + 1)]
+
+
+def catalogue(rng: np.random.Generator, size: int = 144) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """Product names with a fixed net unit price (cents) and VAT rate each."""
+    names = [item + variant for item in _ITEMS for variant in _VARIANTS][:size]
+    prices = rng.integers(50_00, 5_000_00, len(names))
+    rates = rng.choice(VAT_RATES, len(names))
+    return names, prices, rates
+
+
+def sales_lines(period: str, lines: int, seed: int = 0) -> Dict[str, np.ndarray]:
+    """Columns of `lines` sales lines spread over the days of the period."""
+    rng = np.random.default_rng(seed)
+    days = month_days(period)
+    names, prices, rates = catalogue(rng)
+    # invoices of 1-6 lines, numbered in date order
+    sizes = rng.integers(1, 7, lines)
+    invoice = np.repeat(np.arange(lines), sizes)[:lines]
+    n_invoices = int(invoice[-1]) + 1
+    invoice_day = np.sort(rng.integers(0, len(days), n_invoices))
+    invoice_card = rng.random(n_invoices) < 0.6
+    product = rng.integers(0, len(names), lines)
+    quantity = rng.choice([1, 1, 1, 2, 2, 3, 5], lines)
+    net = prices[product] * quantity
+    vat = percent_of_cents(net, rates[product])
+    return {
+        'invoice': invoice, 'day': invoice_day[invoice], 'card': invoice_card[invoice],
+        'product': product, 'quantity': quantity, 'unit_cents': prices[product], 'vat_rate': rates[product],
+        'gross_cents': net + vat, 'names': np.array(names, dtype=object), 'days': np.array(days, dtype=object),
+    }
+
+
+def write_sales_xlsx(path: str, cols: Dict[str, np.ndarray]) -> None:
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(SHEET)
+    ws.append(list(excel_col_map))
+    names, days = cols['names'].tolist(), cols['days'].tolist()
+    rows = zip(cols['invoice'].tolist(), cols['day'].tolist(), cols['product'].tolist(), cols['quantity'].tolist(),
+               cols['unit_cents'].tolist(), cols['vat_rate'].tolist(), cols['gross_cents'].tolist(),
+               cols['card'].tolist())
+    for invoice, day, product, quantity, unit_cents, vat_rate, gross_cents, card in rows:
+        ws.append(['Factura', f'FT A/{invoice + 1}', days[day], f'P{product:04d}', names[product], quantity,
+                   unit_cents / 100, vat_rate, gross_cents / 100, CARD if card else CASH])
+    wb.save(path)
+
+
+def _amount(cents: int) -> str:
+    """1234567 -> '12.345,67', the statement's notation."""
+    whole, frac = divmod(abs(cents), 100)
+    return ('-' if cents < 0 else '') + f'{whole:,}'.replace(',', '.') + f',{frac:02d}'
+
+
+def statement_lines(period: str, cols: Dict[str, np.ndarray], lines: int, seed: int = 0) -> List[str]:
+    """Statement text lines: per card day TPA close, commission and its IVA, then filler."""
+    rng = np.random.default_rng(seed + 1)
+    days = month_days(period)
+    card_by_day = np.bincount(cols['day'][cols['card']], weights=cols['gross_cents'][cols['card']],
+                              minlength=len(days)).astype(np.int64)
+    entries: List[Tuple[int, str, int, int]] = []  # (day, description, debit, credit)
+    for day, card in enumerate(card_by_day):
+        if not card:
+            continue
+        credit = int(card) - (int(rng.integers(1, 50_000_00)) if rng.random() < 0.05 else 0)
+        commission = int(round(credit * 0.01))
+        lot = int(rng.integers(1, 999))
+        entries.append((day, f'Fecho TPA {lot:06d} Lote {day + 1}', 0, credit))
+        entries.append((day, f'Comissão TPA STC Lote {day + 1}', commission, 0))
+        entries.append((day, f'IVA s/Comissão TPA Lote {day + 1}', int(round(commission * 0.14)), 0))
+    fillers = [('Transf interna Conta Poupança', True), ('Reserva de Fundos Fornecedor', True),
+               ('Pagamento Fornecedor Ref', True), ('Depósito Numerário Balcão', False),
+               ('Levantamento ATM Luanda', True)]
+    for _ in range(max(0, lines - len(entries))):
+        text, is_debit = fillers[int(rng.integers(0, len(fillers)))]
+        amount = int(rng.integers(1_000_00, 800_000_00))
+        entries.append((int(rng.integers(0, len(days))), f'{text} {int(rng.integers(1000, 9999))}',
+                        amount if is_debit else 0, 0 if is_debit else amount))
+    entries.sort(key=lambda e: e[0])
+    balance = 50_000_000_00
+    out = []
+    for day, description, debit, credit in entries:
+        balance += credit - debit
+        out.append(f"{days[day]:%d-%m-%Y} {description} {_amount(debit)} {_amount(credit)} {_amount(balance)}")
+    return out
+
+
+def _pdf_text(text: str) -> bytes:
+    escaped = text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return escaped.encode('cp1252')
+
+
+def write_pdf(path: str, text_lines: List[str], title: str) -> None:
+    """A PDF with one text line per row, LINES_PER_PAGE rows per page."""
+    pages = [text_lines[i:i + LINES_PER_PAGE] for i in range(0, len(text_lines), LINES_PER_PAGE)] or [[]]
+    objects: List[bytes] = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'',  # page tree, filled in once the page ids are known
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+    ]
+    kids = []
+    for number, rows in enumerate(pages, 1):
+        header = [title, f'Página {number} de {len(pages)}', 'Data Descrição Débito Crédito Saldo']
+        content = b'BT /F1 8 Tf 13 TL 36 806 Td ' + b' '.join(
+            b'(' + _pdf_text(row) + b") '" for row in header + rows) + b' ET'
+        stream = zlib.compress(content)
+        objects.append(b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+                       b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % len(objects))
+        kids.append(len(objects))
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+        b' '.join(b'%d 0 R' % k for k in kids), len(kids))
+    with open(path, 'wb') as f:
+        f.write(b'%PDF-1.4\n')
+        offsets = []
+        for i, body in enumerate(objects, 1):
+            offsets.append(f.tell())
+            f.write(b'%d 0 obj\n' % i + body + b'\nendobj\n')
+        xref = f.tell()
+        f.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+        f.writelines(b'%010d 00000 n \n' % o for o in offsets)
+        f.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref))
+
+
+def generate(out_dir: str, period: str, lines: int, bank_lines: int, seed: int = 0) -> Dict:
+    """Write the sales workbook and bank statement of one period; return paths and totals.
+
+    Files already in out_dir are reused: the same arguments always produce
+    the same content, and a 1M-line workbook takes minutes to write.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    cols = sales_lines(period, lines, seed)
+    statement = statement_lines(period, cols, bank_lines, seed)
+    excel_path = os.path.join(out_dir, f'sales-{period}-{lines}-s{seed}.xlsx')
+    pdf_path = os.path.join(out_dir, f'bank-{period}-{lines}-{bank_lines}-s{seed}.pdf')
+    if not os.path.exists(excel_path):
+        write_sales_xlsx(excel_path + '.tmp', cols)
+        os.replace(excel_path + '.tmp', excel_path)
+    if not os.path.exists(pdf_path):
+        write_pdf(pdf_path + '.tmp', statement, f'Extracto de Conta {period} - Banco Sintético')
+        os.replace(pdf_path + '.tmp', pdf_path)
+    return {
+        'excel': excel_path, 'pdf': pdf_path, 'sales_lines': lines, 'bank_lines': len(statement),
+        'gross_cents': int(cols['gross_cents'].sum()),
+        'card_cents': int(cols['gross_cents'][cols['card']].sum()),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--month', default='2024-09', help='period as YYYY-MM')
+    parser.add_argument('--lines', type=int, default=1000, help='sales lines (1k to 1M)')
+    parser.add_argument('--bank-lines', type=int, default=500,
+                        help='statement lines; at least three per day with card sales')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='synthetic')
+    args = parser.parse_args()
+    result = generate(args.out, args.month, args.lines, args.bank_lines, args.seed)
+    for key, value in result.items():
+        print(f'{key:12s} {value}')
+
+
+if __name__ == '__main__':
+    main()
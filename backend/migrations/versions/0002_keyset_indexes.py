@@ -0,0 +1,31 @@
+from alembic import op
+
+revision = '0002_keyset_indexes'
+down_revision = '0001_init'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # (date, id) ordering for keyset pagination, with equality-filter prefixes
+    op.create_index('ix_normalized_sales_date_id',
+                    'normalized_sales', ['date', 'id'])
+    op.create_index('ix_normalized_sales_pm_date_id', 'normalized_sales', [
+                    'payment_method', 'date', 'id'])
+    op.create_index('ix_normalized_sales_vat_date_id', 'normalized_sales', [
+                    'vat_rate', 'date', 'id'])
+    op.create_index('ix_bank_tx_date_id', 'bank_tx', ['date', 'id'])
+    op.create_index('ix_bank_tx_type_date_id', 'bank_tx',
+                    ['tx_type', 'date', 'id'])
+    op.create_index('ix_recon_date_id', 'reconciliation_cache', ['date', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_recon_date_id', table_name='reconciliation_cache')
+    op.drop_index('ix_bank_tx_type_date_id', table_name='bank_tx')
+    op.drop_index('ix_bank_tx_date_id', table_name='bank_tx')
+    op.drop_index('ix_normalized_sales_vat_date_id',
+                  table_name='normalized_sales')
+    op.drop_index('ix_normalized_sales_pm_date_id',
+                  table_name='normalized_sales')
+    op.drop_index('ix_normalized_sales_date_id', table_name='normalized_sales')
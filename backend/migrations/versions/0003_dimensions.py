@@ -0,0 +1,67 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003_dimensions'
+down_revision = '0002_keyset_indexes'
+branch_labels = None
+depends_on = None
+
+# (dimension table, normalized_sales text column, key column, key type, name length, nullable)
+DIMENSIONS = [
+    ('products', 'product', 'product_id', sa.Integer(), 255, False),
+    ('customers', 'customer', 'customer_id', sa.Integer(), 255, True),
+    ('payment_methods', 'payment_method', 'payment_method_id', sa.SmallInteger(), 50, False),
+]
+
+
+def upgrade():
+    for table, text_col, key_col, key_type, length, nullable in DIMENSIONS:
+        op.create_table(table,
+                        sa.Column('id', key_type, primary_key=True),
+                        sa.Column('name', sa.String(
+                            length=length), nullable=False, unique=True)
+                        )
+        # The two canonical payment methods get the first keys
+        if table == 'payment_methods':
+            methods = sa.table('payment_methods', sa.column('name', sa.String))
+            op.bulk_insert(methods, [{'name': 'Cartão Multicaixa'}, {'name': 'Numerário'}])
+        op.execute(
+            f"INSERT INTO {table} (name) SELECT DISTINCT {text_col} FROM normalized_sales "
+            f"WHERE {text_col} IS NOT NULL AND {text_col} NOT IN (SELECT name FROM {table})"
+        )
+        op.add_column('normalized_sales', sa.Column(key_col, key_type))
+        op.execute(
+            f"UPDATE normalized_sales SET {key_col} = "
+            f"(SELECT id FROM {table} WHERE {table}.name = normalized_sales.{text_col})"
+        )
+        if not nullable:
+            op.alter_column('normalized_sales', key_col, nullable=False)
+        op.create_foreign_key(f'fk_normalized_sales_{key_col}', 'normalized_sales', table,
+                              [key_col], ['id'])
+
+    op.drop_index('ix_normalized_sales_pm_date_id',
+                  table_name='normalized_sales')
+    for _, text_col, _, _, _, _ in DIMENSIONS:
+        op.drop_column('normalized_sales', text_col)
+    op.create_index('ix_normalized_sales_pm_date_id', 'normalized_sales', [
+                    'payment_method_id', 'date', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_normalized_sales_pm_date_id',
+                  table_name='normalized_sales')
+    for table, text_col, key_col, _, length, nullable in reversed(DIMENSIONS):
+        op.add_column('normalized_sales', sa.Column(
+            text_col, sa.String(length=length)))
+        op.execute(
+            f"UPDATE normalized_sales SET {text_col} = "
+            f"(SELECT name FROM {table} WHERE {table}.id = normalized_sales.{key_col})"
+        )
+        if not nullable:
+            op.alter_column('normalized_sales', text_col, nullable=False)
+        op.drop_constraint(f'fk_normalized_sales_{key_col}',
+                           'normalized_sales', type_='foreignkey')
+        op.drop_column('normalized_sales', key_col)
+        op.drop_table(table)
+    op.create_index('ix_normalized_sales_pm_date_id', 'normalized_sales', [
+                    'payment_method', 'date', 'id'])
@@ -0,0 +1,42 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004_money_cents'
+down_revision = '0003_dimensions'
+branch_labels = None
+depends_on = None
+
+# (table, NUMERIC(18,2) column, BIGINT cents column, nullable)
+MONEY_COLUMNS = [
+    ('normalized_sales', 'unit_price_net', 'unit_price_net_cents', False),
+    ('normalized_sales', 'net_amount', 'net_cents', False),
+    ('normalized_sales', 'vat_amount', 'vat_cents', False),
+    ('normalized_sales', 'gross_amount', 'gross_cents', False),
+    ('bank_tx', 'debit', 'debit_cents', True),
+    ('bank_tx', 'credit', 'credit_cents', True),
+    ('bank_tx', 'balance', 'balance_cents', True),
+    ('reconciliation_cache', 'sales_card', 'sales_card_cents', False),
+    ('reconciliation_cache', 'bank_tpa', 'bank_tpa_cents', False),
+    ('reconciliation_cache', 'fees', 'fees_cents', False),
+    ('reconciliation_cache', 'delta', 'delta_cents', False),
+]
+
+
+def upgrade():
+    for table, amount_col, cents_col, nullable in MONEY_COLUMNS:
+        op.add_column(table, sa.Column(cents_col, sa.BigInteger()))
+        op.execute(
+            f"UPDATE {table} SET {cents_col} = CAST(ROUND({amount_col} * 100) AS BIGINT)")
+        if not nullable:
+            op.alter_column(table, cents_col, nullable=False)
+        op.drop_column(table, amount_col)
+
+
+def downgrade():
+    for table, amount_col, cents_col, nullable in reversed(MONEY_COLUMNS):
+        op.add_column(table, sa.Column(amount_col, sa.Numeric(18, 2)))
+        op.execute(
+            f"UPDATE {table} SET {amount_col} = CAST({cents_col} AS NUMERIC(18, 2)) / 100")
+        if not nullable:
+            op.alter_column(table, amount_col, nullable=False)
+        op.drop_column(table, cents_col)
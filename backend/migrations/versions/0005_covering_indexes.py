@@ -0,0 +1,60 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005_covering_indexes'
+down_revision = '0004_money_cents'
+branch_labels = None
+depends_on = None
+
+MONTH = sa.text('(EXTRACT(month FROM date))')
+
+# PostgreSQL only plans an index-only scan over an expression index when the
+# expression's input column is stored too, hence `date` in INCLUDE below
+# wherever it is not already a key column.
+
+# (name, table, key columns, INCLUDE columns) -- matched to the query they serve
+COVERING_INDEXES = [
+    # kpi_summary, kpi_daily, /lines/sales keyset
+    ('ix_sales_month_date_id', 'normalized_sales', [MONTH, 'date', 'id'],
+     ['payment_method_id', 'net_cents', 'vat_cents', 'gross_cents']),
+    # reconciliation card sales, /lines/sales?payment_method=
+    ('ix_sales_pm_month_date_id', 'normalized_sales', ['payment_method_id', MONTH, 'date', 'id'],
+     ['gross_cents']),
+    # /lines/sales?vat_rate=
+    ('ix_sales_vat_month_date_id', 'normalized_sales', ['vat_rate', MONTH, 'date', 'id'], []),
+    # kpi_top_products
+    ('ix_sales_month_product', 'normalized_sales', [MONTH, 'product_id'], ['date', 'gross_cents']),
+    # vat_report
+    ('ix_sales_month_vat', 'normalized_sales', [MONTH, 'vat_rate'],
+     ['date', 'net_cents', 'vat_cents', 'gross_cents']),
+    # /lines/bank keyset
+    ('ix_bank_tx_month_date_id', 'bank_tx', [MONTH, 'date', 'id'], []),
+    # reconciliation FECHO_TPA credits, /lines/bank?tx_type=
+    ('ix_bank_tx_type_month_date_id', 'bank_tx', ['tx_type', MONTH, 'date', 'id'], ['credit_cents']),
+    # /recon/card/page keyset
+    ('ix_recon_month_date_id', 'reconciliation_cache', [MONTH, 'date', 'id'], []),
+]
+
+# (date, id) keyset indexes from 0002, superseded by the month-prefixed ones
+KEYSET_INDEXES = [
+    ('ix_normalized_sales_date_id', 'normalized_sales', ['date', 'id']),
+    ('ix_normalized_sales_pm_date_id', 'normalized_sales', ['payment_method_id', 'date', 'id']),
+    ('ix_normalized_sales_vat_date_id', 'normalized_sales', ['vat_rate', 'date', 'id']),
+    ('ix_bank_tx_date_id', 'bank_tx', ['date', 'id']),
+    ('ix_bank_tx_type_date_id', 'bank_tx', ['tx_type', 'date', 'id']),
+    ('ix_recon_date_id', 'reconciliation_cache', ['date', 'id']),
+]
+
+
+def upgrade():
+    for name, table, _ in KEYSET_INDEXES:
+        op.drop_index(name, table_name=table)
+    for name, table, columns, include in COVERING_INDEXES:
+        op.create_index(name, table, columns, postgresql_include=include)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(COVERING_INDEXES):
+        op.drop_index(name, table_name=table)
+    for name, table, columns in KEYSET_INDEXES:
+        op.create_index(name, table, columns)
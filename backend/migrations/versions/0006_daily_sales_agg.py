@@ -0,0 +1,28 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006_daily_sales_agg'
+down_revision = '0005_covering_indexes'
+branch_labels = None
+depends_on = None
+
+MONEY = ['net_cents', 'vat_cents', 'gross_cents', 'card_cents', 'cash_cents']
+
+
+def upgrade():
+    op.create_table('daily_sales_agg',
+                    sa.Column('date', sa.Date(), primary_key=True),
+                    sa.Column('line_count', sa.Integer(), nullable=False),
+                    *[sa.Column(c, sa.BigInteger(), nullable=False) for c in MONEY])
+    op.execute(
+        "INSERT INTO daily_sales_agg (date, line_count, net_cents, vat_cents, gross_cents, card_cents, cash_cents) "
+        "SELECT s.date, COUNT(*), SUM(s.net_cents), SUM(s.vat_cents), SUM(s.gross_cents), "
+        "COALESCE(SUM(CASE WHEN pm.name = 'Cartão Multicaixa' THEN s.gross_cents END), 0), "
+        "COALESCE(SUM(CASE WHEN pm.name = 'Numerário' THEN s.gross_cents END), 0) "
+        "FROM normalized_sales s JOIN payment_methods pm ON pm.id = s.payment_method_id "
+        "GROUP BY s.date"
+    )
+
+
+def downgrade():
+    op.drop_table('daily_sales_agg')
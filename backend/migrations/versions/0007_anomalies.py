@@ -0,0 +1,28 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0007_anomalies'
+down_revision = '0006_daily_sales_agg'
+branch_labels = None
+depends_on = None
+
+MONTH = sa.text('(EXTRACT(month FROM date))')
+
+
+def upgrade():
+    op.create_table('anomalies',
+                    sa.Column('id', sa.Integer(), primary_key=True),
+                    sa.Column('date', sa.Date(), nullable=False),
+                    sa.Column('kind', sa.String(30), nullable=False),
+                    sa.Column('subject', sa.String(255), nullable=False),
+                    sa.Column('amount_cents', sa.BigInteger()),
+                    sa.Column('score', sa.Float()),
+                    sa.Column('detail_json', sa.Text(), nullable=False),
+                    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()))
+    # /quality/anomalies keyset, unfiltered and by kind
+    op.create_index('ix_anomalies_month_date_id', 'anomalies', [MONTH, 'date', 'id'])
+    op.create_index('ix_anomalies_kind_month_date_id', 'anomalies', ['kind', MONTH, 'date', 'id'])
+
+
+def downgrade():
+    op.drop_table('anomalies')
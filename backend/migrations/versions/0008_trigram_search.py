@@ -0,0 +1,30 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0008_trigram_search'
+down_revision = '0007_anomalies'
+branch_labels = None
+depends_on = None
+
+# (name, table, column) -- GIN trigram indexes behind /search/*
+TRIGRAM_INDEXES = [
+    ('ix_products_name_trgm', 'products', 'name'),
+    ('ix_bank_tx_description_trgm', 'bank_tx', 'description'),
+]
+
+
+def upgrade():
+    available = op.get_bind().execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first()
+    if available is None:
+        # The search service falls back to LIKE with ranking in Python
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        op.create_index(name, table, [column], postgresql_using='gin',
+                        postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade():
+    for name, _, _ in reversed(TRIGRAM_INDEXES):
+        op.execute(f'DROP INDEX IF EXISTS {name}')
@@ -0,0 +1,21 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0009_llm_answer_cache'
+down_revision = '0008_trigram_search'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('llm_answer_cache',
+                    sa.Column('key', sa.String(64), primary_key=True),
+                    sa.Column('answer', sa.Text(), nullable=False),
+                    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+                    sa.Column('used_at', sa.DateTime(timezone=True), nullable=False))
+    # least-recently-used pruning
+    op.create_index('ix_llm_answer_cache_used_at', 'llm_answer_cache', ['used_at'])
+
+
+def downgrade():
+    op.drop_table('llm_answer_cache')
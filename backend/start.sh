@@ -1,6 +1,14 @@
 #!/usr/bin/env sh
 set -eu
 
+case "${DATABASE_URL:-}" in
+  sqlite*)
+    # Embedded mode: the app creates the schema itself on startup
+    echo "[startup] Embedded SQLite database, skipping migrations."
+    exec uvicorn app.main:app --host 0.0.0.0 --port 8000
+    ;;
+esac
+
 # Simple wait for DB by probing Alembic metadata (retries)
 echo "[startup] Waiting for database to be ready..."
 retries=30
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import tempfile
+
+import httpx
+import pytest
+
+# Without DATABASE_URL the suite runs on an embedded SQLite file, so no
+# database server is needed. Point DATABASE_URL at PostgreSQL (migrated to
+# head) to run the same tests against it.
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(
+    tempfile.mkdtemp(prefix='finance-tests-'), 'finance.db'))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.config import settings, to_async_url  # noqa: E402
+from app.database import Base, _configure_sqlite, _engine_options, init_embedded_db, is_embedded  # noqa: E402
+from app.llm import groq, http  # noqa: E402
+from app.llm.answer_cache import AnswerCache  # noqa: E402
+from app.llm.guard import CircuitBreaker, ProviderGuard  # noqa: E402
+from app.models.models import CustomerDim, NormalizedSales, PaymentMethodDim, ProductDim  # noqa: E402
+from app.services import metrics  # noqa: E402
+from app.services.dimensions import DimensionLookup  # noqa: E402
+
+if is_embedded:
+    init_embedded_db()
+
+FACTS = {'month': '07', 'gross': 100.0, 'vat': 14.0, 'net': 86.0, 'card': 60.0, 'card_share_pct': 60.0,
+         'invoice_count': 3, 'peak_day': '2035-07-01', 'peak_gross': 70.0, 'top_product': 'Pao',
+         'fees_total': 0.0, 'delta_sum': 5.0, 'vat_rows': [(14.0, 14.0)]}
+
+
+@pytest.fixture
+def facts():
+    """Month facts as the chat prompt gets them."""
+    return dict(FACTS)
+
+
+@pytest.fixture
+def mock_provider(monkeypatch):
+    """mock_provider(handler, cache=None, guard=None): answer provider calls with an httpx handler.
+
+    The answer cache is off and the guard fresh unless given. The mock client
+    stays the shared client until the test ends (or an app lifespan closes it).
+    """
+    def install(handler, cache=None, guard=None):
+        monkeypatch.setattr(settings, 'llm_api_url', 'https://llm.test/v1')
+        monkeypatch.setattr(settings, 'llm_api_key', 'k')
+        monkeypatch.setattr(groq, 'answer_cache', cache if cache is not None else AnswerCache(None, ttl=0))
+        monkeypatch.setattr(groq, 'provider_guard',
+                            guard if guard is not None else ProviderGuard(8, 5, CircuitBreaker(5, 30)))
+        http._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return http._client
+
+    yield install
+    asyncio.run(http.close_client())
+
+
+@pytest.fixture
+def seed_sales():
+    """seed_sales(db, lines): add and flush sales lines given as
+    (date, invoice, customer or None, product, payment method, vat rate, gross cents)."""
+    def seed(db, lines):
+        products = DimensionLookup(db, ProductDim).resolve({l[3] for l in lines})
+        customers = DimensionLookup(db, CustomerDim).resolve({l[2] for l in lines})
+        methods = DimensionLookup(db, PaymentMethodDim).resolve({l[4] for l in lines})
+        for day, invoice, customer, product, method, rate, gross in lines:
+            vat = round(gross * rate / (100 + rate))
+            db.add(NormalizedSales(
+                date=day, invoice_number=invoice, customer_id=customers[customer] if customer else None,
+                product_id=products[product], quantity=1, unit_price_net_cents=gross - vat, vat_rate=rate,
+                net_cents=gross - vat, vat_cents=vat, gross_cents=gross, payment_method_id=methods[method]))
+        db.flush()
+    return seed
+
+
+@pytest.fixture
+def month_metrics():
+    """month_metrics(db, month, top): every metrics service of a month, for comparing two data paths."""
+    def run(db, month, top):
+        return {
+            'summary': metrics.kpi_summary(db, month),
+            'daily': metrics.kpi_daily(db, month),
+            'top_products': metrics.kpi_top_products(db, month, top),
+            'top_customers': metrics.kpi_top_customers(db, month, top),
+            'vat': metrics.vat_report(db, month),
+            'facts': metrics.sales_facts(db, month),
+        }
+    return run
+
+
+def _scratch_url(tmp_path) -> str:
+    url = 'sqlite:///' + str(tmp_path / 'scratch.db')
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def scratch_db(tmp_path):
+    """A session on a fresh SQLite file, whatever DATABASE_URL points at.
+
+    For tests that delete rows by date range (archive drops) or prune whole
+    tables: they must never run against a database holding real data.
+    """
+    url = _scratch_url(tmp_path)
+    scratch = create_engine(url, **_engine_options(url))
+    _configure_sqlite(scratch)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=scratch)()
+    try:
+        yield db
+    finally:
+        db.close()
+        scratch.dispose()
+
+
+@pytest.fixture
+def scratch_async_engine(tmp_path):
+    """Async engine on a fresh SQLite file; the test disposes of it inside its event loop."""
+    url = to_async_url(_scratch_url(tmp_path))
+    scratch = create_async_engine(url, **_engine_options(url))
+    _configure_sqlite(scratch.sync_engine)
+    return scratch
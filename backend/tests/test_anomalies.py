@@ -0,0 +1,81 @@
+from datetime import date
+
+from fastapi.testclient import TestClient
+
+from app.database import SessionLocal
+from app.main import app
+from app.models.models import BankTx, ProductDim, PaymentMethod
+from app.services import anomalies
+from app.services.dimensions import DimensionLookup
+from app.services.lines import anomaly_lines
+
+PRODUCT, TX_TYPE = 'Anomalia Pao', 'ANOMALY_TEST'
+
+
+def _lines(lines):
+    """(day, invoice, gross cents) -> seed_sales rows: card sales of PRODUCT at 0 % VAT."""
+    return [(day, invoice, None, PRODUCT, PaymentMethod.CARTAO.value, 0.0, gross) for day, invoice, gross in lines]
+
+
+def _batch(lines, product_id):
+    return anomalies.sales_frame(
+        [{'date': d, 'invoice_number': inv, 'product': PRODUCT, 'quantity': 1.0, 'gross_cents': g}
+         for d, inv, g in lines], {PRODUCT: product_id})
+
+
+def test_ingest_batch_findings(seed_sales):
+    db = SessionLocal()
+    try:
+        product = DimensionLookup(db, ProductDim).resolve({PRODUCT})[PRODUCT]
+        # 20 ordinary days, one invoice each
+        seed_sales(db, _lines([(date(2033, 4, d), f'FT T/{d}', 1000 + d % 3 * 10) for d in range(1, 21)]))
+        for d in range(1, 16):
+            db.add(BankTx(date=date(2033, 4, d), description='TPA', credit_cents=10000 + d * 7, tx_type=TX_TYPE))
+        db.flush()
+
+        batch = [
+            (date(2033, 4, 21), 'FT T/20', 1000),   # invoice already ingested
+            (date(2033, 4, 21), 'FT T/23', 1010),   # T/21 and T/22 missing
+            (date(2033, 4, 21), 'FT T/23', 1010),   # same line twice
+            (date(2033, 4, 21), 'FT T/24', -500),   # negative
+            (date(2033, 4, 22), 'FT T/25', 50000),  # far above the product's usual day
+        ]
+        bank = [{'date': date(2033, 4, 22), 'description': 'TPA grande', 'tx_type': TX_TYPE,
+                 'debit_cents': None, 'credit_cents': 90000}]
+        findings = (anomalies.detect_sales(db, _batch(batch, product))
+                    + anomalies.detect_bank(db, anomalies.bank_frame(bank)))
+        assert anomalies.store(db, findings) == 6
+        db.flush()
+        assert anomalies.store(db, findings) == 0  # already recorded
+
+        page = anomaly_lines(db, '04', limit=50)
+        found = {(a['kind'], a['subject']): a for a in page['items'] if a['subject'] in
+                 ('FT T/20', 'FT T/23', 'FT T/', 'FT T/24', PRODUCT, TX_TYPE)}
+        assert set(found) == {('duplicate_invoice', 'FT T/20'), ('duplicate_line', 'FT T/23'),
+                              ('invoice_gap', 'FT T/'), ('negative_line', 'FT T/24'),
+                              ('sales_outlier', PRODUCT), ('bank_outlier', TX_TYPE)}
+        assert found[('invoice_gap', 'FT T/')]['detail']['missing'] == 2
+        assert found[('duplicate_line', 'FT T/23')]['detail']['copies'] == 2
+        assert found[('sales_outlier', PRODUCT)]['date'] == '2033-04-22'
+        assert found[('sales_outlier', PRODUCT)]['score'] > 3
+        assert found[('bank_outlier', TX_TYPE)]['amount'] == 900.0
+
+        first = anomaly_lines(db, '04', limit=2, kind='invoice_gap')
+        assert [a['kind'] for a in first['items']] == ['invoice_gap']
+
+        # a later upload with the missing invoices closes the gap
+        seed_sales(db, _lines(batch))
+        late = [(date(2033, 4, 21), 'FT T/21', 1000), (date(2033, 4, 21), 'FT T/22', 1000)]
+        anomalies.store(db, anomalies.detect_sales(db, _batch(late, product)))
+        db.flush()
+        assert anomaly_lines(db, '04', kind='invoice_gap')['items'] == []
+    finally:
+        db.rollback()
+        db.close()
+
+
+def test_unknown_anomaly_kind_is_rejected():
+    with TestClient(app) as client:
+        r = client.get('/quality/anomalies', params={'month': '04', 'kind': 'invoice_gaps'})
+        assert r.status_code == 400 and 'invoice_gaps' in r.json()['detail']
+        assert client.get('/quality/anomalies', params={'month': '04', 'kind': 'invoice_gap'}).status_code == 200
@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.llm import groq
+from app.llm.answer_cache import AnswerCache, DatabaseBackend, MemoryBackend, cache_key
+from app.models.models import LlmAnswerCache
+
+
+def test_key_ignores_case_spacing_and_punctuation_but_not_facts():
+    assert cache_key('m', '  VAT   breakdown?', 'facts') == cache_key('m', 'vat breakdown', 'facts')
+    assert cache_key('m', 'vat breakdown', 'facts') != cache_key('m', 'vat breakdown', 'facts after ingest')
+    assert cache_key('m', 'vat breakdown', 'facts') != cache_key('other', 'vat breakdown', 'facts')
+
+
+def test_memory_backend_lru_and_ttl():
+    async def run():
+        backend = MemoryBackend(max_entries=2)
+        await backend.set('a', 'A', 60)
+        await backend.set('b', 'B', 60)
+        assert await backend.get('a') == 'A'  # b is now least recently used
+        await backend.set('c', 'C', 60)
+        assert [await backend.get(k) for k in 'abc'] == ['A', None, 'C']
+        await backend.set('d', 'D', -1)  # already expired
+        assert await backend.get('d') is None
+    asyncio.run(run())
+
+
+def test_database_backend_shares_and_prunes(scratch_async_engine):
+    async def run():
+        backend = DatabaseBackend(async_sessionmaker(scratch_async_engine, expire_on_commit=False), max_entries=2)
+        try:
+            for key in 'abc':
+                await backend.set(key, key.upper(), 60)
+            assert [await backend.get(k) for k in 'abc'] == [None, 'B', 'C']
+            await backend.set('b', 'B2', -1)
+            assert await backend.get('b') is None
+        finally:
+            await scratch_async_engine.dispose()
+    asyncio.run(run())
+
+
+def test_database_backend_keeps_max_entries_when_used_at_ties(scratch_async_engine):
+    async def run():
+        sessions = async_sessionmaker(scratch_async_engine, expire_on_commit=False)
+        backend = DatabaseBackend(sessions, max_entries=2)
+        hour_ago = datetime.now(timezone.utc) - timedelta(hours=1)
+        try:
+            async with sessions() as db:
+                db.add_all([LlmAnswerCache(key=k, answer=k, expires_at=hour_ago + timedelta(days=1), used_at=hour_ago)
+                            for k in 'ab'])
+                await db.commit()
+            await backend.set('x', 'X', 86400)
+            return [await backend.get(k) for k in 'abx']
+        finally:
+            await scratch_async_engine.dispose()
+    # a and b share the cutoff timestamp: only the one past the limit goes
+    assert asyncio.run(run()) == ['a', None, 'X']
+
+
+def test_answer_groq_reuses_cached_answers(mock_provider, facts):
+    calls = []
+
+    def reply(request):
+        calls.append(request)
+        return httpx.Response(200, json={'choices': [{'message': {'content': f'answer {len(calls)}'}}]})
+
+    cache = AnswerCache(MemoryBackend(10), ttl=60)
+    mock_provider(reply, cache=cache)
+
+    async def run():
+        first = await groq.answer_groq('07', 'VAT breakdown?', facts)
+        again = await groq.answer_groq('07', 'vat breakdown', facts)
+        streamed = [t async for t in groq.stream_groq('07', 'Vat Breakdown', facts)]
+        changed = await groq.answer_groq('07', 'vat breakdown', dict(facts, vat=15.0))
+        return first, again, streamed, changed
+
+    first, again, streamed, changed = asyncio.run(run())
+    assert first == again == 'answer 1' and streamed == ['answer 1']
+    assert changed == 'answer 2'  # new facts, new key
+    assert len(calls) == 2
+    assert cache.stats() == {'backend': 'memory', 'hits': 2, 'misses': 2, 'hit_rate': 0.5}
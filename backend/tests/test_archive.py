@@ -0,0 +1,56 @@
+from datetime import date
+
+import pytest
+
+from app.config import settings
+from app.models.models import NormalizedSales, BankTx, PaymentMethod
+from app.services.archive import _save_manifest, archive_period, load_manifest
+from app.services.parsing import ingest_files
+from app.services.snapshot import snapshots
+from benchmarks.synthetic import generate
+
+CARD, CASH = PaymentMethod.CARTAO.value, PaymentMethod.NUMERARIO.value
+# (date, invoice, customer, product, payment method, vat rate, gross cents)
+LINES = [
+    (date(2023, 5, 2), 'FR 23/1', 'Ana', 'Pao', CARD, 14.0, 11400),
+    (date(2023, 5, 2), 'FR 23/2', None, 'Leite', CASH, 5.0, 10500),
+    (date(2023, 5, 9), 'FR 23/3', 'Rui', 'Cafe', CARD, 0.0, 3000),
+    (date(2024, 5, 2), 'FR 24/1', 'Ana', 'Leite', CARD, 14.0, 5700),
+    (date(2024, 5, 3), 'FR 24/1', None, 'Pao', CASH, 14.0, 2280),
+]
+
+
+def test_archived_month_answers_like_live_rows(scratch_db, seed_sales, month_metrics, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'archive_dir', str(tmp_path / 'archive'))
+    monkeypatch.setattr(settings, 'snapshot_enabled', False)
+    db = scratch_db
+    snapshots.invalidate()
+    try:
+        seed_sales(db, LINES)
+        db.add(BankTx(date=date(2023, 5, 3), description='Fecho TPA', credit_cents=11000, tx_type='FECHO_TPA'))
+        db.commit()
+        before = month_metrics(db, '05', 2)
+
+        with pytest.raises(ValueError):
+            archive_period(db, date.today().strftime('%Y-%m'))
+        res = archive_period(db, '2023-05', drop=True)
+        assert (res['sales_rows'], res['bank_rows'], res['dropped']) == (3, 1, True)
+        assert (tmp_path / 'archive' / '2023-05' / 'normalized_sales.parquet').exists()
+        assert db.query(NormalizedSales).filter(NormalizedSales.date < date(2024, 1, 1)).count() == 0
+        assert load_manifest()['2023-05']['dropped'] is True
+
+        assert month_metrics(db, '05', 2) == before
+        monkeypatch.setattr(settings, 'snapshot_enabled', True)
+        monkeypatch.setattr(settings, 'snapshot_months', '05')
+        snapshots.invalidate()
+        assert month_metrics(db, '05', 2) == before
+    finally:
+        snapshots.invalidate()
+
+
+def test_ingest_refuses_a_dropped_period(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'archive_dir', str(tmp_path / 'archive'))
+    files = generate(str(tmp_path), '2034-11', lines=20, bank_lines=30)
+    _save_manifest({'2034-11': {'sales_rows': 20, 'bank_rows': 30, 'recon_rows': 0, 'dropped': True}})
+    with pytest.raises(ValueError, match='2034-11'):
+        ingest_files(files['excel'], files['pdf'], '11')
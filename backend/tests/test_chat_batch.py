@@ -0,0 +1,71 @@
+import asyncio
+import json
+from datetime import date
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.database import SessionLocal
+from app.llm.facts import MonthFacts, facts_cache
+from app.main import app
+from app.models.models import NormalizedSales, PaymentMethod
+
+DAYS = (date(2035, 5, 3), date(2035, 6, 3))
+
+
+def test_batch_collects_facts_once_per_month_and_keeps_order(mock_provider, seed_sales, monkeypatch):
+    computed = []
+    state = {'running': 0, 'peak': 0}
+    compute = MonthFacts._compute
+
+    async def counting(self, group):
+        computed.append((self.month, group))
+        if self.month == '13':
+            raise ValueError('no such month')
+        return await compute(self, group)
+
+    async def handler(request):
+        state['running'] += 1
+        state['peak'] = max(state['peak'], state['running'])
+        await asyncio.sleep(0.02)
+        state['running'] -= 1
+        prompt = json.loads(request.content)['messages'][-1]['content']
+        question = prompt.split('Question: ', 1)[1].split('\n', 1)[0]
+        return httpx.Response(200, json={'choices': [{'message': {'content': 're: ' + question}}]})
+
+    monkeypatch.setattr(MonthFacts, '_compute', counting)
+    monkeypatch.setattr(settings, 'llm_batch_concurrency', 2)
+    mock_provider(handler)
+    facts_cache.invalidate()
+
+    db = SessionLocal()
+    seed_sales(db, [(day, f'FT B/{i}', None, 'Chat Pao', PaymentMethod.CARTAO.value, 0.0, 1000)
+                    for i, day in enumerate(DAYS)])
+    db.commit()
+    items = [{'month': m, 'question': f'question {i} about {m}'}
+             for i, m in enumerate(['05', '06', '05', '13', '06', '05'])]
+    try:
+        with TestClient(app) as client:
+            r = client.post('/chat/ask-batch', json={'items': items})
+    finally:
+        db.query(NormalizedSales).filter(NormalizedSales.date.in_(DAYS)).delete()
+        db.commit()
+        db.close()
+    assert r.status_code == 200
+    out = r.json()['items']
+    assert [(o['month'], o['question']) for o in out] == [(i['month'], i['question']) for i in items]
+    for o in out:
+        if o['month'] == '13':
+            assert o['answer'] is None and 'no such month' in o['error']
+        else:
+            assert o['error'] is None and o['answer'] == 're: ' + o['question']
+    assert sorted(computed) == [('05', 'recon'), ('05', 'sales'), ('06', 'recon'), ('06', 'sales'), ('13', 'sales')]
+    assert state['peak'] == 2
+
+
+def test_batch_size_is_bounded(monkeypatch):
+    monkeypatch.setattr(settings, 'llm_batch_max_items', 2)
+    with TestClient(app) as client:
+        r = client.post('/chat/ask-batch', json={'items': [{'month': '05', 'question': 'hi'}] * 3})
+    assert r.status_code == 400
@@ -0,0 +1,86 @@
+from datetime import date
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import SessionLocal, async_engine
+from app.main import app
+from app.models.models import NormalizedSales, PaymentMethod, ReconciliationCache
+from app.llm.facts import facts_cache
+from app.llm.stub import route
+
+CARD = PaymentMethod.CARTAO.value
+DAY = date(2035, 6, 2)
+
+
+def test_repeat_questions_reuse_month_facts(seed_sales):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    db = SessionLocal()
+    try:
+        seed_sales(db, [(DAY, 'FT C/1', None, 'Chat Pao', CARD, 0.0, 123400)])
+        db.commit()
+        with TestClient(app) as client:
+            def ask(question):
+                r = client.post('/chat/ask', json={'month': '06', 'question': question})
+                assert r.status_code == 200
+                return r.json()['answer']
+
+            assert 'Total gross sales 1234.00' in ask('monthly report')
+            event.listen(async_engine.sync_engine, 'before_cursor_execute', record)
+            try:
+                assert 'Card 1234.00' in ask('card vs cash?')
+                assert 'Total gross sales 1234.00' in ask('monthly report')
+            finally:
+                event.remove(async_engine.sync_engine, 'before_cursor_execute', record)
+            # only the data-version check per question: no aggregation, no reconciliation writes
+            queries = [s for s in statements if s != 'BEGIN']  # SQLite issues its own BEGIN
+            assert len(queries) == 2 and all('max(normalized_sales.id)' in q for q in queries)
+            assert facts_cache.stats()['hits'] >= 2
+
+            seed_sales(db, [(DAY, 'FT C/2', None, 'Chat Pao', CARD, 0.0, 100000)])
+            db.commit()
+            assert 'Total gross sales 2234.00' in ask('monthly report')
+    finally:
+        db.rollback()
+        db.query(NormalizedSales).filter(NormalizedSales.date == DAY).delete()
+        db.query(ReconciliationCache).filter(ReconciliationCache.date == DAY).delete()
+        db.commit()
+        db.close()
+
+
+def test_stub_intents_resolve_only_their_facts(seed_sales):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if statement != 'BEGIN':
+            statements.append(statement.lower())
+
+    assert [route(q).name for q in ('Hello there', 'IVA?', 'private', 'best day', 'why the delta', 'hiking')] == \
+        ['greeting', 'vat', 'vat', 'peak_day', 'recon_explain', 'default']
+    db = SessionLocal()
+    try:
+        seed_sales(db, [(DAY, 'FT C/3', None, 'Chat Pao', CARD, 0.0, 50000)])
+        db.commit()
+        facts_cache.invalidate()
+        with TestClient(app) as client:
+            event.listen(async_engine.sync_engine, 'before_cursor_execute', record)
+            try:
+                r = client.post('/chat/ask', json={'month': '06', 'question': 'hello'})
+                assert r.json()['answer'].startswith('Hi!') and statements == []
+
+                r = client.post('/chat/ask', json={'month': '06', 'question': 'VAT breakdown'})
+                assert r.json()['answer'] == 'VAT breakdown for 06: 0%: 0.00. Total VAT: 0.00.'
+            finally:
+                event.remove(async_engine.sync_engine, 'before_cursor_execute', record)
+        # the version check and the VAT aggregate: no reconciliation, no other aggregates
+        assert len(statements) == 2 and 'max(normalized_sales.id)' in statements[0]
+        assert 'group by normalized_sales.vat_rate' in statements[1]
+    finally:
+        db.rollback()
+        db.query(NormalizedSales).filter(NormalizedSales.date == DAY).delete()
+        db.commit()
+        db.close()
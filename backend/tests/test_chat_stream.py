@@ -0,0 +1,50 @@
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.llm import groq
+from app.main import app
+
+
+def _events(body: str):
+    for frame in body.strip().split('\n\n'):
+        event, data = frame.split('\n')
+        yield event[len('event: '):], json.loads(data[len('data: '):])
+
+
+def test_stub_streams_the_same_answer():
+    with TestClient(app) as client:
+        body = {'month': '07', 'question': 'monthly report'}
+        whole = client.post('/chat/ask', json=body).json()['answer']
+        r = client.post('/chat/stream', json=body)
+        assert r.headers['content-type'].startswith('text/event-stream')
+        events = list(_events(r.text))
+        assert len(events) > 2 and all(e == 'token' for e, _ in events[:-1])
+        assert ''.join(d['text'] for _, d in events[:-1]) == whole
+        done = events[-1]
+        assert done[0] == 'done' and 0 <= done[1]['ttft_ms'] <= done[1]['total_ms']
+        assert client.get('/chat/status').json()['ttft']['count'] >= 1
+
+
+def test_provider_stream_failing_midway_ends_with_grounded_summary(mock_provider, facts):
+    async def body():
+        yield b'data: {"choices":[{"delta":{"role":"assistant"}}]}\n\n'
+        yield b'data: {"choices":[{"delta":{"content":"Gross was"}}]}\n\n'
+        yield b'data: {"choices":[{"delta":{"content":" 100.00"}}]}\n\n'
+        raise httpx.ReadError('connection reset')
+
+    def reply(request):
+        assert json.loads(request.content)['stream'] is True
+        return httpx.Response(200, headers={'content-type': 'text/event-stream'}, content=body())
+
+    mock_provider(reply)
+
+    async def run():
+        return [t async for t in groq.stream_groq('07', 'what was gross?', facts)]
+
+    tokens = asyncio.run(run())
+    assert tokens[:2] == ['Gross was', ' 100.00']
+    assert tokens[2] == '\n\n' + groq.grounded_fallback(facts)
+    assert len(tokens) == 3
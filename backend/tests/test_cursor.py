@@ -0,0 +1,15 @@
+from datetime import date
+
+import pytest
+
+from app.services.lines import encode_cursor, decode_cursor
+
+
+def test_cursor_roundtrip():
+    c = encode_cursor(date(2025, 9, 14), 1234)
+    assert decode_cursor(c) == (date(2025, 9, 14), 1234)
+
+
+def test_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
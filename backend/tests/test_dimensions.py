@@ -0,0 +1,27 @@
+from app.database import SessionLocal
+from app.models.models import ProductDim
+from app.services.dimensions import DimensionLookup
+
+NAMES = ['Dim Race A 2035', 'Dim Race B 2035', 'Dim Race C 2035']
+
+
+def test_resolve_inserts_the_rest_after_a_concurrent_insert():
+    db, other = SessionLocal(), SessionLocal()
+    try:
+        lookup = DimensionLookup(db, ProductDim)
+        db.commit()  # a later read sees the other ingest's commit, as under READ COMMITTED
+        other.add(ProductDim(name=NAMES[1]))
+        other.commit()
+        theirs = other.query(ProductDim.id).filter(ProductDim.name == NAMES[1]).scalar()
+
+        ids = lookup.resolve(NAMES)
+        db.commit()
+        assert ids[NAMES[1]] == theirs
+        stored = dict(db.query(ProductDim.name, ProductDim.id).filter(ProductDim.name.in_(NAMES)))
+        assert stored == {n: ids[n] for n in NAMES}
+    finally:
+        db.rollback()
+        db.query(ProductDim).filter(ProductDim.name.in_(NAMES)).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+        other.close()
@@ -0,0 +1,53 @@
+import csv
+import gzip
+import io
+from datetime import date
+
+from fastapi.testclient import TestClient
+
+from app.database import SessionLocal
+from app.main import app
+from app.models.models import NormalizedSales, BankTx, PaymentMethod
+from app.services import exports
+
+RATE = 2.0  # not a real Angolan rate, keeps the export filter to the seeded lines
+
+
+def _seed(db, seed_sales):
+    # net 1000 + i and VAT 20 cents each
+    seed_sales(db, [(date(2032, 8, 7 - i), f'FT X/{i}', None, 'Pao', PaymentMethod.CARTAO.value, RATE, 1020 + i)
+                    for i in range(7)])
+    db.add(BankTx(date=date(2032, 8, 1), description='Teste; "aspas"', credit_cents=5050, tx_type='EXPORT_TEST'))
+    db.commit()
+
+
+def _cleanup(db):
+    db.query(NormalizedSales).filter(NormalizedSales.vat_rate == RATE).delete()
+    db.query(BankTx).filter(BankTx.tx_type == 'EXPORT_TEST').delete()
+    db.commit()
+
+
+def test_streamed_exports_in_batches(seed_sales, monkeypatch):
+    monkeypatch.setattr(exports, 'EXPORT_CHUNK_ROWS', 3)
+    db = SessionLocal()
+    try:
+        _seed(db, seed_sales)
+        chunks = list(exports.export_sales(SessionLocal, '08', vat_rate=RATE))
+        assert len(chunks) == 3  # 7 lines in batches of 3
+        rows = list(csv.DictReader(io.StringIO(b''.join(chunks).decode())))
+        assert [r['invoice_number'] for r in rows] == [f'FT X/{i}' for i in range(6, -1, -1)]  # (date, id) order
+        assert rows[0]['gross_amount'] == '10.26' and rows[0]['customer'] == ''
+
+        packed = b''.join(exports.export_sales(SessionLocal, '08', vat_rate=RATE, compress=True))
+        assert gzip.decompress(packed) == b''.join(chunks)
+
+        with TestClient(app) as client:
+            r = client.get('/export/bank', params={'month': '08', 'tx_type': 'EXPORT_TEST', 'gzip': True})
+        assert r.status_code == 200
+        assert r.headers['content-disposition'] == 'attachment; filename="bank_08.csv.gz"'
+        bank = list(csv.DictReader(io.StringIO(gzip.decompress(r.content).decode())))
+        assert [(b['description'], b['credit']) for b in bank] == [('Teste; "aspas"', '50.5')]
+    finally:
+        db.rollback()
+        _cleanup(db)
+        db.close()
@@ -0,0 +1,73 @@
+from datetime import date
+
+import msgpack
+import pyarrow as pa
+from fastapi.testclient import TestClient
+
+from app.api.formats import negotiate, arrow_ipc, BANK_SCHEMA, RECON_SCHEMA, SALES_SCHEMA, JSON, MSGPACK, ARROW
+from app.database import SessionLocal
+from app.main import app
+from app.models.models import NormalizedSales, PaymentMethod
+
+CARD, CASH = PaymentMethod.CARTAO.value, PaymentMethod.NUMERARIO.value
+OCTOBER = (date(2032, 10, 1), date(2032, 10, 31))
+
+
+def test_negotiate_accept_header():
+    assert negotiate(None) == JSON
+    assert negotiate('*/*') == JSON
+    assert negotiate('text/html, application/msgpack') == MSGPACK
+    assert negotiate('application/x-msgpack') == MSGPACK
+    assert negotiate('application/json;q=0.5, application/vnd.apache.arrow.stream') == ARROW
+    assert negotiate('application/vnd.apache.arrow.stream;q=0, application/msgpack;q=0.1') == MSGPACK
+    assert negotiate('text/csv') == JSON
+
+
+def test_formats_carry_the_same_rows(seed_sales):
+    rows = [
+        {'date': '2032-10-01', 'sales_card': 100.5, 'bank_tpa': 100.0, 'fees': 0.0, 'delta': 0.5},
+        {'date': '2032-10-02', 'sales_card': 20.0, 'bank_tpa': 0.0, 'fees': 0.0, 'delta': 20.0},
+    ]
+    db = SessionLocal()
+    try:
+        seed_sales(db, [(date(2032, 10, 1), 'FR 10/1', None, 'Pao', CARD, 0.0, 10050),
+                        (date(2032, 10, 2), 'FR 10/2', None, 'Pao', CASH, 0.0, 2000)])
+        db.commit()
+        with TestClient(app) as client:
+            # an empty page is enough to check the page plumbing on a real endpoint
+            r = client.get('/lines/bank', params={'month': '10', 'tx_type': 'NONE'}, headers={'Accept': MSGPACK})
+            assert r.headers['content-type'] == MSGPACK and r.headers['vary'] == 'Accept'
+            assert msgpack.unpackb(r.content) == {'items': [], 'next_cursor': None}
+            r = client.get('/kpi/daily', params={'month': '10'}, headers={'Accept': ARROW})
+            assert r.headers['content-type'] == ARROW
+            daily = pa.ipc.open_stream(r.content).read_all()
+            # an empty page still carries the endpoint's columns
+            r = client.get('/lines/bank', params={'month': '10', 'tx_type': 'NONE'}, headers={'Accept': ARROW})
+            empty = pa.ipc.open_stream(r.content).read_all()
+            assert empty.schema == BANK_SCHEMA and empty.num_rows == 0
+    finally:
+        db.rollback()
+        db.query(NormalizedSales).filter(NormalizedSales.date.between(*OCTOBER)).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+    assert daily.schema == pa.schema([('date', pa.date32()), ('gross', pa.float64()), ('card', pa.float64()),
+                                      ('cash', pa.float64())])
+    assert daily.num_rows == 2
+    assert daily.to_pylist() == [
+        {'date': date(2032, 10, 1), 'gross': 100.5, 'card': 100.5, 'cash': 0.0},
+        {'date': date(2032, 10, 2), 'gross': 20.0, 'card': 0.0, 'cash': 20.0},
+    ]
+
+    table = pa.ipc.open_stream(arrow_ipc(rows, RECON_SCHEMA)).read_all()
+    assert table.schema == RECON_SCHEMA
+    assert table.schema.field('date').type == pa.date32()
+    assert table['date'].to_pylist() == [date(2032, 10, 1), date(2032, 10, 2)]
+    assert table.drop_columns(['date']).to_pylist() == [{k: v for k, v in r.items() if k != 'date'} for r in rows]
+
+
+def test_arrow_types_do_not_depend_on_the_page():
+    line = {'id': 1, 'date': '2032-10-01', 'invoice_number': 'FR 1', 'customer': None, 'product': 'Pao',
+            'quantity': 1.0, 'unit_price_net': 1.0, 'vat_rate': 0.0, 'net_amount': 1.0, 'vat_amount': 0.0,
+            'gross_amount': 1.0, 'payment_method': CASH}
+    for rows in ([], [line], [dict(line, customer='Ana')]):
+        assert pa.ipc.open_stream(arrow_ipc(rows, SALES_SCHEMA)).read_all().schema == SALES_SCHEMA
@@ -0,0 +1,88 @@
+import tempfile
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.database import SessionLocal
+from app.main import app
+from app.models.models import Anomaly, BankTx, DailySalesAgg, NormalizedSales, ProductDim
+from app.services import parsing
+from benchmarks.synthetic import generate
+
+STAGES = ['upload_copy', 'detect_excel_months', 'detect_bank_months', 'parse_excel', 'parse_bank_pdf',
+          'resolve_dimensions', 'detect_anomalies', 'write_rows', 'store_anomalies', 'refresh_daily_agg', 'commit']
+
+
+def test_upload_reports_and_exports_stage_timings(tmp_path, monkeypatch):
+    # raw_sales.source holds the upload path in at most 50 characters
+    monkeypatch.setattr(settings, 'upload_dir', tempfile.mkdtemp(prefix='up-'))
+    files = generate(str(tmp_path), '2034-11', lines=200, bank_lines=100)
+    db = SessionLocal()
+    products = {name for name, in db.query(ProductDim.name)}
+    db.close()
+    try:
+        with TestClient(app) as client, open(files['excel'], 'rb') as excel, open(files['pdf'], 'rb') as pdf:
+            r = client.post('/files/upload', params={'month': '11'},
+                            files={'sales_excel': ('sales.xlsx', excel), 'bank_pdf': ('bank.pdf', pdf)})
+            assert r.status_code == 200, r.text
+            body = r.json()
+            stages = {s['stage']: s for s in body['stages']}
+            assert [s['stage'] for s in body['stages']] == STAGES
+            assert stages['parse_excel']['rows'] == body['sales_rows'] == 200
+            assert stages['parse_bank_pdf']['rows'] == body['bank_rows'] == files['bank_lines']
+            assert stages['write_rows']['rows'] == 200 + files['bank_lines']
+            assert stages['upload_copy']['bytes'] == stages['parse_excel']['bytes'] + stages['parse_bank_pdf']['bytes']
+            assert all(s['wall_ms'] >= 0 and s['cpu_ms'] >= 0 for s in body['stages'])
+            assert body['total_ms'] >= stages['parse_bank_pdf']['wall_ms'] > 0
+
+            with open(files['excel'], 'rb') as excel, open(files['pdf'], 'rb') as pdf:
+                r = client.post('/files/upload', params={'month': '12'},
+                                files={'sales_excel': ('sales.xlsx', excel), 'bank_pdf': ('bank.pdf', pdf)})
+            assert r.status_code == 400
+
+            recent = client.get('/files/timings').json()
+            assert [u['outcome'] for u in recent[:2]] == ['month_mismatch', 'ok']
+            assert recent[1]['files']['bank_pdf']['name'] == 'bank.pdf'
+
+            metrics = client.get('/metrics').text
+            assert 'ingest_stage_duration_seconds_count{stage="commit"}' in metrics
+            assert 'ingest_stage_cpu_seconds_bucket{stage="parse_excel",le="+Inf"}' in metrics
+            assert 'ingest_uploads_total{outcome="month_mismatch"}' in metrics
+    finally:
+        db = SessionLocal()
+        month = (date(2034, 11, 1), date(2034, 11, 30))
+        for model in (NormalizedSales, BankTx, DailySalesAgg, Anomaly):
+            db.query(model).filter(model.date.between(*month)).delete(synchronize_session=False)
+        # the synthetic catalogue shares names with other tests' products
+        db.query(ProductDim).filter(ProductDim.name.notin_(products)).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+
+def test_failed_ingest_rolls_back_and_closes_its_session(monkeypatch):
+    # raw_sales.source holds the file path in at most 50 characters
+    files = generate(tempfile.mkdtemp(prefix='in-'), '2034-11', lines=20, bank_lines=30)
+    sessions = []
+
+    def tracked():
+        db = SessionLocal()
+        sessions.append(db)
+        return db
+
+    def fail(db, findings):
+        raise RuntimeError('disk full')
+
+    monkeypatch.setattr(parsing, 'SessionLocal', tracked)
+    monkeypatch.setattr(parsing.anomalies, 'store', fail)
+    with pytest.raises(RuntimeError):
+        parsing.ingest_files(files['excel'], files['pdf'], '11')
+    [db] = sessions
+    assert not db.in_transaction()
+    check = SessionLocal()
+    try:
+        assert check.query(NormalizedSales).filter(NormalizedSales.date.between(
+            date(2034, 11, 1), date(2034, 11, 30))).count() == 0
+    finally:
+        check.close()
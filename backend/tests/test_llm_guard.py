@@ -0,0 +1,94 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.llm import groq
+from app.llm.guard import CircuitBreaker, ProviderGuard
+
+
+def _asker(facts):
+    async def run(questions):
+        return await asyncio.gather(*[groq.answer_groq('07', q, facts) for q in questions])
+    return run
+
+
+def test_identical_prompts_share_one_call_under_the_limit(mock_provider, facts):
+    state = {'calls': 0, 'running': 0, 'peak': 0}
+
+    async def handler(request):
+        state['calls'] += 1
+        n = state['calls']
+        state['running'] += 1
+        state['peak'] = max(state['peak'], state['running'])
+        await asyncio.sleep(0.05)
+        state['running'] -= 1
+        return httpx.Response(200, json={'choices': [{'message': {'content': f'answer {n}'}}]})
+
+    guard = ProviderGuard(2, 5, CircuitBreaker(5, 30))
+    mock_provider(handler, guard=guard)
+    run = _asker(facts)
+    assert asyncio.run(run(['card vs cash?'] * 5)) == ['answer 1'] * 5
+    assert state['calls'] == 1 and guard.stats()['coalesced'] == 4
+
+    answers = asyncio.run(run([f'question {i}' for i in range(6)]))
+    assert len(set(answers)) == 6 and state['peak'] == 2
+
+
+def test_open_breaker_answers_from_the_stub_without_calling(mock_provider, facts):
+    state = {'calls': 0, 'fail': True}
+
+    def handler(request):
+        state['calls'] += 1
+        if state['fail']:
+            return httpx.Response(503)
+        return httpx.Response(200, json={'choices': [{'message': {'content': 'back'}}]})
+
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    mock_provider(handler, guard=ProviderGuard(4, 5, breaker))
+    run = _asker(facts)
+    assert [a.startswith('[LLM unavailable] Grounded summary') for a in asyncio.run(run(['a?', 'b?']))] == [True] * 2
+    assert breaker.state == 'open'
+
+    (answer,) = asyncio.run(run(['vat breakdown']))
+    assert answer == '[LLM unavailable] VAT breakdown for 07: 14%: 14.00. Total VAT: 14.00.'
+    assert state['calls'] == 2
+
+    # after the reset period one trial goes through and closes the breaker
+    breaker.reset_seconds = 0
+    state['fail'] = False
+    assert asyncio.run(run(['vat breakdown'])) == ['back']
+    assert breaker.state == 'closed' and breaker.stats()['opened'] == 1
+
+
+def test_trial_cancelled_while_waiting_for_a_slot_releases_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+    guard = ProviderGuard(1, 5, breaker)
+
+    async def run():
+        held, release = asyncio.Event(), asyncio.Event()
+
+        async def occupant():
+            async with guard.slot():
+                held.set()
+                await release.wait()
+
+        async def trial():
+            async with guard.slot():
+                return 'trial'
+
+        task = asyncio.ensure_future(occupant())
+        await held.wait()
+        breaker.record_failure()  # open; the reset period has already elapsed
+        waiting = asyncio.ensure_future(trial())
+        await asyncio.sleep(0.01)
+        assert breaker.state == 'half_open' and breaker.trial_running
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        # the cancelled trial gave its turn back: the next request may try
+        assert not breaker.trial_running and breaker.allow()
+        release.set()
+        await task
+
+    asyncio.run(run())
@@ -0,0 +1,38 @@
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.llm import groq, http
+from app.main import app
+
+
+def test_lifespan_owns_the_shared_client():
+    with TestClient(app):
+        client = http._client
+        assert client is not None and not client.is_closed
+        assert http.get_client() is client
+    assert http._client is None and client.is_closed
+
+
+def test_calls_reuse_the_shared_client(mock_provider):
+    seen = []
+
+    def reply(request):
+        seen.append(str(request.url))
+        return httpx.Response(200, json={'choices': [{'message': {'content': 'ok'}}]})
+
+    built = http.build_client()
+    assert built.timeout.connect == settings.llm_connect_timeout
+    assert built.timeout.read == settings.llm_read_timeout
+    shared = mock_provider(reply)
+
+    async def run():
+        await built.aclose()
+        answers = [await groq._call_openai_compatible('m', 's', 'u') for _ in range(3)]
+        assert http.get_client() is shared
+        return answers
+
+    assert asyncio.run(run()) == ['ok'] * 3
+    assert seen == ['https://llm.test/v1/chat/completions'] * 3
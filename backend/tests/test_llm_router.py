@@ -0,0 +1,115 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from app.llm import groq
+from app.llm.router import ModelRouter, ModelTimeout
+
+
+def test_rate_limited_or_slow_models_fall_through_and_get_demoted():
+    router = ModelRouter(['a', 'b'], attempt_timeout=0.05)
+    calls = []
+
+    async def call(model):
+        calls.append(model)
+        if model == 'a':
+            if calls.count('a') % 2:
+                raise httpx.HTTPStatusError('429', request=None, response=None)
+            await asyncio.sleep(1)
+        return 'from ' + model
+
+    async def run():
+        return [await router.complete(call) for _ in range(3)]
+
+    started = time.perf_counter()
+    assert asyncio.run(run()) == ['from b'] * 3
+    assert time.perf_counter() - started < 0.5
+    stats = router.stats()['models']
+    assert stats['a']['error_rate'] == 1.0 and stats['a']['timeouts'] == 1
+    assert stats['b']['count'] == 3 and stats['b']['error_rate'] == 0.0
+    # a fourth failure and 'a' is asked last
+    calls.clear()
+    asyncio.run(run())
+    assert router.order() == ['b', 'a'] and calls == ['a', 'b', 'b', 'b']
+
+
+def test_every_model_failing_raises_the_last_error():
+    router = ModelRouter(['a', 'b'], attempt_timeout=0.02)
+
+    async def call(model):
+        await asyncio.sleep(1)
+
+    with pytest.raises(ModelTimeout, match='b did not answer'):
+        asyncio.run(router.complete(call))
+
+
+def test_hedge_after_p95_first_answer_wins():
+    router = ModelRouter(['a', 'b'], attempt_timeout=5, hedge=True, hedge_min_ms=20)
+    state = {'slow': False, 'cancelled': 0}
+
+    async def call(model):
+        try:
+            await asyncio.sleep(1 if model == 'a' and state['slow'] else 0.01)
+        except asyncio.CancelledError:
+            state['cancelled'] += 1
+            raise
+        return 'from ' + model
+
+    async def run():
+        # no baseline: no hedge
+        for _ in range(5):
+            assert await router.complete(call) == 'from a'
+        state['slow'] = True
+        started = time.perf_counter()
+        answer = await router.complete(call)
+        return answer, time.perf_counter() - started
+
+    answer, elapsed = asyncio.run(run())
+    assert answer == 'from b' and elapsed < 0.5
+    assert router.hedged == 1 and router.hedge_wins == 1 and state['cancelled'] == 1
+
+
+def test_stream_falls_over_only_before_the_first_token():
+    router = ModelRouter(['a', 'b', 'c'], attempt_timeout=0.05)
+
+    def open_stream(model):
+        async def chunks():
+            if model == 'a':
+                await asyncio.sleep(1)
+            yield model + '1'
+            if model == 'b':
+                raise httpx.ReadError('reset')
+            yield model + '2'
+        return chunks()
+
+    async def run():
+        out = []
+        with pytest.raises(httpx.ReadError):
+            async for text in router.stream(open_stream):
+                out.append(text)
+        return out
+
+    assert asyncio.run(run()) == ['b1']
+    stats = router.stats()['models']
+    assert stats['a']['timeouts'] == 1 and stats['b']['error_rate'] == 1.0 and stats['c']['count'] == 0
+
+
+def test_answer_groq_uses_the_fallback_model(mock_provider, facts, monkeypatch):
+    asked = []
+
+    def handler(request):
+        model = json.loads(request.content)['model']
+        asked.append(model)
+        if model == 'primary':
+            return httpx.Response(429, json={'error': 'rate limited'})
+        return httpx.Response(200, json={'choices': [{'message': {'content': 'answer by ' + model}}]})
+
+    mock_provider(handler)
+    monkeypatch.setattr(groq, 'model_router', ModelRouter(['primary', 'backup'], attempt_timeout=5))
+
+    assert asyncio.run(groq.answer_groq('07', 'how much VAT?', facts)) == 'answer by backup'
+    assert asked == ['primary', 'backup']
+    assert groq.provider_guard.breaker.failures == 0
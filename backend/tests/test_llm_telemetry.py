@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.llm import groq
+from app.llm.router import ModelRouter
+from app.llm.telemetry import ANSWERS, CALL_SECONDS, TOKENS
+from app.main import app
+from app.telemetry import Registry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    h = registry.histogram('demo_seconds', 'Demo.', (0.5, 1), ('route',))
+    for v in (0.2, 0.7, 3):
+        h.observe(v, route='/x')
+    assert registry.render().splitlines() == [
+        '# HELP demo_seconds Demo.',
+        '# TYPE demo_seconds histogram',
+        'demo_seconds_bucket{route="/x",le="0.5"} 1',
+        'demo_seconds_bucket{route="/x",le="1"} 2',
+        'demo_seconds_bucket{route="/x",le="+Inf"} 3',
+        'demo_seconds_sum{route="/x"} 3.9',
+        'demo_seconds_count{route="/x"} 3',
+    ]
+
+
+def test_provider_calls_record_latency_tokens_and_outcomes(mock_provider, facts, monkeypatch):
+    async def handler(request):
+        model = json.loads(request.content)['model']
+        if model == 'm-limited':
+            return httpx.Response(429, json={'error': 'rate limited'})
+        if model == 'm-slow':
+            await asyncio.sleep(1)
+        return httpx.Response(200, json={'choices': [{'message': {'content': 'ok'}}],
+                                         'usage': {'prompt_tokens': 420, 'completion_tokens': 12}})
+
+    mock_provider(handler)
+
+    def calls(model, outcome):
+        return CALL_SECONDS.values().get((model, 'complete', outcome), {'count': 0})['count']
+
+    before = (calls('m-limited', 'http_error'), calls('m-slow', 'timeout'), calls('m-ok', 'success'),
+              TOKENS.values().get(('m-ok', 'prompt'), 0), ANSWERS.values().get(('fallback',), 0))
+
+    async def run():
+        monkeypatch.setattr(groq, 'model_router', ModelRouter(['m-limited', 'm-slow', 'm-ok'], 0.05))
+        ok = await groq.answer_groq('07', 'how much VAT?', facts)
+        monkeypatch.setattr(groq, 'model_router', ModelRouter(['m-slow'], 0.05))
+        failed = await groq.answer_groq('07', 'how much VAT?', facts)
+        return ok, failed
+
+    ok, failed = asyncio.run(run())
+    assert ok == 'ok' and failed == groq.grounded_fallback(facts)
+    after = (calls('m-limited', 'http_error'), calls('m-slow', 'timeout'), calls('m-ok', 'success'),
+             TOKENS.values().get(('m-ok', 'prompt'), 0), ANSWERS.values().get(('fallback',), 0))
+    assert [a - b for a, b in zip(after, before)] == [1, 2, 1, 420, 1]
+
+    with TestClient(app) as client:
+        r = client.get('/metrics')
+        assert r.headers['content-type'].startswith('text/plain; version=0.0.4')
+        assert '# TYPE llm_call_duration_seconds histogram' in r.text
+        assert 'llm_tokens_total{model="m-ok",type="completion"}' in r.text
+        assert 'llm_prompt_chars_bucket{model="m-ok",le="+Inf"}' in r.text
+        telemetry = client.get('/chat/status').json()['telemetry']
+        assert telemetry['models']['m-ok']['calls']['success'] >= 1
+        assert telemetry['models']['m-slow']['calls']['timeout'] >= 2
@@ -0,0 +1,37 @@
+import numpy as np
+from openpyxl import Workbook
+
+from app.services.money import to_cents, from_cents, parse_amount_cents, percent_of_cents
+from app.services.parsing import parse_excel
+
+
+def test_cents_roundtrip():
+    assert to_cents('1234.565') == 123457
+    assert to_cents(0.1 + 0.2) == 30
+    assert from_cents(123457) == 1234.57
+    assert parse_amount_cents('1.234,56') == 123456
+    assert parse_amount_cents('-80,00') == -8000
+    assert parse_amount_cents('Fecho') is None
+
+
+def test_percent_of_cents_rounds_half_away_from_zero():
+    out = percent_of_cents(np.array([20020, -1005, 50]), np.array([14, 14, 5]))
+    assert out.tolist() == [2803, -141, 3]
+
+
+def test_parse_excel_amounts_are_integer_cents(tmp_path):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = 'Detalhes de Documentos Emitidos'
+    ws.append(['NºDoc.', 'Data Emissão', 'Artigo', 'Quantidade',
+               'Preço Unit. s/Imp', 'Imposto', 'Tipo Pagamento'])
+    ws.append(['FR 1', '01/09/2025', 'Pao', 2, 100.10, '14%', 'Cartão Multicaixa'])
+    ws.append(['FR 2', '01/10/2025', 'Leite', 1, 1, '14', 'Numerário'])
+    path = tmp_path / 'sales.xlsx'
+    wb.save(path)
+
+    res = parse_excel(str(path), '09')
+    assert res['raw_count'] == 2
+    [line] = res['normalized']
+    assert (line['net_cents'], line['vat_cents'], line['gross_cents']) == (20020, 2803, 22823)
+    assert line['payment_method'] == 'Cartão Multicaixa'
@@ -0,0 +1,36 @@
+from app.database import ReplicaRouter
+
+
+def test_disabled_router_reads_primary():
+    router = ReplicaRouter(enabled=False)
+    router.mark_write()
+    assert router.pending_lsn is None
+    assert router.use_replica() is False
+
+
+def test_reads_primary_until_replica_replays_ingest(monkeypatch):
+    router = ReplicaRouter(enabled=True)
+    assert router.use_replica() is True
+
+    router.pending_lsn = '0/3000060'
+    monkeypatch.setattr(router, '_replayed', lambda lsn: False)
+    assert router.use_replica() is False
+    assert router.pending_lsn == '0/3000060'
+
+    # not a standby (NULL replay position) never counts as caught up
+    monkeypatch.setattr(router, '_replayed', lambda lsn: None)
+    assert router.use_replica() is False
+
+    monkeypatch.setattr(router, '_replayed', lambda lsn: True)
+    assert router.use_replica() is True
+    assert router.pending_lsn is None
+
+
+def test_unreachable_replica_falls_back_to_primary(monkeypatch):
+    router = ReplicaRouter(enabled=True)
+    router.pending_lsn = '0/3000060'
+
+    def boom(lsn):
+        raise ConnectionError('replica down')
+    monkeypatch.setattr(router, '_replayed', boom)
+    assert router.use_replica() is False
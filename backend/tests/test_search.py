@@ -0,0 +1,51 @@
+from datetime import date
+
+import pytest
+
+from app.database import SessionLocal
+from app.models.models import BankTx, ProductDim
+from app.services.search import search_products, search_bank, word_score, decode_rank_cursor
+
+PRODUCTS = ['Zebrula Leite Gordo 1L', 'Zebrula Leite Magro 1L', 'Pao Zebrula', 'Zebrulas Sortidas', 'Queijo']
+
+
+def test_word_score():
+    assert word_score('leite', 'Zebrula LEITE Gordo') == 1.0
+    assert 0 < word_score('leitte', 'Leite Gordo') < 1
+    assert word_score('vinho', 'Leite Gordo') == 0.0
+
+
+def test_ranked_pages():
+    db = SessionLocal()
+    try:
+        db.add_all([ProductDim(name=n) for n in PRODUCTS])
+        db.add_all([BankTx(date=date(2034, 2, d), description=f'Transf Zebrula ref {d}', credit_cents=100 * d,
+                           tx_type='OTHER') for d in range(1, 6)])
+        db.add(BankTx(date=date(2034, 3, 1), description='Transf Zebrula ref 9', credit_cents=1, tx_type='OTHER'))
+        db.flush()
+
+        best = search_products(db, 'zebrula leite', limit=2)['items']
+        assert {p['name'] for p in best} == set(PRODUCTS[:2])
+        assert best[0]['score'] >= best[1]['score'] > 0.5
+
+        page = search_products(db, 'zebrula', limit=3)
+        rest = search_products(db, 'zebrula', limit=3, cursor=page['next_cursor'])
+        names = [p['name'] for p in page['items'] + rest['items']]
+        assert sorted(names) == sorted(PRODUCTS[:4]) and rest['next_cursor'] is None
+
+        seen, cursor = [], None
+        while True:
+            page = search_bank(db, 'zebrula', month='02', limit=2, cursor=cursor)
+            seen += [b['description'] for b in page['items']]
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        assert sorted(seen) == [f'Transf Zebrula ref {d}' for d in range(1, 6)]
+
+        with pytest.raises(ValueError):
+            search_bank(db, 'ze')
+        with pytest.raises(ValueError):
+            decode_rank_cursor('garbage')
+    finally:
+        db.rollback()
+        db.close()
@@ -0,0 +1,64 @@
+from datetime import date
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.models import PaymentMethod
+from app.services import snapshot
+from app.services.snapshot import MonthSnapshot, SnapshotCache, snapshots
+
+CARD, CASH = PaymentMethod.CARTAO.value, PaymentMethod.NUMERARIO.value
+# (date, invoice, customer, product, payment method, vat rate, gross cents)
+LINES = [
+    (date(2031, 3, 1), 'FR 1', 'Ana', 'Pao', CARD, 14.0, 11400),
+    (date(2031, 3, 1), 'FR 1', 'Ana', 'Leite', CARD, 14.0, 5700),
+    (date(2031, 3, 2), 'FR 2', None, 'Queijo', CASH, 5.0, 11400),
+    (date(2031, 3, 2), 'FR 3', 'Rui', 'Pao', CASH, 0.0, -2500),     # negative line
+    (date(2031, 3, 3), 'FR 4', 'Rui', 'Leite', CARD, 7.0, 8000),
+    (date(2031, 3, 3), 'FR 4', None, 'Sumo', CARD, 14.0, 8900),     # ties with Pao (11400 - 2500)
+]
+
+
+def test_snapshot_matches_sql(seed_sales, month_metrics, monkeypatch):
+    monkeypatch.setattr(settings, 'snapshot_months', '03')
+    db = SessionLocal()
+    try:
+        seed_sales(db, LINES)
+        monkeypatch.setattr(settings, 'snapshot_enabled', False)
+        sql = month_metrics(db, '03', 3)
+        monkeypatch.setattr(settings, 'snapshot_enabled', True)
+        snapshots.invalidate()
+        snap = month_metrics(db, '03', 3)
+        assert snapshots.stats()['months'] == ['03']
+        assert snap == sql
+        # the Pao/Sumo tie goes to the lower key; NULL customer sorts like any other group
+        assert [p['product'] for p in snap['top_products']] == ['Leite', 'Queijo', 'Pao']
+        assert [c['customer'] for c in snap['top_customers']] == [None, 'Ana', 'Rui']
+        assert snap['facts']['peak'] == (date(2031, 3, 1), 17100)
+        assert snap['facts']['top_product'] == 'Leite'
+    finally:
+        db.rollback()
+        db.close()
+        snapshots.invalidate()
+
+
+def _empty(month):
+    return MonthSnapshot.from_rows(month, [], [], {}, {}, 1, 2)
+
+
+def test_lru_eviction_and_version_invalidation(monkeypatch):
+    monkeypatch.setattr(settings, 'snapshot_months', '01,02,03')
+    monkeypatch.setattr(settings, 'snapshot_revalidate_seconds', 0)
+    version = {'v': (1, 1)}
+    monkeypatch.setattr(snapshot, 'data_version', lambda db: version['v'])
+    monkeypatch.setattr(snapshot, 'load_snapshot', lambda db, month: _empty(month))
+    cache = SnapshotCache(int(_empty('01').nbytes * 2.5))
+
+    for month in ('01', '02', '01', '03'):
+        assert cache.get(None, month) is not None
+    assert cache.stats()['months'] == ['01', '03']
+    assert cache.evictions == 1
+
+    assert cache.get(None, '07') is None  # not a hot month
+    version['v'] = (2, 1)
+    cache.get(None, '01')
+    assert cache.stats()['months'] == ['01']
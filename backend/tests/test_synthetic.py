@@ -0,0 +1,24 @@
+from collections import Counter
+
+from benchmarks.synthetic import generate
+from app.services.parsing import detect_bank_months, detect_excel_months, parse_bank_pdf, parse_excel
+
+
+def test_generated_files_parse_back_to_their_totals(tmp_path):
+    files = generate(str(tmp_path), '2031-02', lines=300, bank_lines=120, seed=3)
+    assert detect_excel_months(files['excel']) == {'02'} == detect_bank_months(files['pdf'])
+
+    sales = parse_excel(files['excel'], '02')['normalized']
+    assert len(sales) == 300
+    assert sum(l['gross_cents'] for l in sales) == files['gross_cents']
+    card = [l for l in sales if l['payment_method'] == 'Cartão Multicaixa']
+    assert sum(l['gross_cents'] for l in card) == files['card_cents']
+
+    bank = parse_bank_pdf(files['pdf'], '02')
+    assert len(bank) == files['bank_lines'] >= 120
+    kinds = Counter(b['tx_type'] for b in bank)
+    card_days = len({l['date'] for l in card})
+    assert kinds['FECHO_TPA'] == kinds['COMISSAO_STC'] == kinds['IVA_COMISSAO'] == card_days
+    tpa = sum(b['credit_cents'] for b in bank if b['tx_type'] == 'FECHO_TPA')
+    # a few closes are short, never long
+    assert 0 <= files['card_cents'] - tpa < card_days * 50_000_00
@@ -0,0 +1,52 @@
+from datetime import date
+
+import pytest
+
+from app.services.timeseries import build_series, bucket_start
+
+# day -> (lines, net, vat, gross, card, cash) in cents
+DAILY = {
+    date(2025, 8, 30): (1, 10000, 1400, 11400, 11400, 0),
+    date(2025, 9, 1): (2, 20000, 2800, 22800, 11400, 11400),
+    date(2025, 9, 15): (1, 5000, 700, 5700, 0, 5700),
+    date(2024, 9, 3): (1, 8000, 1120, 9120, 9120, 0),
+}
+
+
+def test_bucket_start():
+    assert bucket_start(date(2025, 9, 17), 'week') == date(2025, 9, 15)
+    assert bucket_start(date(2025, 9, 17), 'month') == date(2025, 9, 1)
+    assert bucket_start(date(2025, 9, 17), 'day') == date(2025, 9, 17)
+
+
+def test_monthly_series_with_previous_and_year_deltas():
+    res = build_series(DAILY, date(2025, 9, 10), date(2025, 9, 20), 'month')
+    assert (res['start'], res['end']) == ('2025-09-01', '2025-09-30')
+    [sep] = res['buckets']
+    assert sep['gross'] == 285.0 and sep['lines'] == 3 and sep['card'] == 114.0
+    assert sep['compare_period'] == '2025-08-01'
+    assert sep['delta']['gross'] == 171.0 and sep['delta_pct']['gross'] == 150.0
+    assert sep['delta_pct']['cash'] is None  # no August cash
+
+    yoy = build_series(DAILY, date(2025, 9, 1), date(2025, 9, 30), 'month', 'year')
+    assert yoy['buckets'][0]['compare_period'] == '2024-09-01'
+    assert yoy['totals']['delta']['gross'] == 193.8
+
+
+def test_empty_buckets_and_validation():
+    res = build_series(DAILY, date(2025, 8, 30), date(2025, 9, 2), 'day')
+    assert [b['gross'] for b in res['buckets']] == [114.0, 0.0, 228.0, 0.0]
+    with pytest.raises(ValueError):
+        build_series(DAILY, date(2025, 9, 2), date(2025, 9, 1), 'day')
+    with pytest.raises(ValueError):
+        build_series(DAILY, date(2025, 9, 1), date(2025, 9, 2), 'quarter')
+    with pytest.raises(ValueError):
+        build_series(DAILY, date(2000, 1, 1), date(2025, 1, 1), 'day')
+
+
+def test_previous_totals_compare_with_the_window_before_the_range():
+    # Sep 1-2 against Aug 30-31, not against Aug 31 + Sep 1
+    res = build_series(DAILY, date(2025, 9, 1), date(2025, 9, 2), 'day')
+    assert [b['compare_period'] for b in res['buckets']] == ['2025-08-31', '2025-09-01']
+    assert res['totals']['gross'] == 228.0
+    assert res['totals']['delta']['gross'] == 114.0 and res['totals']['delta_pct']['gross'] == 100.0
@@ -0,0 +1,5 @@
+#!/bin/sh
+# Runs once when the primary's data directory is initialised: allow the
+# replica service to stream WAL with the regular postgres credentials.
+set -e
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
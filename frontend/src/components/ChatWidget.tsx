@@ -1,5 +1,5 @@
 import { useEffect, useMemo, useRef, useState } from 'react'
-import { askChat, ChatMessage, ChatStatus, fetchChatStatus } from '../services/api'
+import { askChatStream, ChatMessage, ChatStatus, fetchChatStatus } from '../services/api'
 
 interface ChatWidgetProps {
   month: string
@@ -9,6 +9,8 @@ export default function ChatWidget({ month }: Readonly<ChatWidgetProps>) {
   const [open, setOpen] = useState(false)
   const [input, setInput] = useState('')
   const [loading, setLoading] = useState(false)
+  // true from send until the stream resolves; loading only covers the wait for the first token
+  const [streaming, setStreaming] = useState(false)
   const [messages, setMessages] = useState<ChatMessage[]>([])
   const inputRef = useRef<HTMLInputElement | null>(null)
   const storageKey = useMemo(() => `finance-chat:${month}`, [month])
@@ -45,20 +47,31 @@ export default function ChatWidget({ month }: Readonly<ChatWidgetProps>) {
   }, [])
 
   async function send() {
-    if (!input.trim() || loading) return
+    if (!input.trim() || streaming) return
     const userMsg: ChatMessage = { id: crypto.randomUUID(), role: 'user', content: input.trim() }
     setMessages(prev => [...prev, userMsg])
     setInput('')
     setLoading(true)
+    setStreaming(true)
+    const assistantId = crypto.randomUUID()
+    let started = false
     try {
-      const answer = await askChat(month, userMsg.content)
-      const assistant: ChatMessage = { id: crypto.randomUUID(), role: 'assistant', content: answer }
-      setMessages(prev => [...prev, assistant])
+      await askChatStream(month, userMsg.content, token => {
+        // the first token replaces the "Thinking…" indicator with the answer bubble
+        if (!started) {
+          started = true
+          setLoading(false)
+          setMessages(prev => [...prev, { id: assistantId, role: 'assistant', content: token }])
+        } else {
+          setMessages(prev => prev.map(m => (m.id === assistantId ? { ...m, content: m.content + token } : m)))
+        }
+      })
     } catch (e: any) {
       const errMsg: ChatMessage = { id: crypto.randomUUID(), role: 'assistant', content: 'Error: ' + (e?.message || 'Failed to get answer') }
       setMessages(prev => [...prev, errMsg])
     } finally {
       setLoading(false)
+      setStreaming(false)
       inputRef.current?.focus()
     }
   }
@@ -129,7 +142,7 @@ export default function ChatWidget({ month }: Readonly<ChatWidgetProps>) {
             />
             <button
               type="submit"
-              disabled={loading || !input.trim()}
+              disabled={streaming || !input.trim()}
               className="px-3 py-1 rounded bg-indigo-600 text-white text-xs disabled:opacity-50"
             >Send</button>
           </form>
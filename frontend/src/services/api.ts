@@ -123,6 +123,44 @@ export const askChat = async (month: string, question: string): Promise<string>
   return res.data.answer
 }
 
+// Streams the answer from /chat/stream (server-sent events over a POST, read with fetch).
+// onToken receives each text chunk as it arrives; resolves with the full answer.
+export const askChatStream = async (
+  month: string,
+  question: string,
+  onToken: (text: string) => void
+): Promise<string> => {
+  const res = await fetch(`${baseURL ?? ''}/chat/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+    body: JSON.stringify({ month, question }),
+  })
+  if (!res.ok || !res.body) throw new Error(`Request failed with status ${res.status}`)
+  const reader = res.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  let answer = ''
+  for (;;) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+    let end: number
+    while ((end = buffer.indexOf('\n\n')) >= 0) {
+      const frame = buffer.slice(0, end)
+      buffer = buffer.slice(end + 2)
+      const event = /^event: (.*)$/m.exec(frame)?.[1]
+      const data = JSON.parse(/^data: (.*)$/m.exec(frame)?.[1] ?? '{}')
+      if (event === 'token') {
+        answer += data.text
+        onToken(data.text)
+      } else if (event === 'error') {
+        throw new Error(data.message)
+      }
+    }
+  }
+  return answer
+}
+
 export interface ChatStatus { mode: 'groq' | 'stub'; model?: string | null; api_url?: string }
 export const fetchChatStatus = async (): Promise<ChatStatus> => {
   const res = await api.get<ChatStatus>('/chat/status')